@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import http.client
+import io
+import logging
+import queue
+import ssl
+import urllib.error
+import urllib.parse
+import zlib
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# errors a reused keep-alive connection raises when the server already closed it
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class NotSentError(urllib.error.URLError):
+    """The connection to the server could not be opened (refused, unknown
+    host, connect timeout), so the request never left the client."""
+
+
+# response bodies are read and decompressed in chunks of this size
+CHUNK_SIZE = 64 * 1024
+
+
+def decode_body(response: http.client.HTTPResponse) -> Iterator[bytes]:
+    """Yield the response body, decompressing gzip or deflate on the fly."""
+    encoding = (response.getheader("Content-Encoding") or "identity").lower()
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+    else:
+        decompressor = None
+
+    first = True
+    while True:
+        chunk = response.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if decompressor is None:
+            yield chunk
+            continue
+        try:
+            data = decompressor.decompress(chunk)
+        except zlib.error:
+            if encoding != "deflate" or not first:
+                raise
+            # some servers send raw deflate streams without the zlib header
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            data = decompressor.decompress(chunk)
+        first = False
+        if data:
+            yield data
+    if decompressor is not None:
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+class ConnectionPool(object):
+    """Persistent HTTP(S) connections to a single host, shared by all threads.
+
+    Idle connections are kept in a LIFO queue of at most ``size`` entries so
+    the most recently used (and least likely to have timed out) connection is
+    reused first. Compressed transfer is negotiated unless the caller sets
+    its own Accept-Encoding. Errors are raised as ``urllib.error.HTTPError``
+    and ``urllib.error.URLError`` so callers can treat the pool like urllib;
+    a request that never left the client raises ``NotSentError``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        proxy_url: Optional[str] = None,
+        size: int = 4,
+        context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        target = urllib.parse.urlsplit(url)
+        self.scheme = target.scheme
+        self.host = target.hostname
+        self.port = target.port or (443 if self.scheme == "https" else 80)
+        self.context = context
+        self.size = size
+        self.proxy = None
+        self.proxy_headers = {}
+        if proxy_url:
+            proxy = urllib.parse.urlsplit(proxy_url)
+            self.proxy = (proxy.hostname, proxy.port or 80)
+            if proxy.username:
+                credentials = "%s:%s" % (
+                    urllib.parse.unquote(proxy.username),
+                    urllib.parse.unquote(proxy.password or ""),
+                )
+                self.proxy_headers["Proxy-Authorization"] = "Basic %s" % (
+                    base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+                )
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self, timeout: int) -> http.client.HTTPConnection:
+        host, port = self.proxy or (self.host, self.port)
+        if self.scheme == "https":
+            conn = http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self.context
+            )
+            if self.proxy:
+                conn.set_tunnel(self.host, self.port, headers=self.proxy_headers)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        return conn
+
+    def _open(self, conn: http.client.HTTPConnection) -> None:
+        if conn.sock is not None:
+            return
+        try:
+            conn.connect()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise NotSentError(exc)
+
+    def _acquire(
+        self, timeout: int, reuse: bool = True
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        try:
+            if not reuse:
+                raise queue.Empty
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect(timeout), False
+        conn.timeout = timeout
+        if conn.sock:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stream(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        timeout: int = 30,
+        retry: bool = True,
+    ) -> Tuple[Iterator[bytes], http.client.HTTPMessage]:
+        """Send a request and return its decoded body as an iterator of chunks.
+
+        The connection goes back to the pool once the body is exhausted; an
+        abandoned body closes it instead. Like urllib, any status outside
+        2xx (including 304 Not Modified) is raised before the body is returned.
+        """
+        url = "%s://%s:%s%s" % (self.scheme, self.host, self.port, path)
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+        target = path
+        if self.proxy and self.scheme == "http":
+            # plain http goes through the proxy by absolute url, https is tunneled
+            target = url
+            headers.update(self.proxy_headers)
+
+        # a request that must not be repeated can not be resent when an idle
+        # connection turns out stale, it is sent on a fresh one instead
+        conn, reused = self._acquire(timeout, reuse=retry)
+        try:
+            try:
+                self._open(conn)
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                # only a reused connection may simply have gone stale
+                if not reused:
+                    raise
+                logger.debug("Reconnecting stale connection for %s %s" % (method, path))
+                conn = self._connect(timeout)
+                self._open(conn)
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+        except NotSentError:
+            raise
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            if isinstance(exc, TimeoutError):
+                raise
+            raise urllib.error.URLError(exc)
+
+        chunks = self._read(conn, response)
+        if not 200 <= response.status < 300:
+            data = b"".join(chunks)
+            raise urllib.error.HTTPError(
+                url,
+                response.status,
+                response.reason,
+                response.headers,
+                io.BytesIO(data),
+            )
+        return chunks, response.headers
+
+    def _read(
+        self, conn: http.client.HTTPConnection, response: http.client.HTTPResponse
+    ) -> Iterator[bytes]:
+        try:
+            yield from decode_body(response)
+        except (OSError, http.client.HTTPException, zlib.error) as exc:
+            conn.close()
+            if isinstance(exc, TimeoutError):
+                raise
+            raise urllib.error.URLError(exc)
+        except GeneratorExit:
+            # the rest of the body is still on the wire
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        timeout: int = 30,
+        retry: bool = True,
+    ) -> Tuple[bytes, http.client.HTTPMessage]:
+        chunks, headers = self.stream(
+            method, path, body=body, headers=headers, timeout=timeout, retry=retry
+        )
+        return b"".join(chunks), headers
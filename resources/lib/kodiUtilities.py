@@ -1,14 +1,17 @@
 # -*- coding: utf-8 -*-
 #
 
+import bisect
 import xbmc
 import xbmcgui
 import xbmcaddon
 import json
+import os
 import re
 import logging
-from typing import Tuple, List, Dict, Union, Optional
-from resources.lib import utilities
+from typing import Callable, Tuple, List, Dict, Union, Optional
+from xml.etree import ElementTree
+from resources.lib import records, utilities
 
 
 # read settings
@@ -20,7 +23,10 @@ REGEX_URL = "(^https?://)(.+)"
 
 
 def notification(
-    header: str, message: str, time: int = 5000, icon: str = __addon__.getAddonInfo("icon")
+    header: str,
+    message: str,
+    time: int = 5000,
+    icon: str = __addon__.getAddonInfo("icon"),
 ) -> None:
     xbmcgui.Dialog().notification(header, message, icon, time)
 
@@ -29,30 +35,100 @@ def showSettings() -> None:
     __addon__.openSettings()
 
 
+class SettingsSnapshot(object):
+    """The addon settings, read from Kodi once and kept in process.
+
+    Every setting declared in resources/settings.xml is read on first use and
+    again on refresh(), which traktMonitor calls from onSettingsChanged;
+    undeclared settings are read when first asked for. Listeners are called
+    after each refresh so values derived from settings can be rebuilt.
+    """
+
+    settingsFile = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "settings.xml"
+    )
+
+    def __init__(self) -> None:
+        self._values = None
+        self._listeners = []
+
+    def _declared(self) -> List[str]:
+        try:
+            tree = ElementTree.parse(self.settingsFile)
+        except (OSError, ElementTree.ParseError) as ex:
+            logger.debug("Reading %s failed: %s" % (self.settingsFile, ex))
+            return []
+        return [
+            setting.get("id")
+            for setting in tree.iter("setting")
+            if setting.get("id") and setting.get("type") != "action"
+        ]
+
+    def _load(self) -> Dict[str, str]:
+        values = {}
+        for setting in self._declared():
+            values[setting] = __addon__.getSetting(setting).strip()
+        self._values = values
+        return values
+
+    def get(self, setting: str) -> str:
+        values = self._values
+        if values is None:
+            values = self._load()
+        if setting not in values:
+            values[setting] = __addon__.getSetting(setting).strip()
+        return values[setting]
+
+    def getBool(self, setting: str) -> bool:
+        return self.get(setting).lower() == "true"
+
+    def getFloat(self, setting: str) -> float:
+        try:
+            return float(self.get(setting))
+        except ValueError:
+            return 0
+
+    def getInt(self, setting: str) -> int:
+        try:
+            return int(self.getFloat(setting))
+        except ValueError:
+            return 0
+
+    def set(self, setting: str, value: Union[str, int, float, bool]) -> None:
+        __addon__.setSetting(setting, str(value))
+        if self._values is not None:
+            self._values[setting] = str(value).strip()
+
+    def refresh(self) -> None:
+        self._load()
+        for listener in list(self._listeners):
+            listener()
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+
+settings = SettingsSnapshot()
+
+
 def getSetting(setting: str) -> str:
-    return __addon__.getSetting(setting).strip()
+    return settings.get(setting)
 
 
 def setSetting(setting: str, value: Union[str, int, float, bool]) -> None:
-    __addon__.setSetting(setting, str(value))
+    settings.set(setting, value)
 
 
 def getSettingAsBool(setting: str) -> bool:
-    return getSetting(setting).lower() == "true"
+    return settings.getBool(setting)
 
 
 def getSettingAsFloat(setting: str) -> float:
-    try:
-        return float(getSetting(setting))
-    except ValueError:
-        return 0
+    return settings.getFloat(setting)
 
 
 def getSettingAsInt(setting: str) -> int:
-    try:
-        return int(getSettingAsFloat(setting))
-    except ValueError:
-        return 0
+    return settings.getInt(setting)
 
 
 def getString(string_id: int) -> str:
@@ -74,65 +150,128 @@ def kodiJsonRequest(params: Dict) -> Optional[Union[Dict, List]]:
         return None
 
 
-# check exclusion settings for filename passed as argument
+# sent by the scripts to the service after appending to the dispatch queue,
+# Kodi delivers it to every monitor as Other.<message>
+QUEUED_SENDER = "script.trakt"
+QUEUED_MESSAGE = "queued"
 
 
-def checkExclusion(fullpath: str) -> bool:
-    if not fullpath:
-        return True
+def notifyQueued() -> None:
+    kodiJsonRequest(
+        {
+            "jsonrpc": "2.0",
+            "method": "JSONRPC.NotifyAll",
+            "params": {"sender": QUEUED_SENDER, "message": QUEUED_MESSAGE},
+            "id": 1,
+        }
+    )
 
-    # Live TV exclusion
-    if fullpath.startswith("pvr://") and getSettingAsBool("ExcludeLiveTV"):
-        logger.debug(
-            "checkExclusion(): Video is playing via Live TV, which is currently set as excluded location."
-        )
-        return True
 
-    # HTTP exclusion
-    if fullpath.startswith(("http://", "https://")) and getSettingAsBool("ExcludeHTTP"):
-        logger.debug(
-            "checkExclusion(): Video is playing via HTTP source, which is currently set as excluded location."
-        )
-        return True
+class ExclusionMatcher(object):
+    """Exclusion settings read once, so checking a file makes no Kodi calls.
+
+    Excluded paths covered by a shorter excluded path are dropped and the rest
+    is kept sorted. As no remaining path is a prefix of another, the only one
+    a file can start with is the closest path sorting before it.
+    """
+
+    def __init__(self) -> None:
+        self.excludeLiveTV = getSettingAsBool("ExcludeLiveTV")
+        self.excludeHTTP = getSettingAsBool("ExcludeHTTP")
+        self.excludePlugin = getSettingAsBool("ExcludePlugin")
+        self.excludeScript = getSettingAsBool("ExcludeScript")
+
+        excluded = []
+        if getSettingAsBool("ExcludePathOption"):
+            excluded.append((getSetting("ExcludePath"), 1))
+        for x in range(2, 13):
+            if getSettingAsBool("ExcludePathOption%i" % x):
+                excluded.append((getSetting("ExcludePath%i" % x), x))
+
+        self.paths = []
+        self.numbers = []
+        for path, x in sorted(excluded):
+            if path == "" or (self.paths and path.startswith(self.paths[-1])):
+                continue
+            self.paths.append(path)
+            self.numbers.append(x)
+
+    def isExcluded(self, fullpath: str) -> bool:
+        # Live TV exclusion
+        if self.excludeLiveTV and fullpath.startswith("pvr://"):
+            logger.debug(
+                "checkExclusion(): Video is playing via Live TV, which is currently set as excluded location."
+            )
+            return True
 
-    # Plugin exclusion
-    if fullpath.startswith("plugin://") and getSettingAsBool("ExcludePlugin"):
-        logger.debug(
-            "checkExclusion(): Video is playing via Plugin source, which is currently set as excluded location."
-        )
-        return True
+        # HTTP exclusion
+        if self.excludeHTTP and fullpath.startswith(("http://", "https://")):
+            logger.debug(
+                "checkExclusion(): Video is playing via HTTP source, which is currently set as excluded location."
+            )
+            return True
 
-    # Script exclusion
-    if xbmcgui.Window(10000).getProperty(
-        "script.trakt.paused"
-    ) == "true" and getSettingAsBool("ExcludeScript"):
-        logger.debug(
-            "checkExclusion(): Video is playing via Script source, which is currently set as excluded location."
-        )
-        return True
+        # Plugin exclusion
+        if self.excludePlugin and fullpath.startswith("plugin://"):
+            logger.debug(
+                "checkExclusion(): Video is playing via Plugin source, which is currently set as excluded location."
+            )
+            return True
 
-    # Path exclusions
-    ExcludePath = getSetting("ExcludePath")
-    if ExcludePath != "" and getSettingAsBool("ExcludePathOption"):
-        if fullpath.startswith(ExcludePath):
+        # Script exclusion, the paused property changes while Kodi runs
+        if (
+            self.excludeScript
+            and xbmcgui.Window(10000).getProperty("script.trakt.paused") == "true"
+        ):
             logger.debug(
-                "checkExclusion(): Video is from location, which is currently set as excluded path 1."
+                "checkExclusion(): Video is playing via Script source, which is currently set as excluded location."
             )
             return True
 
-    found = False
-    for x in range(2, 13):
-        found |= utilities.checkExcludePath(
-            getSetting("ExcludePath%i" % x),
-            getSettingAsBool("ExcludePathOption%i" % x),
-            fullpath,
-            x,
-        )
+        # Path exclusions
+        i = bisect.bisect_right(self.paths, fullpath) - 1
+        if i >= 0 and fullpath.startswith(self.paths[i]):
+            logger.debug(
+                "checkExclusion(): Video is from location, which is currently set as excluded path %i."
+                % self.numbers[i]
+            )
+            return True
+
+        return False
+
+
+_exclusionMatcher = None
+
+
+def getExclusionMatcher() -> ExclusionMatcher:
+    global _exclusionMatcher
+    if _exclusionMatcher is None:
+        _exclusionMatcher = ExclusionMatcher()
+    return _exclusionMatcher
 
-    return found
 
+# called when the addon settings change, the next check reads them again
+def resetExclusionMatcher() -> None:
+    global _exclusionMatcher
+    _exclusionMatcher = None
 
-def kodiRpcToTraktMediaObject(type: str, data: Dict, mode: str = "collected") -> Optional[Dict]:
+
+settings.subscribe(resetExclusionMatcher)
+
+
+# check exclusion settings for filename passed as argument
+
+
+def checkExclusion(fullpath: str) -> bool:
+    if not fullpath:
+        return True
+
+    return getExclusionMatcher().isExcluded(fullpath)
+
+
+def kodiRpcToTraktMediaObject(
+    type: str, data: Dict, mode: str = "collected"
+) -> Optional[Dict]:
     if type == "show":
         if "uniqueid" in data:
             data["ids"] = data.pop("uniqueid")
@@ -150,25 +289,26 @@ def kodiRpcToTraktMediaObject(type: str, data: Dict, mode: str = "collected") ->
         if checkExclusion(data["file"]):
             return
 
+        # data is read twice, for the collected and the watched episodes
         if data["playcount"] is None:
             plays = 0
         else:
-            plays = data.pop("playcount")
+            plays = data["playcount"]
 
         if plays > 0:
             watched = 1
         else:
             watched = 0
 
-        episode = {
-            "season": data["season"],
-            "number": data["episode"],
-            "title": data["label"],
-            "ids": {"episodeid": data["episodeid"]},
-            "watched": watched,
-            "plays": plays,
-            "collected": 1,
-        }
+        episode = records.Episode(
+            season=data["season"],
+            number=data["episode"],
+            title=data["label"],
+            ids={"episodeid": data["episodeid"]},
+            watched=watched,
+            plays=plays,
+            collected=1,
+        )
 
         if "uniqueid" in data:
             if "tmdb" in data["uniqueid"]:
@@ -225,7 +365,7 @@ def kodiRpcToTraktMediaObject(type: str, data: Dict, mode: str = "collected") ->
         else:
             logger.debug("kodiRpcToTraktMediaObject(): No uniqueid found")
         del data["label"]
-        return data
+        return records.Movie.from_dict(data)
     else:
         logger.debug("kodiRpcToTraktMediaObject() No valid type")
         return
@@ -253,7 +393,7 @@ def kodiRpcToTraktMediaObjects(data: Dict, mode: str = "collected") -> Optional[
                 a_episodes[s_no].append(episodeObject)
 
         for episode in a_episodes:
-            seasons.append({"number": episode, "episodes": a_episodes[episode]})
+            seasons.append(records.Season(number=episode, episodes=a_episodes[episode]))
         return seasons
 
     elif "movies" in data:
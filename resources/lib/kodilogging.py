@@ -16,22 +16,57 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from resources.lib.kodiUtilities import getSettingAsBool
+from resources.lib.kodiUtilities import getSettingAsBool, settings
 
 import logging
+import reprlib
 import xbmc
 import xbmcaddon
+from collections.abc import Mapping
+from typing import Any
+
+
+class PayloadRepr(reprlib.Repr):
+    """Shortened reprs of the request bodies and show lists passed to the log."""
+
+    def __init__(self) -> None:
+        reprlib.Repr.__init__(self)
+        self.maxlevel = 4
+        self.maxdict = self.maxlist = self.maxtuple = self.maxset = 25
+        self.maxstring = self.maxother = 200
+
+    def repr1(self, x: Any, level: int) -> str:
+        # sync records are mappings, show them like the dicts they replace
+        if isinstance(x, Mapping) and not isinstance(x, dict):
+            x = dict(x)
+        return reprlib.Repr.repr1(self, x, level)
 
 
 class KodiLogHandler(logging.StreamHandler):
+    payloadRepr = PayloadRepr()
 
     def __init__(self) -> None:
         logging.StreamHandler.__init__(self)
-        addon_id = xbmcaddon.Addon().getAddonInfo('id')
+        addon_id = xbmcaddon.Addon().getAddonInfo("id")
         prefix = "[%s] " % addon_id
-        formatter = logging.Formatter(prefix + '%(name)s: %(message)s')
+        formatter = logging.Formatter(prefix + "%(name)s: %(message)s")
         self.setFormatter(formatter)
 
+    def summarize(self, arg: Any) -> Any:
+        if isinstance(arg, (Mapping, list, tuple, set)):
+            return self.payloadRepr.repr(arg)
+        return arg
+
+    def format(self, record: logging.LogRecord) -> str:
+        args = record.args
+        if args:
+            # logging unwraps a single mapping argument, "%s" still wants it whole
+            if isinstance(args, Mapping) and "%(" not in str(record.msg):
+                args = (args,)
+            if isinstance(args, tuple):
+                record.args = tuple(self.summarize(arg) for arg in args)
+        return logging.StreamHandler.format(self, record)
+
     def emit(self, record: logging.LogRecord) -> None:
         levels = {
             logging.CRITICAL: xbmc.LOGFATAL,
@@ -41,13 +76,21 @@ class KodiLogHandler(logging.StreamHandler):
             logging.DEBUG: xbmc.LOGDEBUG,
             logging.NOTSET: xbmc.LOGNONE,
         }
-        if getSettingAsBool('debug'):
-            xbmc.log(self.format(record), levels[record.levelno])
+        xbmc.log(self.format(record), levels[record.levelno])
 
     def flush(self) -> None:
         pass
 
+
+def setLevel() -> None:
+    # nothing is logged unless the debug setting is on, so with it off every
+    # logger call returns before its message is formatted
+    level = logging.DEBUG if getSettingAsBool("debug") else logging.CRITICAL + 1
+    logging.getLogger().setLevel(level)
+
+
 def config() -> None:
     logger = logging.getLogger()
     logger.addHandler(KodiLogHandler())
-    logger.setLevel(logging.DEBUG)
+    setLevel()
+    settings.subscribe(setLevel)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import threading
+import time
+from json import dumps, loads
+from typing import Dict, List, Tuple
+
+from resources.lib.records import to_json
+from resources.lib.sqlitequeue import SqliteQueue
+
+logger = logging.getLogger(__name__)
+
+
+# Writes that could not reach Trakt.tv, kept until they can be replayed.
+#
+# Every endpoint has its own queue, so the writes waiting for it are sent
+# together as one request whatever was queued in between, and a batch that
+# went through is dropped as a prefix of its queue. Entries carry a key of
+# their endpoint and body: queueing the same write again is ignored, and a
+# history entry gets the time it was queued as watched_at, so a replay
+# records the play when it happened rather than when it was sent.
+class Outbox(object):
+    paths = ("/sync/history", "/sync/ratings", "/sync/watchlist")
+    # bodies are merged by concatenating their lists of these
+    media_types = ("movies", "shows", "seasons", "episodes")
+    batch_size = 100
+    # seconds before the first retry, doubled by every failed one
+    backoff = 5
+    max_backoff = 15 * 60
+
+    queues: Dict[str, SqliteQueue]
+
+    def __init__(self) -> None:
+        self.queues = {
+            path: SqliteQueue("outbox%s.db" % path.replace("/", "_"))
+            for path in self.paths
+        }
+        self._lock = threading.Lock()
+        self._keys = set()
+        for queue in self.queues.values():
+            self._keys.update(entry["key"] for entry in queue)
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def put(self, path: str, body: Dict) -> bool:
+        if path not in self.queues:
+            return False
+        body = loads(dumps(body, default=to_json))
+        if path == "/sync/history":
+            watched_at = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+            for media_type in self.media_types:
+                for item in body.get(media_type, []):
+                    item.setdefault("watched_at", watched_at)
+        key = hashlib.sha1(
+            dumps([path, body], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            if key in self._keys:
+                logger.debug("Write to %s is already queued", path)
+                return True
+            self._keys.add(key)
+        logger.debug("Queuing write to %s for replay: %s", path, body)
+        self.queues[path].append({"key": key, "queued_at": time.time(), "body": body})
+        return True
+
+    def due(self) -> bool:
+        with self._lock:
+            return bool(self._keys) and time.time() >= self._retry_at
+
+    def wake(self) -> None:
+        """Retry right away, Trakt.tv was just reached."""
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+
+    def batches(self) -> List[Tuple[str, Dict, int]]:
+        """The next write of every endpoint with waiting entries, as
+        (path, merged body, number of entries merged)."""
+        batches = []
+        for path, queue in self.queues.items():
+            entries = queue.peek_many(self.batch_size)
+            if not entries:
+                continue
+            body = {}
+            for entry in entries:
+                for media_type, items in entry["body"].items():
+                    if media_type in self.media_types:
+                        body.setdefault(media_type, []).extend(items)
+            batches.append((path, body, len(entries)))
+        return batches
+
+    def sent(self, path: str, count: int) -> None:
+        queue = self.queues[path]
+        entries = queue.peek_many(count)
+        queue.discard(count)
+        with self._lock:
+            self._keys.difference_update(entry["key"] for entry in entries)
+
+    def failed(self) -> float:
+        """Back off before the next retry, returns the delay in seconds."""
+        with self._lock:
+            delay = min(self.backoff * 2**self._failures, self.max_backoff)
+            self._failures += 1
+            self._retry_at = time.time() + delay
+        return delay
+
+    def close(self) -> None:
+        for queue in self.queues.values():
+            queue.close()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Request priorities, lowest first: scrobbles of what is playing right now,
+# what the user just did (ratings, watchlist) and everything else, the sync.
+INTERACTIVE = 0
+USER_ACTION = 1
+BACKGROUND = 2
+
+
+class TokenBucket(object):
+    """Hands out ``rate`` tokens a second, holding at most ``capacity``.
+
+    Callers waiting for a token queue by priority, then in the order they
+    came: the next token always goes to the most urgent one, so a scrobble
+    is sent next whatever number of sync requests is already waiting.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._waiting: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        # _updated is in the future while paused, nothing accrues until then
+        if now > self._updated:
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+
+    def _wait_time(self, now: float) -> float:
+        wait = max(0.0, self._updated - now)
+        if self._tokens < 1:
+            wait += (1 - self._tokens) / self.rate
+        return wait
+
+    def acquire(self, priority: int = BACKGROUND) -> float:
+        """Wait for a token, returns the seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            # a more urgent caller takes over the head of the queue
+            self._cond.notify_all()
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiting[0] != ticket:
+                    self._cond.wait()
+                    continue
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    heapq.heappop(self._waiting)
+                    self._tokens -= 1
+                    self._cond.notify_all()
+                    return now - started
+                self._cond.wait(wait)
+
+    def remaining(self) -> int:
+        """Tokens that can be taken right now without waiting."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._updated or self._waiting:
+                return 0
+            return max(0, int(self._tokens))
+
+    def waiting(self) -> int:
+        with self._cond:
+            return len(self._waiting)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out nothing for ``seconds``, the server said so."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + seconds)
+            self._cond.notify_all()
+
+
+# Paces Trakt.tv requests under the API limits, so a large sync waits for
+# its turn instead of running into 429s. Reads and writes are limited
+# separately: GETs to 1000 per 5 minutes, POST, PUT and DELETE to one a
+# second. The GET bucket refills at 900 per 5 minutes so that its burst on
+# top never exceeds 1000 in any 5 minute window.
+class RateLimiter(object):
+    limits: Dict[str, Tuple[float, float]] = {
+        "GET": (900 / 300.0, 100),
+        "POST": (1.0, 1),
+    }
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        if limits is not None:
+            self.limits = limits
+        self.buckets = {
+            name: TokenBucket(rate, capacity)
+            for name, (rate, capacity) in self.limits.items()
+        }
+
+    def bucket(self, method: str) -> TokenBucket:
+        return self.buckets["GET" if method in ("GET", "HEAD") else "POST"]
+
+    def acquire(self, method: str, priority: int = BACKGROUND) -> float:
+        waited = self.bucket(method).acquire(priority)
+        if waited >= 1:
+            logger.debug("Waited %.1f seconds for Trakt %s budget", waited, method)
+        return waited
+
+    def remaining(self, method: str) -> int:
+        """Requests of this method that can be sent right now."""
+        return self.bucket(method).remaining()
+
+    def budget(self) -> Dict[str, int]:
+        return {name: bucket.remaining() for name, bucket in self.buckets.items()}
+
+    def pause(self, method: str, seconds: float) -> None:
+        self.bucket(method).pause(seconds)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+_unset = object()
+
+
+# Sync data is held in these records instead of plain dicts: every known key
+# is a slot, anything else goes to a small per-record dict that is only
+# created when needed. They read and write like the dicts they replace, so
+# the loaders and compare functions take either, and are turned back into
+# Trakt.tv JSON by to_json() when a request body is serialized.
+class Record(MutableMapping):
+    __slots__ = ("_extra",)
+
+    _fields = frozenset()
+    _nested = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+
+    def __init__(self, **values: Any) -> None:
+        self._extra = None
+        for key, value in values.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Record":
+        record = cls()
+        for key, value in data.items():
+            if key in cls._nested and isinstance(value, list):
+                value = [cls._nested[key].from_dict(item) for item in value]
+            record[key] = value
+        return record
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._fields:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._fields:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        if key in self:
+            return self[key]
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.__slots__:
+            if getattr(self, key, _unset) is not _unset:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def copy(self) -> "Record":
+        record = object.__new__(type(self))
+        for key in self.__slots__:
+            value = getattr(self, key, _unset)
+            if value is not _unset:
+                setattr(record, key, value)
+        record._extra = dict(self._extra) if self._extra else None
+        return record
+
+    def to_dict(self) -> Dict:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+class Episode(Record):
+    __slots__ = (
+        "season",
+        "number",
+        "title",
+        "ids",
+        "watched",
+        "plays",
+        "collected",
+        "watched_at",
+        "collected_at",
+        "last_watched_at",
+        "runtime",
+        "rating",
+        "rated_at",
+        "progress",
+        "paused_at",
+    )
+
+
+class Season(Record):
+    __slots__ = ("number", "episodes", "rating", "rated_at")
+    _nested = {"episodes": Episode}
+
+
+class Show(Record):
+    __slots__ = (
+        "title",
+        "year",
+        "ids",
+        "tvshowid",
+        "rating",
+        "rated_at",
+        "seasons",
+    )
+    _nested = {"seasons": Season}
+
+
+class Movie(Record):
+    __slots__ = (
+        "title",
+        "year",
+        "ids",
+        "movieid",
+        "runtime",
+        "watched",
+        "plays",
+        "collected",
+        "watched_at",
+        "collected_at",
+        "last_watched_at",
+        "rating",
+        "rated_at",
+        "userrating",
+        "progress",
+        "paused_at",
+        "in_watchlist",
+    )
+
+
+def to_json(obj: Any) -> Dict:
+    """``default`` hook for json.dumps, serializes records as their dicts."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError("Object of type %s is not JSON serializable" % type(obj).__name__)
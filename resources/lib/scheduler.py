@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class Phase(NamedTuple):
+    name: str
+    run: Callable[[], Any]
+    # phases whose results this one reads
+    requires: Sequence[str]
+    # phases on the same lane run one at a time, in the order they were added
+    lane: Optional[str]
+
+
+class Span(NamedTuple):
+    name: str
+    lane: Optional[str]
+    start: float
+    end: float
+
+
+# Runs the phases of a sync as soon as the phases they read from have
+# finished, on a few threads, so Kodi JSON-RPC writes go on while Trakt.tv
+# requests are in flight. Lanes keep the writes to one side in the order the
+# serial sync sent them. Nothing new is started once is_canceled() is true,
+# phases already running see the cancel through their own checks.
+class PhaseScheduler(object):
+    workers = 4
+
+    phases: List[Phase]
+    results: Dict[str, Any]
+    trace: List[Span]
+
+    def __init__(self, is_canceled: Callable[[], bool] = lambda: False) -> None:
+        self.is_canceled = is_canceled
+        self.phases = []
+        self.results = {}
+        self.trace = []
+        self.elapsed = 0.0
+
+    def add(
+        self,
+        name: str,
+        run: Callable[[], Any],
+        requires: Sequence[str] = (),
+        lane: Optional[str] = None,
+    ) -> None:
+        known = set(phase.name for phase in self.phases)
+        if name in known:
+            raise ValueError("Phase %s was already added" % name)
+        missing = [required for required in requires if required not in known]
+        if missing:
+            raise ValueError("Phase %s requires unknown %s" % (name, missing))
+        self.phases.append(Phase(name, run, tuple(requires), lane))
+
+    def _ready(self, phase: Phase, busy: set) -> bool:
+        return phase.lane not in busy and all(
+            required in self.results for required in phase.requires
+        )
+
+    def _run(self, phase: Phase, started: float) -> Any:
+        start = time.perf_counter()
+        try:
+            return phase.run()
+        finally:
+            end = time.perf_counter()
+            self.trace.append(
+                Span(phase.name, phase.lane, start - started, end - started)
+            )
+
+    def run(self) -> Dict[str, Any]:
+        """Run every phase, returns their results by name. The first phase
+        to raise stops the rest from starting and is raised again once the
+        running ones are done."""
+        pending = list(self.phases)
+        running = {}
+        error = None
+        started = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="trakt-sync"
+        ) as executor:
+            while pending or running:
+                if error is None and not self.is_canceled():
+                    busy = set(phase.lane for phase in running.values())
+                    busy.discard(None)
+                    for phase in list(pending):
+                        if len(running) < self.workers and self._ready(phase, busy):
+                            pending.remove(phase)
+                            if phase.lane is not None:
+                                busy.add(phase.lane)
+                            # phases see the context variables of the sync
+                            context = contextvars.copy_context()
+                            running[
+                                executor.submit(context.run, self._run, phase, started)
+                            ] = phase
+                else:
+                    pending = []
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase = running.pop(future)
+                    try:
+                        self.results[phase.name] = future.result()
+                    except Exception as e:
+                        if error is None:
+                            error = e
+        self.elapsed = time.perf_counter() - started
+        self.trace.sort(key=lambda span: span.start)
+        for span in self.trace:
+            logger.debug(
+                "[Sync] Phase %s (%s) ran from %.2fs to %.2fs",
+                span.name,
+                span.lane or "-",
+                span.start,
+                span.end,
+            )
+        logger.debug(
+            "[Sync] %d phases took %.2fs for %.2fs of work (%.1fx overlap)",
+            len(self.trace),
+            self.elapsed,
+            self.busy(),
+            self.overlap(),
+        )
+        if error is not None:
+            raise error
+        return self.results
+
+    def busy(self) -> float:
+        return sum(span.end - span.start for span in self.trace)
+
+    def overlap(self) -> float:
+        """Seconds of phase work per second of wall time, 1.0 when serial."""
+        if not self.elapsed:
+            return 1.0
+        return self.busy() / self.elapsed
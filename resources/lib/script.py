@@ -397,3 +397,5 @@ def run() -> None:
     if 'action' in data:
         logger.debug("Queuing for dispatch: %s" % data)
         q.append(data)
+        # the service reads the queue when told to, it does not poll it
+        kodiUtilities.notifyQueued()
@@ -66,8 +66,9 @@ class Scrobbler:
                 self.watchedTime = t
             else:
                 logger.debug(
-                    "Current playlist item changed! Not updating time! (%d -> %d)"
-                    % (self.playlistIndex, position)
+                    "Current playlist item changed! Not updating time! (%d -> %d)",
+                    self.playlistIndex,
+                    position,
                 )
 
             # do transition check every minute
@@ -82,14 +83,12 @@ class Scrobbler:
                     if self.curMPEpisode != epIndex:
                         response = self.__scrobble("stop")
                         if response is not None:
-                            logger.debug("Scrobble response: %s" % str(response))
+                            logger.debug("Scrobble response: %s", response)
                             self.videosToRate.append(self.curVideoInfo)
                             # update current information
                             self.curMPEpisode = epIndex
                             episode_details = kodiUtilities.getEpisodeDetailsFromKodi(
-                                self.curVideo["multi_episode_data"][
-                                    self.curMPEpisode
-                                ],
+                                self.curVideo["multi_episode_data"][self.curMPEpisode],
                                 [
                                     "showtitle",
                                     "season",
@@ -101,8 +100,10 @@ class Scrobbler:
                                 ],
                             )
                             if episode_details:
-                                self.curVideoInfo = kodiUtilities.kodiRpcToTraktMediaObject(
-                                    "episode", episode_details
+                                self.curVideoInfo = (
+                                    kodiUtilities.kodiRpcToTraktMediaObject(
+                                        "episode", episode_details
+                                    )
                                 )
                             else:
                                 self.curVideoInfo = None
@@ -117,7 +118,7 @@ class Scrobbler:
                     activePlayers = kodiUtilities.kodiJsonRequest(
                         {"jsonrpc": "2.0", "method": "Player.GetActivePlayers", "id": 1}
                     )
-                    logger.debug("Scrobble - activePlayers: %s" % activePlayers)
+                    logger.debug("Scrobble - activePlayers: %s", activePlayers)
                     playerId = int(activePlayers[0]["playerid"])
                     logger.debug("Scrobble - Doing Player.GetItem kodiJsonRequest")
                     result = kodiUtilities.kodiJsonRequest(
@@ -129,12 +130,12 @@ class Scrobbler:
                         }
                     )
                     if result:
-                        logger.debug("Scrobble - %s" % result)
+                        logger.debug("Scrobble - %s", result)
                         type, curVideo = kodiUtilities.getInfoLabelDetails(result)
                         if curVideo != self.curVideo:
                             response = self.__scrobble("stop")
                             if response is not None:
-                                logger.debug("Scrobble response: %s" % str(response))
+                                logger.debug("Scrobble response: %s", response)
                                 logger.debug("Scrobble PVR transition")
                                 # update current information
                                 self.curVideo = curVideo
@@ -152,8 +153,8 @@ class Scrobbler:
                                             "Scrobble Couldn't set curVideoInfo for movie type"
                                         )
                                     logger.debug(
-                                        "Scrobble Movie type, curVideoInfo: %s"
-                                        % self.curVideoInfo
+                                        "Scrobble Movie type, curVideoInfo: %s",
+                                        self.curVideoInfo,
                                     )
 
                                 elif utilities.isEpisode(self.curVideo["type"]):
@@ -182,20 +183,20 @@ class Scrobbler:
                                             }
 
                                         if "year" in self.curVideo:
-                                            self.traktShowSummary[
-                                                "year"
-                                            ] = self.curVideo["year"]
+                                            self.traktShowSummary["year"] = (
+                                                self.curVideo["year"]
+                                            )
                                 else:
                                     logger.debug(
                                         "Scrobble Couldn't set curVideoInfo/traktShowSummary for episode type"
                                     )
                                 logger.debug(
-                                    "Scrobble Episode type, curVideoInfo: %s"
-                                    % self.curVideoInfo
+                                    "Scrobble Episode type, curVideoInfo: %s",
+                                    self.curVideoInfo,
                                 )
                                 logger.debug(
-                                    "Scrobble Episode type, traktShowSummary: %s"
-                                    % self.traktShowSummary
+                                    "Scrobble Episode type, traktShowSummary: %s",
+                                    self.traktShowSummary,
                                 )
                                 response = self.__scrobble("start")
 
@@ -203,7 +204,7 @@ class Scrobbler:
                     self.__scrobble("start")
 
     def playbackStarted(self, data: Dict) -> None:
-        logger.debug("playbackStarted(data: %s)" % data)
+        logger.debug("playbackStarted(data: %s)", data)
         if not data:
             return
         self.curVideo = data
@@ -215,11 +216,11 @@ class Scrobbler:
             and "id" not in self.curVideo
             and "video_ids" not in self.curVideo
         ):
-            logger.debug("Aborting scrobble to avoid fallback: %s" % (self.curVideo))
+            logger.debug("Aborting scrobble to avoid fallback: %s", self.curVideo)
             return
 
         if "type" in self.curVideo:
-            logger.debug("Watching: %s" % self.curVideo["type"])
+            logger.debug("Watching: %s", self.curVideo["type"])
             if not xbmc.Player().isPlayingVideo():
                 logger.debug("Suddenly stopped watching item")
                 return
@@ -243,7 +244,7 @@ class Scrobbler:
                 else:
                     self.videoDuration = xbmc.Player().getTotalTime()
             except Exception as e:
-                logger.debug("Suddenly stopped watching item: %s" % str(e))
+                logger.debug("Suddenly stopped watching item: %s", e)
                 self.curVideo = None
                 return
 
@@ -287,7 +288,7 @@ class Scrobbler:
                     }
                 else:
                     logger.debug("Couldn't set curVideoInfo for movie type")
-                logger.debug("Movie type, curVideoInfo: %s" % self.curVideoInfo)
+                logger.debug("Movie type, curVideoInfo: %s", self.curVideoInfo)
 
             elif utilities.isEpisode(self.curVideo["type"]):
                 if "id" in self.curVideo:
@@ -304,7 +305,9 @@ class Scrobbler:
                         ],
                     )
                     if episodeDetailsKodi:
-                        title, year = utilities.regex_year(episodeDetailsKodi["showtitle"])
+                        title, year = utilities.regex_year(
+                            episodeDetailsKodi["showtitle"]
+                        )
                         if not year:
                             self.traktShowSummary = {
                                 "title": episodeDetailsKodi["showtitle"],
@@ -313,7 +316,9 @@ class Scrobbler:
                         else:
                             self.traktShowSummary = {"title": title, "year": year}
                         if "show_ids" in episodeDetailsKodi:
-                            self.traktShowSummary["ids"] = episodeDetailsKodi["show_ids"]
+                            self.traktShowSummary["ids"] = episodeDetailsKodi[
+                                "show_ids"
+                            ]
                         self.curVideoInfo = kodiUtilities.kodiRpcToTraktMediaObject(
                             "episode", episodeDetailsKodi
                         )
@@ -321,8 +326,8 @@ class Scrobbler:
                         self.curVideoInfo = None
                     if not self.curVideoInfo:  # getEpisodeDetailsFromKodi was empty
                         logger.debug(
-                            "Episode details from Kodi was empty, ID (%d) seems invalid, aborting further scrobbling of this episode."
-                            % self.curVideo["id"]
+                            "Episode details from Kodi was empty, ID (%d) seems invalid, aborting further scrobbling of this episode.",
+                            self.curVideo["id"],
                         )
                         self.curVideo = None
                         self.isPlaying = False
@@ -368,9 +373,10 @@ class Scrobbler:
                 ):
                     self.isMultiPartEpisode = True
 
-                logger.debug("Episode type, curVideoInfo: %s" % self.curVideoInfo)
+                logger.debug("Episode type, curVideoInfo: %s", self.curVideoInfo)
                 logger.debug(
-                    "Episode type, traktShowSummary: %s" % self.traktShowSummary
+                    "Episode type, traktShowSummary: %s",
+                    self.traktShowSummary,
                 )
 
             self.isPlaying = True
@@ -452,7 +458,7 @@ class Scrobbler:
                         "trakt",
                     )
                 }
-            logger.debug("Pre-Fetch result: %s; Info: %s" % (result, self.curVideoInfo))
+            logger.debug("Pre-Fetch result: %s; Info: %s", result, self.curVideoInfo)
 
     def playbackResumed(self) -> None:
         if not self.isPlaying or self.isPVR:
@@ -461,7 +467,7 @@ class Scrobbler:
         logger.debug("playbackResumed()")
         if self.isPaused:
             p = time.time() - self.pausedAt
-            logger.debug("Resumed after: %s" % str(p))
+            logger.debug("Resumed after: %s", p)
             self.pausedAt = 0
             self.isPaused = False
             self.__scrobble("start")
@@ -471,7 +477,7 @@ class Scrobbler:
             return
 
         logger.debug("playbackPaused()")
-        logger.debug("Paused after: %s" % str(self.watchedTime))
+        logger.debug("Paused after: %s", self.watchedTime)
         self.isPaused = True
         self.pausedAt = time.time()
         self.__scrobble("pause")
@@ -535,19 +541,22 @@ class Scrobbler:
             )
             if response is not None:
                 self.__scrobbleNotification(response)
-                logger.debug("Scrobble response: %s" % str(response))
+                logger.debug("Scrobble response: %s", response)
                 return response
             else:
                 logger.debug(
-                    "Failed to scrobble movie: %s | %s | %s"
-                    % (self.curVideoInfo, watchedPercent, status)
+                    "Failed to scrobble movie: %s | %s | %s",
+                    self.curVideoInfo,
+                    watchedPercent,
+                    status,
                 )
 
         elif utilities.isEpisode(self.curVideo["type"]) and scrobbleEpisodeOption:
             if self.isMultiPartEpisode:
                 logger.debug(
-                    "Multi-part episode, scrobbling part %d of %d."
-                    % (self.curMPEpisode + 1, self.curVideo["multi_episode_count"])
+                    "Multi-part episode, scrobbling part %d of %d.",
+                    self.curMPEpisode + 1,
+                    self.curVideo["multi_episode_count"],
                 )
                 adjustedDuration = int(
                     self.videoDuration / self.curVideo["multi_episode_count"]
@@ -558,9 +567,10 @@ class Scrobbler:
                 ) * 100
 
             logger.debug(
-                "scrobble sending show object: %s" % str(self.traktShowSummary)
+                "scrobble sending show object: %s",
+                self.traktShowSummary,
             )
-            logger.debug("scrobble sending episode object: %s" % str(self.curVideoInfo))
+            logger.debug("scrobble sending episode object: %s", self.curVideoInfo)
             response = self.traktapi.scrobbleEpisode(
                 self.traktShowSummary, self.curVideoInfo, watchedPercent, status
             )
@@ -573,7 +583,8 @@ class Scrobbler:
                 # but rather an alternative title. To handle this case, call the Trakt search function.
                 if response is None:
                     logger.debug(
-                        "Searching for show title: %s" % self.traktShowSummary["title"]
+                        "Searching for show title: %s",
+                        self.traktShowSummary["title"],
                     )
                     # This text query API is basically the same as searching on the website. Works with alternative
                     # titles, unlike the scrobble function.
@@ -584,15 +595,16 @@ class Scrobbler:
                         logger.debug("Empty Response from getTextQuery, giving up")
                     else:
                         logger.debug(
-                            "Got Response from getTextQuery: %s" % str(newResp)
+                            "Got Response from getTextQuery: %s",
+                            newResp,
                         )
                         # We got something back. Have to assume the first show found is the right one; if there's more than
                         # one, there's no way to know which to use. Pull the primary title from the response (and the year,
                         # just because it's there).
                         showObj = {"title": newResp[0].title, "year": newResp[0].year}
                         logger.debug(
-                            "scrobble sending getTextQuery first show object: %s"
-                            % str(showObj)
+                            "scrobble sending getTextQuery first show object: %s",
+                            showObj,
                         )
                         # Now we can attempt the scrobble again, using the primary title this time.
                         response = self.traktapi.scrobbleEpisode(
@@ -605,23 +617,24 @@ class Scrobbler:
                     self.curVideoInfo["title"], response["episode"]["title"], 50.0
                 ):
                     logger.debug(
-                        "scrobble sending incorrect scrobbleEpisode stopping: %sx%s - %s != %s"
-                        % (
-                            self.curVideoInfo["season"],
-                            self.curVideoInfo["number"],
-                            self.curVideoInfo["title"],
-                            response["episode"]["title"],
-                        )
+                        "scrobble sending incorrect scrobbleEpisode stopping: %sx%s - %s != %s",
+                        self.curVideoInfo["season"],
+                        self.curVideoInfo["number"],
+                        self.curVideoInfo["title"],
+                        response["episode"]["title"],
                     )
                     self.stopScrobbler = True
 
                 self.__scrobbleNotification(response)
-                logger.debug("Scrobble response: %s" % str(response))
+                logger.debug("Scrobble response: %s", response)
                 return response
             else:
                 logger.debug(
-                    "Failed to scrobble episode: %s | %s | %s | %s"
-                    % (self.traktShowSummary, self.curVideoInfo, watchedPercent, status)
+                    "Failed to scrobble episode: %s | %s | %s | %s",
+                    self.traktShowSummary,
+                    self.curVideoInfo,
+                    watchedPercent,
+                    status,
                 )
 
     def __scrobbleNotification(self, info: Dict) -> None:
@@ -26,18 +26,41 @@ class traktService:
     scrobbler: Optional[Scrobbler] = None
     updateTagsThread: Optional[threading.Thread] = None
     syncThread: Optional[threading.Thread] = None
+    dispatchThread: Optional[threading.Thread] = None
     dispatchQueue: sqlitequeue.SqliteQueue = sqlitequeue.SqliteQueue()
 
     def __init__(self) -> None:
         threading.Thread.name = "trakt"
+        # dispatching and the playback transition checks share the scrobbler
+        self.dispatchLock = threading.Lock()
+        self.stopping = threading.Event()
 
     def _dispatchQueue(self, data: Dict) -> None:
-        logger.debug("Queuing for dispatch: %s" % data)
+        logger.debug("Queuing for dispatch: %s", data)
         self.dispatchQueue.append(data)
 
+    def _dispatchLoop(self) -> None:
+        while not self.stopping.is_set():
+            data = self.dispatchQueue.get(timeout=1)
+            if data is None:
+                self._flushOutbox()
+                continue
+            logger.debug("Queued dispatch: %s", data)
+            with self.dispatchLock:
+                self._dispatch(data)
+
+    def _flushOutbox(self) -> None:
+        # replay the writes kept while Trakt.tv could not be reached, once
+        # their backoff has passed
+        try:
+            globals.traktapi.flushOutbox()
+        except Exception as ex:
+            message = utilities.createError(ex)
+            logger.fatal(message)
+
     def _dispatch(self, data: Dict) -> None:
         try:
-            logger.debug("Dispatch: %s" % data)
+            logger.debug("Dispatch: %s", data)
             action = data["action"]
             if action == "started":
                 del data["action"]
@@ -85,7 +108,7 @@ class traktService:
                 # init traktapi class
                 globals.traktapi = traktAPI(True)
             else:
-                logger.debug("Unknown dispatch action, '%s'." % action)
+                logger.debug("Unknown dispatch action, '%s'.", action)
         except Exception as ex:
             message = utilities.createError(ex)
             logger.fatal(message)
@@ -93,7 +116,7 @@ class traktService:
     def run(self) -> None:
         startup_delay = kodiUtilities.getSettingAsInt("startup_delay")
         if startup_delay:
-            logger.debug("Delaying startup by %d seconds." % startup_delay)
+            logger.debug("Delaying startup by %d seconds.", startup_delay)
             xbmc.sleep(startup_delay * 1000)
 
         logger.debug("Service thread starting.")
@@ -103,7 +126,9 @@ class traktService:
 
         # setup event driven classes
         self.Player = traktPlayer(action=self._dispatchQueue)
-        self.Monitor = traktMonitor(action=self._dispatchQueue)
+        self.Monitor = traktMonitor(
+            action=self._dispatchQueue, queued=self.dispatchQueue.wake
+        )
 
         # init traktapi class
         globals.traktapi = traktAPI()
@@ -114,15 +139,17 @@ class traktService:
         # init scrobbler class
         self.scrobbler = Scrobbler(globals.traktapi)
 
+        # dispatch events as soon as they are queued
+        self.dispatchThread = threading.Thread(
+            target=self._dispatchLoop, name="trakt-dispatch"
+        )
+        self.dispatchThread.start()
+
         # start loop for events
         while not self.Monitor.abortRequested():
-            while len(self.dispatchQueue) and (not self.Monitor.abortRequested()):
-                data = self.dispatchQueue.get()
-                logger.debug("Queued dispatch: %s" % data)
-                self._dispatch(data)
-
             if xbmc.Player().isPlayingVideo():
-                self.scrobbler.transitionCheck()
+                with self.dispatchLock:
+                    self.scrobbler.transitionCheck()
 
             if self.Monitor.waitForAbort(1):
                 # Abort was requested while waiting. We should exit
@@ -131,6 +158,10 @@ class traktService:
         # we are shutting down
         logger.debug("Beginning shut down.")
 
+        self.stopping.set()
+        self.dispatchThread.join()
+        self.dispatchQueue.close()
+
         # delete player/monitor
         del self.Player
         del self.Monitor
@@ -139,6 +170,9 @@ class traktService:
         if self.syncThread.is_alive():
             self.syncThread.join()
 
+        if globals.traktapi.outbox is not None:
+            globals.traktapi.outbox.close()
+
     def doManualRating(self, data: Dict) -> None:
         action = data["action"]
         media_type = data["media_type"]
@@ -146,8 +180,9 @@ class traktService:
 
         if not utilities.isValidMediaType(media_type):
             logger.debug(
-                "doManualRating(): Invalid media type '%s' passed for manual %s."
-                % (media_type, action)
+                "doManualRating(): Invalid media type '%s' passed for manual %s.",
+                media_type,
+                action,
             )
             return
 
@@ -157,16 +192,22 @@ class traktService:
 
         if "video_ids" in data:
             logger.debug(
-                "Getting data for manual %s of %s: video_ids: |%s| dbid: |%s|"
-                % (action, media_type, data.get("video_ids"), data.get("dbid"))
+                "Getting data for manual %s of %s: video_ids: |%s| dbid: |%s|",
+                action,
+                media_type,
+                data.get("video_ids"),
+                data.get("dbid"),
             )
 
             best_id, id_type = utilities.best_id(data["video_ids"], media_type)
 
         else:
             logger.debug(
-                "Getting data for manual %s of %s: video_id: |%s| dbid: |%s|"
-                % (action, media_type, data.get("video_id"), data.get("dbid"))
+                "Getting data for manual %s of %s: video_id: |%s| dbid: |%s|",
+                action,
+                media_type,
+                data.get("video_id"),
+                data.get("dbid"),
             )
 
             temp_ids, id_type = utilities.guessBestTraktId(
@@ -176,8 +217,9 @@ class traktService:
 
         if not id_type:
             logger.debug(
-                "doManualRating(): Unrecognized id_type: |%s|-|%s|."
-                % (media_type, best_id)
+                "doManualRating(): Unrecognized id_type: |%s|-|%s|.",
+                media_type,
+                best_id,
             )
             return
 
@@ -185,7 +227,9 @@ class traktService:
 
         if not ids:
             logger.debug(
-                "doManualRating(): No Results for: |%s|-|%s|." % (media_type, best_id)
+                "doManualRating(): No Results for: |%s|-|%s|.",
+                media_type,
+                best_id,
             )
             return
 
@@ -245,10 +289,11 @@ class traktService:
             if summaryInfo:
                 s = utilities.getFormattedItemName(media_type, summaryInfo)
                 logger.debug(
-                    "doAddToWatchlist(): '%s' trying to add to users watchlist." % s
+                    "doAddToWatchlist(): '%s' trying to add to users watchlist.",
+                    s,
                 )
                 params = {"movies": [summaryInfo]}
-                logger.debug("doAddToWatchlist(): %s" % str(params))
+                logger.debug("doAddToWatchlist(): %s", params)
 
                 result = globals.traktapi.addToWatchlist(params)
                 if result:
@@ -269,7 +314,7 @@ class traktService:
                     }
                 ]
             }
-            logger.debug("doAddToWatchlist(): %s" % str(summaryInfo))
+            logger.debug("doAddToWatchlist(): %s", summaryInfo)
             s = utilities.getFormattedItemName(media_type, data)
 
             result = globals.traktapi.addToWatchlist(summaryInfo)
@@ -284,8 +329,9 @@ class traktService:
             s = utilities.getFormattedItemName(media_type, data)
 
             logger.debug(
-                "doAddToWatchlist(): '%s - Season %d' trying to add to users watchlist."
-                % (data["ids"], data["season"])
+                "doAddToWatchlist(): '%s - Season %d' trying to add to users watchlist.",
+                data["ids"],
+                data["season"],
             )
 
             result = globals.traktapi.addToWatchlist(summaryInfo)
@@ -296,7 +342,7 @@ class traktService:
         elif utilities.isShow(media_type):
             summaryInfo = {"shows": [{"ids": data["ids"]}]}
             s = utilities.getFormattedItemName(media_type, data)
-            logger.debug("doAddToWatchlist(): %s" % str(summaryInfo))
+            logger.debug("doAddToWatchlist(): %s", summaryInfo)
 
             result = globals.traktapi.addToWatchlist(summaryInfo)
             if result:
@@ -315,11 +361,11 @@ class traktService:
                 if not summaryInfo["watched"]:
                     s = utilities.getFormattedItemName(media_type, summaryInfo)
                     logger.debug(
-                        "doMarkWatched(): '%s' is not watched on Trakt, marking it as watched."
-                        % s
+                        "doMarkWatched(): '%s' is not watched on Trakt, marking it as watched.",
+                        s,
                     )
                     params = {"movies": [summaryInfo]}
-                    logger.debug("doMarkWatched(): %s" % str(params))
+                    logger.debug("doMarkWatched(): %s", params)
 
                     result = globals.traktapi.addToHistory(params)
                     if result:
@@ -340,7 +386,7 @@ class traktService:
                     }
                 ]
             }
-            logger.debug("doMarkWatched(): %s" % str(summaryInfo))
+            logger.debug("doMarkWatched(): %s", summaryInfo)
             s = utilities.getFormattedItemName(media_type, data)
 
             result = globals.traktapi.addToHistory(summaryInfo)
@@ -362,12 +408,10 @@ class traktService:
                 summaryInfo["shows"][0]["seasons"][0]["episodes"].append({"number": ep})
 
             logger.debug(
-                "doMarkWatched(): '%s - Season %d' has %d episode(s) that are going to be marked as watched."
-                % (
-                    data["id"],
-                    data["season"],
-                    len(summaryInfo["shows"][0]["seasons"][0]["episodes"]),
-                )
+                "doMarkWatched(): '%s - Season %d' has %d episode(s) that are going to be marked as watched.",
+                data["id"],
+                data["season"],
+                len(summaryInfo["shows"][0]["seasons"][0]["episodes"]),
             )
 
             self.addEpisodesToHistory(summaryInfo, s)
@@ -376,7 +420,7 @@ class traktService:
             summaryInfo = {"shows": [{"ids": data["ids"], "seasons": []}]}
             if summaryInfo:
                 s = utilities.getFormattedItemName(media_type, data)
-                logger.debug("data: %s" % data)
+                logger.debug("data: %s", data)
                 for season in data["seasons"]:
                     episodeJson = []
                     for episode in data["seasons"][season]:
@@ -389,7 +433,7 @@ class traktService:
 
     def addEpisodesToHistory(self, summaryInfo: Dict, s: str) -> None:
         if len(summaryInfo["shows"][0]["seasons"][0]["episodes"]) > 0:
-            logger.debug("doMarkWatched(): %s" % str(summaryInfo))
+            logger.debug("doMarkWatched(): %s", summaryInfo)
 
             result = globals.traktapi.addToHistory(summaryInfo)
             if result:
@@ -400,7 +444,9 @@ class traktService:
             else:
                 kodiUtilities.notification(kodiUtilities.getString(32114), s)
 
-    def doSync(self, manual: bool = False, silent: bool = False, library: str = "all") -> None:
+    def doSync(
+        self, manual: bool = False, silent: bool = False, library: str = "all"
+    ) -> None:
         self.syncThread = syncThread(manual, silent, library)
         self.syncThread.start()
 
@@ -410,7 +456,9 @@ class syncThread(threading.Thread):
     _runSilent: bool = False
     _library: str = "all"
 
-    def __init__(self, isManual: bool = False, runSilent: bool = False, library: str = "all") -> None:
+    def __init__(
+        self, isManual: bool = False, runSilent: bool = False, library: str = "all"
+    ) -> None:
         threading.Thread.__init__(self)
         self.name = "trakt-sync"
         self._isManual = isManual
@@ -433,11 +481,24 @@ class traktMonitor(xbmc.Monitor):
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.action = kwargs["action"]
+        # rows a script appended to the dispatch queue are read when it says so
+        self.queued = kwargs["queued"]
         # xbmc.getCondVisibility('Library.IsScanningVideo') returns false when cleaning during update...
         self.scanning_video = False
         logger.debug("[traktMonitor] Initalized.")
 
+    def onSettingsChanged(self) -> None:
+        logger.debug("[traktMonitor] onSettingsChanged()")
+        kodiUtilities.settings.refresh()
+
     def onNotification(self, sender: str, method: str, data: str) -> None:
+        if (
+            sender == kodiUtilities.QUEUED_SENDER
+            and method == "Other.%s" % kodiUtilities.QUEUED_MESSAGE
+        ):
+            self.queued()
+            return
+
         # method looks like Other.NEXTUPWATCHEDSIGNAL
         if "." not in method or method.split(".")[1].upper() != "NEXTUPWATCHEDSIGNAL":
             return
@@ -450,7 +511,7 @@ class traktMonitor(xbmc.Monitor):
     def onScanFinished(self, database: str) -> None:
         if database == "video":
             self.scanning_video = False
-            logger.debug("[traktMonitor] onScanFinished(database: %s)" % database)
+            logger.debug("[traktMonitor] onScanFinished(database: %s)", database)
             data = {"action": "scanFinished"}
             self.action(data)
 
@@ -459,7 +520,8 @@ class traktMonitor(xbmc.Monitor):
         if database == "video":
             self.scanning_video = True
             logger.debug(
-                "[traktMonitor] onDatabaseScanStarted(database: %s)" % database
+                "[traktMonitor] onDatabaseScanStarted(database: %s)",
+                database,
             )
 
     def onCleanFinished(self, database: str) -> None:
@@ -509,7 +571,8 @@ class traktPlayer(xbmc.Player):
                 {"jsonrpc": "2.0", "method": "Player.GetActivePlayers", "id": 1}
             )
             logger.debug(
-                "[traktPlayer] onAVStarted() - activePlayers: %s" % activePlayers
+                "[traktPlayer] onAVStarted() - activePlayers: %s",
+                activePlayers,
             )
             playerId = int(activePlayers[0]["playerid"])
             logger.debug(
@@ -527,7 +590,7 @@ class traktPlayer(xbmc.Player):
                 }
             )
             if result:
-                logger.debug("[traktPlayer] onAVStarted() - %s" % result)
+                logger.debug("[traktPlayer] onAVStarted() - %s", result)
                 # check for exclusion
                 _filename = None
                 try:
@@ -541,15 +604,15 @@ class traktPlayer(xbmc.Player):
                 custom_proprties = result["item"].get("customproperties")
                 if custom_proprties and "script.trakt.exclude" in custom_proprties:
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - '%s' has exclusion property, ignoring."
-                        % _filename
+                        "[traktPlayer] onAVStarted() - '%s' has exclusion property, ignoring.",
+                        _filename,
                     )
                     return
 
                 if kodiUtilities.checkExclusion(_filename):
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - '%s' is in exclusion settings, ignoring."
-                        % _filename
+                        "[traktPlayer] onAVStarted() - '%s' is in exclusion settings, ignoring.",
+                        _filename,
                     )
                     return
 
@@ -591,7 +654,7 @@ class traktPlayer(xbmc.Player):
                             }
                         )
                         if result:
-                            logger.debug("[traktPlayer] onAVStarted() - %s" % result)
+                            logger.debug("[traktPlayer] onAVStarted() - %s", result)
                             tvshowid = int(result["episodedetails"]["tvshowid"])
                             season = int(result["episodedetails"]["season"])
                             currentfile = result["episodedetails"]["file"]
@@ -611,7 +674,8 @@ class traktPlayer(xbmc.Player):
                             )
                             if result:
                                 logger.debug(
-                                    "[traktPlayer] onAVStarted() - %s" % result
+                                    "[traktPlayer] onAVStarted() - %s",
+                                    result,
                                 )
                                 # make sure episodes array exists in results
                                 if "episodes" in result:
@@ -659,28 +723,28 @@ class traktPlayer(xbmc.Player):
                     # IDs to feed to the scrobbler. Still, much easier than previous versions!
                     foundShowName = xbmc.getInfoLabel("VideoPlayer.Title")
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Title: %s"
-                        % foundShowName
+                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Title: %s",
+                        foundShowName,
                     )
                     foundEpisodeName = xbmc.getInfoLabel("VideoPlayer.EpisodeName")
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Found VideoPlayer.EpisodeName: %s"
-                        % foundEpisodeName
+                        "[traktPlayer] onAVStarted() - Found VideoPlayer.EpisodeName: %s",
+                        foundEpisodeName,
                     )
                     foundEpisodeYear = xbmc.getInfoLabel("VideoPlayer.Year")
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Year: %s"
-                        % foundEpisodeYear
+                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Year: %s",
+                        foundEpisodeYear,
                     )
                     foundSeason = xbmc.getInfoLabel("VideoPlayer.Season")
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Season: %s"
-                        % foundSeason
+                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Season: %s",
+                        foundSeason,
                     )
                     foundEpisode = xbmc.getInfoLabel("VideoPlayer.Episode")
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Episode: %s"
-                        % foundEpisode
+                        "[traktPlayer] onAVStarted() - Found VideoPlayer.Episode: %s",
+                        foundEpisode,
                     )
                     if foundShowName and foundEpisodeName and foundEpisodeYear:
                         # If the show/episode/year are populated, we can skip all the mess of trying to extract the info from the
@@ -703,17 +767,17 @@ class traktPlayer(xbmc.Player):
                             xbmc.getInfoLabel("Player.Filename")
                         )
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - Found unknown video type with label: %s. Might be a PVR episode, searching Trakt for it."
-                            % foundLabel
+                            "[traktPlayer] onAVStarted() - Found unknown video type with label: %s. Might be a PVR episode, searching Trakt for it.",
+                            foundLabel,
                         )
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - After urllib.unquote: %s."
-                            % foundLabel
+                            "[traktPlayer] onAVStarted() - After urllib.unquote: %s.",
+                            foundLabel,
                         )
                         splitLabel = foundLabel.rsplit(", ", 3)
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - Post-split of label: %s "
-                            % splitLabel
+                            "[traktPlayer] onAVStarted() - Post-split of label: %s ",
+                            splitLabel,
                         )
                         if len(splitLabel) != 4:
                             logger.debug(
@@ -721,8 +785,8 @@ class traktPlayer(xbmc.Player):
                             )
                             splitLabel = foundLabel.rsplit(", ", 2)
                             logger.debug(
-                                "[traktPlayer] onAVStarted() - Post-split of label: %s "
-                                % splitLabel
+                                "[traktPlayer] onAVStarted() - Post-split of label: %s ",
+                                splitLabel,
                             )
                             if len(splitLabel) != 3:
                                 logger.debug(
@@ -731,15 +795,15 @@ class traktPlayer(xbmc.Player):
                                 return
                         foundShowAndEpInfo = splitLabel[0]
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - show plus episode info: %s"
-                            % foundShowAndEpInfo
+                            "[traktPlayer] onAVStarted() - show plus episode info: %s",
+                            foundShowAndEpInfo,
                         )
                         splitShowAndEpInfo = re.split(
                             r" (s\d\de\d\d)? ?\((\d\d\d\d)\) ", foundShowAndEpInfo, 1
                         )
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - Post-split of show plus episode info: %s "
-                            % splitShowAndEpInfo
+                            "[traktPlayer] onAVStarted() - Post-split of show plus episode info: %s ",
+                            splitShowAndEpInfo,
                         )
                         if len(splitShowAndEpInfo) != 4:
                             logger.debug(
@@ -748,18 +812,18 @@ class traktPlayer(xbmc.Player):
                             return
                         foundShowName = splitShowAndEpInfo[0]
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - using show name: %s"
-                            % foundShowName
+                            "[traktPlayer] onAVStarted() - using show name: %s",
+                            foundShowName,
                         )
                         foundEpisodeName = splitShowAndEpInfo[3]
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - using episode name: %s"
-                            % foundEpisodeName
+                            "[traktPlayer] onAVStarted() - using episode name: %s",
+                            foundEpisodeName,
                         )
                         foundEpisodeYear = splitShowAndEpInfo[2]
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - using episode year: %s"
-                            % foundEpisodeYear
+                            "[traktPlayer] onAVStarted() - using episode year: %s",
+                            foundEpisodeYear,
                         )
                     epYear = None
                     try:
@@ -767,8 +831,8 @@ class traktPlayer(xbmc.Player):
                     except ValueError:
                         epYear = None
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - verified episode year: %d"
-                        % epYear
+                        "[traktPlayer] onAVStarted() - verified episode year: %d",
+                        epYear,
                     )
                     # All right, now we have the show name, episode name, and (maybe) episode year. All good, but useless for
                     # scrobbling since Trakt only understands IDs, not names.
@@ -787,8 +851,8 @@ class traktPlayer(xbmc.Player):
                         )
                     else:
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - Got Response from getTextQuery: %s"
-                            % str(newResp)
+                            "[traktPlayer] onAVStarted() - Got Response from getTextQuery: %s",
+                            newResp,
                         )
                         # We got something back. See if one of the returned values is for the show we're looking for. Often it's
                         # not, but since there's no way to tell the search which show we want, this is all we can do.
@@ -796,8 +860,8 @@ class traktPlayer(xbmc.Player):
                         for thisResp in newResp:
                             compareShowName = thisResp.show.title
                             logger.debug(
-                                "[traktPlayer] onAVStarted() - comparing show name: %s"
-                                % compareShowName
+                                "[traktPlayer] onAVStarted() - comparing show name: %s",
+                                compareShowName,
                             )
                             if thisResp.show.title == foundShowName:
                                 logger.debug(
@@ -830,8 +894,8 @@ class traktPlayer(xbmc.Player):
                         # titles, unlike the scrobble function. Though we can't use the episode year since that would only
                         # match the show if we're dealing with season 1.
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - Searching for show title via getTextQuery: %s"
-                            % foundShowName
+                            "[traktPlayer] onAVStarted() - Searching for show title via getTextQuery: %s",
+                            foundShowName,
                         )
                         newResp = globals.traktapi.getTextQuery(
                             foundShowName, "show", None
@@ -842,8 +906,8 @@ class traktPlayer(xbmc.Player):
                             )
                         else:
                             logger.debug(
-                                "[traktPlayer] onAVStarted() - Got Show Response from getTextQuery: %s"
-                                % str(newResp)
+                                "[traktPlayer] onAVStarted() - Got Show Response from getTextQuery: %s",
+                                newResp,
                             )
                             # We got something back. Have to assume the first show found is the right one; if there's more than
                             # one, there's no way to know which to use. Pull the ids from the show data, and store 'em for scrobbling.
@@ -871,14 +935,14 @@ class traktPlayer(xbmc.Player):
                                 else:
                                     # Got the list back. Go through each season.
                                     logger.debug(
-                                        "[traktPlayer] onAVStarted() - Got response with seasons: %s"
-                                        % str(epQueryResp)
+                                        "[traktPlayer] onAVStarted() - Got response with seasons: %s",
+                                        epQueryResp,
                                     )
                                     for eachSeason in epQueryResp:
                                         # For each season, check each episode.
                                         logger.debug(
-                                            "[traktPlayer] onAVStarted() - Processing season: %s"
-                                            % str(eachSeason)
+                                            "[traktPlayer] onAVStarted() - Processing season: %s",
+                                            eachSeason,
                                         )
                                         for eachEpisodeNumber in eachSeason.episodes:
                                             thisEpTitle = None
@@ -890,8 +954,9 @@ class traktPlayer(xbmc.Player):
                                             except:  # noqa: E722
                                                 thisEpTitle = None
                                             logger.debug(
-                                                "[traktPlayer] onAVStarted() - Checking episode number %d with title %s"
-                                                % (eachEpisodeNumber, thisEpTitle)
+                                                "[traktPlayer] onAVStarted() - Checking episode number %d with title %s",
+                                                eachEpisodeNumber,
+                                                thisEpTitle,
                                             )
                                             if foundEpisodeName == thisEpTitle:
                                                 # Found it! Save the data. The scrobbler wants season and episode number. Which for some
@@ -912,8 +977,10 @@ class traktPlayer(xbmc.Player):
                     if data["season"]:
                         # OK, that's everything. Data should be all set for scrobbling.
                         logger.debug(
-                            "[traktPlayer] onAVStarted() - Playing a non-library 'episode' : show trakt key %s, season: %d, episode: %d"
-                            % (data["video_ids"], data["season"], data["episode"])
+                            "[traktPlayer] onAVStarted() - Playing a non-library 'episode' : show trakt key %s, season: %d, episode: %d",
+                            data["video_ids"],
+                            data["season"],
+                            data["episode"],
                         )
                     else:
                         # Still no data? Too bad, have to give up.
@@ -923,8 +990,8 @@ class traktPlayer(xbmc.Player):
                         return
                 else:
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Video type '%s' unrecognized, skipping."
-                        % self.type
+                        "[traktPlayer] onAVStarted() - Video type '%s' unrecognized, skipping.",
+                        self.type,
                     )
                     return
 
@@ -939,8 +1006,9 @@ class traktPlayer(xbmc.Player):
                         self.onPlayBackEnded()
                     self.plIndex = pos
                     logger.debug(
-                        "[traktPlayer] onAVStarted() - Playlist contains %d item(s), and is currently on item %d"
-                        % (plSize, (pos + 1))
+                        "[traktPlayer] onAVStarted() - Playlist contains %d item(s), and is currently on item %d",
+                        plSize,
+                        pos + 1,
                     )
 
                 self._playing = True
@@ -953,7 +1021,7 @@ class traktPlayer(xbmc.Player):
         xbmcgui.Window(10000).clearProperty("script.trakt.ids")
         xbmcgui.Window(10000).clearProperty("script.trakt.paused")
         if self._playing:
-            logger.debug("[traktPlayer] onPlayBackEnded() - %s" % self.isPlayingVideo())
+            logger.debug("[traktPlayer] onPlayBackEnded() - %s", self.isPlayingVideo())
             self._playing = False
             self.plIndex = None
             data = {"action": "ended"}
@@ -965,7 +1033,8 @@ class traktPlayer(xbmc.Player):
         xbmcgui.Window(10000).clearProperty("script.trakt.paused")
         if self._playing:
             logger.debug(
-                "[traktPlayer] onPlayBackStopped() - %s" % self.isPlayingVideo()
+                "[traktPlayer] onPlayBackStopped() - %s",
+                self.isPlayingVideo(),
             )
             self._playing = False
             self.plIndex = None
@@ -976,7 +1045,8 @@ class traktPlayer(xbmc.Player):
     def onPlayBackPaused(self) -> None:
         if self._playing:
             logger.debug(
-                "[traktPlayer] onPlayBackPaused() - %s" % self.isPlayingVideo()
+                "[traktPlayer] onPlayBackPaused() - %s",
+                self.isPlayingVideo(),
             )
             data = {"action": "paused"}
             self.action(data)
@@ -985,7 +1055,8 @@ class traktPlayer(xbmc.Player):
     def onPlayBackResumed(self) -> None:
         if self._playing:
             logger.debug(
-                "[traktPlayer] onPlayBackResumed() - %s" % self.isPlayingVideo()
+                "[traktPlayer] onPlayBackResumed() - %s",
+                self.isPlayingVideo(),
             )
             data = {"action": "resumed"}
             self.action(data)
@@ -993,22 +1064,25 @@ class traktPlayer(xbmc.Player):
     # called when user queues the next item
     def onQueueNextItem(self) -> None:
         if self._playing:
-            logger.debug("[traktPlayer] onQueueNextItem() - %s" % self.isPlayingVideo())
+            logger.debug("[traktPlayer] onQueueNextItem() - %s", self.isPlayingVideo())
 
     # called when players speed changes. (eg. user FF/RW)
     def onPlayBackSpeedChanged(self, speed: int) -> None:
         if self._playing:
             logger.debug(
-                "[traktPlayer] onPlayBackSpeedChanged(speed: %s) - %s"
-                % (str(speed), self.isPlayingVideo())
+                "[traktPlayer] onPlayBackSpeedChanged(speed: %s) - %s",
+                speed,
+                self.isPlayingVideo(),
             )
 
     # called when user seeks to a time
     def onPlayBackSeek(self, time: int, offset: int) -> None:
         if self._playing:
             logger.debug(
-                "[traktPlayer] onPlayBackSeek(time: %s, offset: %s) - %s"
-                % (str(time), str(offset), self.isPlayingVideo())
+                "[traktPlayer] onPlayBackSeek(time: %s, offset: %s) - %s",
+                time,
+                offset,
+                self.isPlayingVideo(),
             )
             data = {"action": "seek", "time": time, "offset": offset}
             self.action(data)
@@ -1017,8 +1091,9 @@ class traktPlayer(xbmc.Player):
     def onPlayBackSeekChapter(self, chapter: int) -> None:
         if self._playing:
             logger.debug(
-                "[traktPlayer] onPlayBackSeekChapter(chapter: %s) - %s"
-                % (str(chapter), self.isPlayingVideo())
+                "[traktPlayer] onPlayBackSeekChapter(chapter: %s) - %s",
+                chapter,
+                self.isPlayingVideo(),
             )
             data = {"action": "seekchapter", "chapter": chapter}
             self.action(data)
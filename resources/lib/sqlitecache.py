@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    from _thread import get_ident
+except ImportError:
+    from _dummy_thread import get_ident
+
+import xbmcvfs
+import xbmcaddon
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+__addon__ = xbmcaddon.Addon("script.trakt")
+
+
+# Trakt.tv response bodies kept with their ETag/Last-Modified validators, so a
+# repeated request only needs a conditional GET; least recently used entries
+# are evicted once the bodies outgrow max_size bytes
+class SqliteCache(object):
+    max_size = 8 * 1024 * 1024
+
+    _create = (
+        "CREATE TABLE IF NOT EXISTS cache "
+        "("
+        "  path TEXT PRIMARY KEY,"
+        "  etag TEXT,"
+        "  last_modified TEXT,"
+        "  body BLOB,"
+        "  size INTEGER,"
+        "  used_at REAL"
+        ")"
+    )
+    _get = "SELECT etag, last_modified, body FROM cache WHERE path = ?"
+    _touch = "UPDATE cache SET used_at = ? WHERE path = ?"
+    _put = (
+        "INSERT OR REPLACE INTO cache (path, etag, last_modified, body, size, used_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+    # newest first, the running total is kept in Python: window functions
+    # need SQLite 3.25, older than what some Kodi platforms ship
+    _sizes = "SELECT path, size FROM cache ORDER BY used_at DESC, path"
+    _del = "DELETE FROM cache WHERE path = ?"
+    _purge = "DELETE FROM cache"
+
+    path: str
+    _connection_cache: Dict[int, sqlite3.Connection]
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        self.path = xbmcvfs.translatePath(__addon__.getAddonInfo("profile"))
+        if not xbmcvfs.exists(self.path):
+            logger.debug("Making path structure: %s" % repr(self.path))
+            xbmcvfs.mkdir(self.path)
+        self.path = os.path.join(self.path, "cache.db")
+        if max_size is not None:
+            self.max_size = max_size
+        self._connection_cache = {}
+        with self._get_conn() as conn:
+            conn.execute(self._create)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        id = get_ident()
+        if id not in self._connection_cache:
+            self._close_finished()
+            # summaries are read by sync phase threads too, the connections
+            # they leave behind are closed when the next one is opened
+            self._connection_cache[id] = sqlite3.Connection(
+                self.path, timeout=60, check_same_thread=False
+            )
+        return self._connection_cache[id]
+
+    def _close_finished(self) -> None:
+        alive = set(thread.ident for thread in threading.enumerate())
+        for id in list(self._connection_cache):
+            if id not in alive:
+                conn = self._connection_cache.pop(id, None)
+                if conn:
+                    conn.close()
+
+    def get(self, path: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        try:
+            with self._get_conn() as conn:
+                row = conn.execute(self._get, (path,)).fetchone()
+                if row:
+                    conn.execute(self._touch, (time.time(), path))
+                    return row[0], row[1], bytes(row[2])
+        except sqlite3.Error as ex:
+            logger.debug("Reading %s from the cache failed: %s" % (path, ex))
+        return None
+
+    def put(
+        self, path: str, etag: Optional[str], last_modified: Optional[str], body: bytes
+    ) -> None:
+        if len(body) > self.max_size:
+            return
+        try:
+            with self._get_conn() as conn:
+                conn.execute(
+                    self._put,
+                    (
+                        path,
+                        etag,
+                        last_modified,
+                        sqlite3.Binary(body),
+                        len(body),
+                        time.time(),
+                    ),
+                )
+                self._evict(conn)
+        except sqlite3.Error as ex:
+            logger.debug("Writing %s to the cache failed: %s" % (path, ex))
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = 0
+        evicted = []
+        for path, size in conn.execute(self._sizes):
+            total += size or 0
+            if total > self.max_size:
+                evicted.append((path,))
+        if evicted:
+            conn.executemany(self._del, evicted)
+
+    def purge(self) -> None:
+        try:
+            with self._get_conn() as conn:
+                conn.execute(self._purge)
+        except sqlite3.Error as ex:
+            logger.debug("Purging the cache failed: %s" % ex)
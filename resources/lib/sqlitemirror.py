@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import threading
+from json import loads, dumps
+
+try:
+    from _thread import get_ident
+except ImportError:
+    from _dummy_thread import get_ident
+
+import xbmcvfs
+import xbmcaddon
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+__addon__ = xbmcaddon.Addon("script.trakt")
+
+
+# local copy of the paginated Trakt.tv sync lists, each stored together with
+# the /sync/last_activities timestamp it was downloaded at
+class SqliteMirror(object):
+    _create = (
+        "CREATE TABLE IF NOT EXISTS mirror "
+        "("
+        "  endpoint TEXT PRIMARY KEY,"
+        "  watermark TEXT"
+        ")"
+    )
+    _create_items = (
+        "CREATE TABLE IF NOT EXISTS mirror_items "
+        "("
+        "  endpoint TEXT,"
+        "  position INTEGER,"
+        "  item BLOB,"
+        "  PRIMARY KEY (endpoint, position)"
+        ")"
+    )
+    _watermark = "SELECT watermark FROM mirror WHERE endpoint = ?"
+    _items = "SELECT item FROM mirror_items WHERE endpoint = ? ORDER BY position"
+    _mark = "INSERT OR REPLACE INTO mirror (endpoint, watermark) VALUES (?, ?)"
+    _put_item = "INSERT INTO mirror_items (endpoint, position, item) VALUES (?, ?, ?)"
+    _del = "DELETE FROM mirror WHERE endpoint = ?"
+    _del_items = "DELETE FROM mirror_items WHERE endpoint = ?"
+    _purge = "DELETE FROM mirror"
+    _purge_items = "DELETE FROM mirror_items"
+
+    path: str
+    _connection_cache: Dict[int, sqlite3.Connection]
+
+    def __init__(self) -> None:
+        self.path = xbmcvfs.translatePath(__addon__.getAddonInfo("profile"))
+        if not xbmcvfs.exists(self.path):
+            logger.debug("Making path structure: %s" % repr(self.path))
+            xbmcvfs.mkdir(self.path)
+        self.path = os.path.join(self.path, "mirror.db")
+        self._connection_cache = {}
+        with self._get_conn() as conn:
+            conn.execute(self._create)
+            conn.execute(self._create_items)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        id = get_ident()
+        if id not in self._connection_cache:
+            self._close_finished()
+            # lists are downloaded by short-lived threads, the connections
+            # they leave behind are closed when the next one is opened
+            self._connection_cache[id] = sqlite3.Connection(
+                self.path, timeout=60, check_same_thread=False
+            )
+        return self._connection_cache[id]
+
+    def _close_finished(self) -> None:
+        alive = set(thread.ident for thread in threading.enumerate())
+        for id in list(self._connection_cache):
+            if id not in alive:
+                conn = self._connection_cache.pop(id, None)
+                if conn:
+                    conn.close()
+
+    def get(self, endpoint: str, watermark: str) -> Optional[Iterator[Any]]:
+        try:
+            with self._get_conn() as conn:
+                row = conn.execute(self._watermark, (endpoint,)).fetchone()
+                if not row or row[0] != watermark:
+                    return None
+                rows = conn.execute(self._items, (endpoint,)).fetchall()
+        except sqlite3.Error as ex:
+            logger.debug("Reading %s from the mirror failed: %s" % (endpoint, ex))
+            return None
+        # items stay serialized until they are consumed
+        return (loads(obj_buffer) for (obj_buffer,) in rows)
+
+    # a list is written page by page: discard() drops the old copy, append()
+    # adds each page and mark() makes the list visible once it is complete
+    def discard(self, endpoint: str) -> None:
+        try:
+            with self._get_conn() as conn:
+                conn.execute(self._del, (endpoint,))
+                conn.execute(self._del_items, (endpoint,))
+        except sqlite3.Error as ex:
+            logger.debug("Discarding %s from the mirror failed: %s" % (endpoint, ex))
+
+    def append(self, endpoint: str, position: int, items: List[Any]) -> bool:
+        try:
+            with self._get_conn() as conn:
+                conn.executemany(
+                    self._put_item,
+                    (
+                        (endpoint, position + offset, dumps(item))
+                        for offset, item in enumerate(items)
+                    ),
+                )
+            return True
+        except sqlite3.Error as ex:
+            logger.debug("Writing %s to the mirror failed: %s" % (endpoint, ex))
+            return False
+
+    def mark(self, endpoint: str, watermark: str) -> None:
+        try:
+            with self._get_conn() as conn:
+                conn.execute(self._mark, (endpoint, watermark))
+        except sqlite3.Error as ex:
+            logger.debug("Writing %s to the mirror failed: %s" % (endpoint, ex))
+
+    def purge(self) -> None:
+        with self._get_conn() as conn:
+            conn.execute(self._purge_items)
+            conn.execute(self._purge)
@@ -2,10 +2,12 @@
 
 import os
 import sqlite3
+import threading
+import time
+from collections import deque
+from itertools import islice
 from json import loads, dumps
 
-from time import sleep
-
 try:
     from _thread import get_ident
 except ImportError:
@@ -14,106 +16,169 @@ except ImportError:
 import xbmcvfs
 import xbmcaddon
 import logging
-from typing import Any, Iterator, Optional, Dict
+from resources.lib.records import to_json
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-__addon__ = xbmcaddon.Addon('script.trakt')
+__addon__ = xbmcaddon.Addon("script.trakt")
+
 
 # code from http://flask.pocoo.org/snippets/88/ with some modifications
+#
+# The table is the queue: other processes (the context menu scripts) append
+# to the same file as the service. Rows are read into memory once, by id
+# after the last one seen, when the queue is opened, when this instance
+# appends and when wake() is told another process did; nothing is read on
+# a timer. A consumer waiting on an empty queue wakes on either of the
+# last two. Only the rows actually taken are deleted.
 class SqliteQueue(object):
-
     _create = (
-                'CREATE TABLE IF NOT EXISTS queue '
-                '('
-                '  id INTEGER PRIMARY KEY AUTOINCREMENT,'
-                '  item BLOB'
-                ')'
-                )
-    _count = 'SELECT COUNT(*) FROM queue'
-    _iterate = 'SELECT id, item FROM queue'
-    _append = 'INSERT INTO queue (item) VALUES (?)'
-    _write_lock = 'BEGIN IMMEDIATE'
-    _get = (
-            'SELECT id, item FROM queue '
-            'ORDER BY id LIMIT 1'
-            )
-    _del = 'DELETE FROM queue WHERE id = ?'
-    _peek = (
-            'SELECT item FROM queue '
-            'ORDER BY id LIMIT 1'
-            )
-    _purge = 'DELETE FROM queue'
+        "CREATE TABLE IF NOT EXISTS queue "
+        "("
+        "  id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "  item BLOB"
+        ")"
+    )
+    _journal = "PRAGMA journal_mode=WAL"
+    # with WAL a commit is durable once the log is synced at a checkpoint,
+    # the database can not be corrupted by a crash in between
+    _synchronous = "PRAGMA synchronous=NORMAL"
+    _iterate = "SELECT id, item FROM queue WHERE id > ? ORDER BY id"
+    _append = "INSERT INTO queue (item) VALUES (?)"
+    _del = "DELETE FROM queue WHERE id = ?"
+    _purge = "DELETE FROM queue"
 
     path: str
     _connection_cache: Dict[int, sqlite3.Connection]
+    _items: Deque[Tuple[int, str]]
 
-    def __init__(self) -> None:
+    def __init__(self, filename: str = "queue.db") -> None:
         self.path = xbmcvfs.translatePath(__addon__.getAddonInfo("profile"))
         if not xbmcvfs.exists(self.path):
             logger.debug("Making path structure: %s" % repr(self.path))
             xbmcvfs.mkdir(self.path)
-        self.path = os.path.join(self.path, 'queue.db')
+        self.path = os.path.join(self.path, filename)
         self._connection_cache = {}
-        with self._get_conn() as conn:
+        self._ready = threading.Condition()
+        conn = self._get_conn()
+        conn.execute(self._journal)
+        with conn:
             conn.execute(self._create)
+        self._items = deque()
+        self._last_id = 0
+        self._refresh()
 
     def __len__(self) -> int:
-        with self._get_conn() as conn:
-            executed = conn.execute(self._count).fetchone()[0]
-        return executed
+        with self._ready:
+            return len(self._items)
 
     def __iter__(self) -> Iterator[Any]:
-        with self._get_conn() as conn:
-            for _, obj_buffer in conn.execute(self._iterate):
-                yield loads(obj_buffer)
+        with self._ready:
+            items = list(self._items)
+        for _, obj_buffer in items:
+            yield loads(obj_buffer)
 
     def _get_conn(self) -> sqlite3.Connection:
         id = get_ident()
         if id not in self._connection_cache:
-            self._connection_cache[id] = sqlite3.Connection(self.path, timeout=60)
+            self._close_finished()
+            # connections are only used by the thread that opened them, but
+            # closed by whichever thread notices that thread is gone
+            conn = sqlite3.Connection(self.path, timeout=60, check_same_thread=False)
+            conn.execute(self._synchronous)
+            self._connection_cache[id] = conn
         return self._connection_cache[id]
 
+    def _close_finished(self) -> None:
+        alive = set(thread.ident for thread in threading.enumerate())
+        for id in list(self._connection_cache):
+            if id not in alive:
+                conn = self._connection_cache.pop(id, None)
+                if conn:
+                    conn.close()
+
+    def _refresh(self) -> None:
+        """Pick up the rows appended since the last one seen."""
+        with self._ready:
+            rows = self._get_conn().execute(self._iterate, (self._last_id,)).fetchall()
+            if rows:
+                self._items.extend(rows)
+                self._last_id = rows[-1][0]
+
+    def wake(self) -> None:
+        """Another process appended rows: read them and wake the consumers."""
+        with self._ready:
+            self._refresh()
+            self._ready.notify_all()
+
+    def close(self) -> None:
+        with self._ready:
+            for id in list(self._connection_cache):
+                self._connection_cache.pop(id).close()
+
     def purge(self) -> None:
-        with self._get_conn() as conn:
-            conn.execute(self._purge)
+        with self._ready:
+            with self._get_conn() as conn:
+                conn.execute(self._purge)
+            self._items.clear()
 
     def append(self, obj: Any) -> None:
-        obj_buffer = dumps(obj)
-        with self._get_conn() as conn:
-            conn.execute(self._append, (obj_buffer,))
-
-    def get(self, sleep_wait: bool = True) -> Optional[Any]:
-        keep_pooling = True
-        wait = 0.1
-        max_wait = 2
-        tries = 0
-        with self._get_conn() as conn:
-            id = None
-            while keep_pooling:
-                conn.execute(self._write_lock)
-                cursor = conn.execute(self._get)
-                row = cursor.fetchone()
-                if row:
-                    id, obj_buffer = row
-                    keep_pooling = False
-                else:
-                    conn.commit()  # unlock the database
-                    if not sleep_wait:
-                        keep_pooling = False
-                        continue
-                    tries += 1
-                    sleep(wait)
-                    wait = min(max_wait, tries / 10 + wait)
-            if id:
-                conn.execute(self._del, (id,))
-                return loads(obj_buffer)
-        return None
+        self.append_many([obj])
+
+    def append_many(self, objs: Iterable[Any]) -> None:
+        obj_buffers = [dumps(obj, default=to_json) for obj in objs]
+        if not obj_buffers:
+            return
+        with self._ready:
+            with self._get_conn() as conn:
+                for obj_buffer in obj_buffers:
+                    conn.execute(self._append, (obj_buffer,))
+            # read back with the rows other processes appended before these
+            self._refresh()
+            self._ready.notify(len(obj_buffers))
+
+    def get(
+        self, sleep_wait: bool = True, timeout: Optional[float] = None
+    ) -> Optional[Any]:
+        items = self.get_many(1, sleep_wait, timeout)
+        return items[0] if items else None
+
+    def get_many(
+        self, max_items: int, sleep_wait: bool = True, timeout: Optional[float] = None
+    ) -> List[Any]:
+        with self._ready:
+            if sleep_wait:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while not self._items:
+                    wait = None
+                    if deadline is not None:
+                        wait = deadline - time.monotonic()
+                        if wait <= 0:
+                            break
+                    self._ready.wait(wait)
+            items = self._remove(max_items)
+        return [loads(obj_buffer) for _, obj_buffer in items]
+
+    def peek_many(self, max_items: int) -> List[Any]:
+        with self._ready:
+            items = list(islice(self._items, max_items))
+        return [loads(obj_buffer) for _, obj_buffer in items]
+
+    def discard(self, count: int) -> None:
+        """Remove the first ``count`` items, once those peeked are handled."""
+        with self._ready:
+            self._remove(count)
+
+    def _remove(self, count: int) -> List[Tuple[int, str]]:
+        items = [self._items.popleft() for _ in range(min(count, len(self._items)))]
+        if items:
+            with self._get_conn() as conn:
+                conn.executemany(self._del, [(id,) for id, _ in items])
+        return items
 
     def peek(self) -> Optional[Any]:
-        with self._get_conn() as conn:
-            cursor = conn.execute(self._peek)
-            row = cursor.fetchone()
-            if row:
-                return loads(row[0])
-            return None
+        with self._ready:
+            if self._items:
+                return loads(self._items[0][1])
+        return None
@@ -1,19 +1,24 @@
 # -*- coding: utf-8 -*-
 
 
+import hashlib
 import logging
-from typing import Any
+import threading
+from json import dumps, loads
+from typing import Any, Dict, List, Optional
 
 import xbmc
 import xbmcgui
 from resources.lib import syncEpisodes, syncMovies
-from resources.lib.kodiUtilities import getSettingAsBool
+from resources.lib.kodiUtilities import getSetting, getSettingAsBool, setSetting
+from resources.lib.records import Record, to_json
+from resources.lib.scheduler import PhaseScheduler
 
 progress = xbmcgui.DialogProgress()
 logger = logging.getLogger(__name__)
 
 
-class Sync():
+class Sync:
     traktapi: Any = None
     show_progress: bool = False
     run_silent: bool = False
@@ -21,70 +26,255 @@ class Sync():
     sync_on_update: bool = False
     notify: bool = False
     notify_during_playback: bool = False
+    lastActivities: Optional[Dict] = None
+    # highest percent shown while phases run concurrently, None otherwise
+    phasePercent: Optional[int] = None
+    progressLock = threading.Lock()
 
-    def __init__(self, show_progress: bool = False, run_silent: bool = False, library: str = "all", api: Any = None) -> None:
+    # Trakt /sync/last_activities timestamps that move when a sync category changes
+    activityCategories = {
+        "movies": {
+            "collected": [("movies", "collected_at")],
+            "watched": [("movies", "watched_at")],
+            "rated": [("movies", "rated_at")],
+            "paused": [("movies", "paused_at")],
+        },
+        "episodes": {
+            "collected": [("episodes", "collected_at")],
+            "watched": [("episodes", "watched_at")],
+            "rated": [("episodes", "rated_at"), ("shows", "rated_at")],
+            "paused": [("episodes", "paused_at")],
+        },
+    }
+    # settings that change what a sync does even when no data changed
+    fingerprintSettings = {
+        "movies": [
+            "user",
+            "scrobble_fallback",
+            "trakt_sync_ratings",
+            "add_movies_to_trakt",
+            "clean_trakt_movies",
+            "trakt_movie_playcount",
+            "kodi_movie_playcount",
+            "trakt_movie_playback",
+        ],
+        "episodes": [
+            "user",
+            "scrobble_fallback",
+            "trakt_sync_ratings",
+            "add_episodes_to_trakt",
+            "clean_trakt_episodes",
+            "trakt_episode_playcount",
+            "kodi_episode_playcount",
+            "trakt_episode_playback",
+        ],
+    }
+
+    def __init__(
+        self,
+        show_progress: bool = False,
+        run_silent: bool = False,
+        library: str = "all",
+        api: Any = None,
+    ) -> None:
         self.traktapi = api
         self.show_progress = show_progress
         self.run_silent = run_silent
         self.library = library
         if self.show_progress and self.run_silent:
             logger.debug("Sync is being run silently.")
-        self.sync_on_update = getSettingAsBool('sync_on_update')
-        self.notify = getSettingAsBool('show_sync_notifications')
-        self.notify_during_playback = not getSettingAsBool("hide_notifications_playback")
+        self.sync_on_update = getSettingAsBool("sync_on_update")
+        self.notify = getSettingAsBool("show_sync_notifications")
+        self.notify_during_playback = not getSettingAsBool(
+            "hide_notifications_playback"
+        )
 
     def __syncCheck(self, media_type: str) -> bool:
-        return self.__syncCollectionCheck(media_type) or self.__syncWatchedCheck(media_type) or self.__syncPlaybackCheck(media_type) or self.__syncRatingsCheck()
+        return (
+            self.__syncCollectionCheck(media_type)
+            or self.__syncWatchedCheck(media_type)
+            or self.__syncPlaybackCheck(media_type)
+            or self.__syncRatingsCheck()
+        )
 
     def __syncPlaybackCheck(self, media_type: str) -> bool:
-        if media_type == 'movies':
-            return getSettingAsBool('trakt_movie_playback')
+        if media_type == "movies":
+            return getSettingAsBool("trakt_movie_playback")
         else:
-            return getSettingAsBool('trakt_episode_playback')
+            return getSettingAsBool("trakt_episode_playback")
 
     def __syncCollectionCheck(self, media_type: str) -> bool:
-        if media_type == 'movies':
-            return getSettingAsBool('add_movies_to_trakt') or getSettingAsBool('clean_trakt_movies')
+        if media_type == "movies":
+            return getSettingAsBool("add_movies_to_trakt") or getSettingAsBool(
+                "clean_trakt_movies"
+            )
         else:
-            return getSettingAsBool('add_episodes_to_trakt') or getSettingAsBool('clean_trakt_episodes')
+            return getSettingAsBool("add_episodes_to_trakt") or getSettingAsBool(
+                "clean_trakt_episodes"
+            )
 
     def __syncRatingsCheck(self) -> bool:
-        return getSettingAsBool('trakt_sync_ratings')
+        return getSettingAsBool("trakt_sync_ratings")
 
     def __syncWatchedCheck(self, media_type: str) -> bool:
-        if media_type == 'movies':
-            return getSettingAsBool('trakt_movie_playcount') or getSettingAsBool('kodi_movie_playcount')
+        if media_type == "movies":
+            return getSettingAsBool("trakt_movie_playcount") or getSettingAsBool(
+                "kodi_movie_playcount"
+            )
         else:
-            return getSettingAsBool('trakt_episode_playcount') or getSettingAsBool('kodi_episode_playcount')
+            return getSettingAsBool("trakt_episode_playcount") or getSettingAsBool(
+                "kodi_episode_playcount"
+            )
 
     @property
     def show_notification(self) -> bool:
-        return not self.show_progress and self.sync_on_update and self.notify and (self.notify_during_playback or not xbmc.Player().isPlayingVideo())
+        return (
+            not self.show_progress
+            and self.sync_on_update
+            and self.notify
+            and (self.notify_during_playback or not xbmc.Player().isPlayingVideo())
+        )
+
+    def __watermarks(self, media_type: str) -> Optional[Dict]:
+        if not self.lastActivities:
+            return None
+        watermarks = {}
+        for category, keys in self.activityCategories[media_type].items():
+            watermarks[category] = [
+                (self.lastActivities.get(group) or {}).get(key) for group, key in keys
+            ]
+        return watermarks
+
+    def __syncedActivities(self) -> Dict:
+        try:
+            return loads(getSetting("last_activities") or "{}")
+        except ValueError:
+            return {}
+
+    def Fingerprint(self, media_type: str, kodiData: Any) -> str:
+        settings = [
+            getSetting(setting) for setting in self.fingerprintSettings[media_type]
+        ]
+        data = dumps(
+            [settings, kodiData],
+            sort_keys=True,
+            default=lambda obj: to_json(obj) if isinstance(obj, Record) else str(obj),
+        )
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def MovedCategories(self, media_type: str) -> List[str]:
+        categories = list(self.activityCategories[media_type])
+        watermarks = self.__watermarks(media_type)
+        # manual syncs always run in full so they can repair a drifted library
+        if self.show_progress or watermarks is None:
+            return categories
+        synced = self.__syncedActivities().get(media_type)
+        if not synced:
+            return categories
+        return [
+            category
+            for category in categories
+            if synced["watermarks"].get(category) != watermarks[category]
+        ]
+
+    def ChangedCategories(self, media_type: str, fingerprint: str) -> List[str]:
+        synced = self.__syncedActivities().get(media_type)
+        if (
+            self.show_progress
+            or self.__watermarks(media_type) is None
+            or not synced
+            or synced.get("fingerprint") != fingerprint
+        ):
+            return list(self.activityCategories[media_type])
+        return self.MovedCategories(media_type)
+
+    def PrefetchLists(self, media_type: str) -> None:
+        # lists that moved on Trakt.tv are downloaded while Kodi's library is
+        # read, any other list a sync needs is then read from the mirror
+        categories = self.MovedCategories(media_type)
+        if not self.__syncRatingsCheck():
+            categories = [category for category in categories if category != "rated"]
+        if not self.__syncPlaybackCheck(media_type):
+            categories = [category for category in categories if category != "paused"]
+        self.traktapi.prefetchLists(media_type, categories)
+
+    def ListsComplete(self, media_type: str) -> bool:
+        # a list cut short by a failed page was synced in part only, the
+        # next sync must not skip its category
+        incomplete = self.traktapi.incompleteLists(media_type)
+        if incomplete:
+            logger.debug(
+                "[Sync] Not saving %s activities, incomplete lists: %s",
+                media_type,
+                ", ".join(incomplete),
+            )
+        return not incomplete
+
+    def SaveActivities(self, media_type: str, fingerprint: str) -> None:
+        watermarks = self.__watermarks(media_type)
+        if watermarks is None:
+            return
+        synced = self.__syncedActivities()
+        synced[media_type] = {"fingerprint": fingerprint, "watermarks": watermarks}
+        setSetting("last_activities", dumps(synced))
+
+    def Phases(self) -> PhaseScheduler:
+        return PhaseScheduler(is_canceled=self.IsCanceled)
+
+    def RunPhases(self, scheduler: PhaseScheduler) -> Dict[str, Any]:
+        """Run the phases of a movie or episode sync. Their progress ranges
+        overlap in time, so the dialog only moves forward while they run."""
+        with self.progressLock:
+            self.phasePercent = 0
+        try:
+            return scheduler.run()
+        finally:
+            with self.progressLock:
+                self.phasePercent = None
 
     def sync(self) -> None:
         logger.debug("Starting synchronization with Trakt.tv")
 
-        if self.__syncCheck('movies'):
-            if self.library in ["all", "movies"]:
-                syncMovies.SyncMovies(self, progress)
-            else:
-                logger.debug(
-                    "Movie sync is being skipped for this manual sync.")
-        else:
-            logger.debug("Movie sync is disabled, skipping.")
+        # the lists prefetched for this sync are served to it alone
+        with self.traktapi.syncScope():
+            if self.__syncCheck("movies") or self.__syncCheck("episodes"):
+                # queued writes go first, the sync would otherwise send them again
+                self.traktapi.flushOutbox(force=True)
+                self.lastActivities = self.traktapi.getLastActivities()
+                for media_type in ["movies", "episodes"]:
+                    if self.__syncCheck(media_type) and self.library in [
+                        "all",
+                        media_type,
+                    ]:
+                        self.PrefetchLists(media_type)
 
-        if self.__syncCheck('episodes'):
-            if self.library in ["all", "episodes"]:
-                if not (self.__syncCheck('movies') and self.IsCanceled()):
-                    syncEpisodes.SyncEpisodes(self, progress)
+            try:
+                if self.__syncCheck("movies"):
+                    if self.library in ["all", "movies"]:
+                        syncMovies.SyncMovies(self, progress)
+                    else:
+                        logger.debug(
+                            "Movie sync is being skipped for this manual sync."
+                        )
                 else:
-                    logger.debug(
-                        "Episode sync is being skipped because movie sync was canceled.")
-            else:
-                logger.debug(
-                    "Episode sync is being skipped for this manual sync.")
-        else:
-            logger.debug("Episode sync is disabled, skipping.")
+                    logger.debug("Movie sync is disabled, skipping.")
+
+                if self.__syncCheck("episodes"):
+                    if self.library in ["all", "episodes"]:
+                        if not (self.__syncCheck("movies") and self.IsCanceled()):
+                            syncEpisodes.SyncEpisodes(self, progress)
+                        else:
+                            logger.debug(
+                                "Episode sync is being skipped because movie sync was canceled."
+                            )
+                    else:
+                        logger.debug(
+                            "Episode sync is being skipped for this manual sync."
+                        )
+                else:
+                    logger.debug("Episode sync is disabled, skipping.")
+            finally:
+                self.traktapi.forgetLastActivities()
 
         logger.debug("[Sync] Finished synchronization with Trakt.tv")
 
@@ -97,20 +287,23 @@ class Sync():
 
     def UpdateProgress(self, *args: Any, **kwargs: Any) -> None:
         if self.show_progress and not self.run_silent:
-
             line1 = ""
             line2 = ""
             line3 = ""
 
-            if 'line1' in kwargs:
+            if "line1" in kwargs:
                 line1 = kwargs["line1"]
 
-            if 'line2' in kwargs:
+            if "line2" in kwargs:
                 line2 = kwargs["line2"]
 
-            if 'line3' in kwargs:
+            if "line3" in kwargs:
                 line3 = kwargs["line3"]
 
             percent = args[0]
-            message = f'{line1}\n{line2}\n{line3}'
-            progress.update(percent, message)
+            message = f"{line1}\n{line2}\n{line3}"
+            with self.progressLock:
+                if self.phasePercent is not None:
+                    percent = max(percent, self.phasePercent)
+                    self.phasePercent = percent
+                progress.update(percent, message)
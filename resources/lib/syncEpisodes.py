@@ -1,16 +1,30 @@
 # -*- coding: utf-8 -*-
 
-import copy
 import logging
 from typing import Dict, Tuple, Union, Optional, Any
 
-from resources.lib import kodiUtilities, utilities
+from resources.lib import kodiUtilities, records, utilities
 
 logger = logging.getLogger(__name__)
 
 
 class SyncEpisodes:
     sync: Any
+    # load every episode in a few paged VideoLibrary.GetEpisodes calls and
+    # group them by show, instead of one call per show
+    bulk_episodes = True
+    episode_page_size = 5000
+    episode_properties = [
+        "season",
+        "episode",
+        "playcount",
+        "uniqueid",
+        "lastplayed",
+        "file",
+        "dateadded",
+        "runtime",
+        "userrating",
+    ]
 
     def __init__(self, sync: Any, progress: Any) -> None:
         self.sync = sync
@@ -43,47 +57,53 @@ class SyncEpisodes:
                 progress.close()
             return
 
-        (
-            traktShowsCollected,
-            traktShowsWatched,
-            traktShowsRated,
-            traktEpisodesRated,
-        ) = self.__traktLoadShows()
-        if not traktShowsCollected:
-            logger.debug(
-                "[Episodes Sync] Error getting Trakt.tv collected show list, aborting tv show sync."
+        # only categories whose Trakt.tv watermark moved, or everything when
+        # Kodi or the sync settings changed since the last complete sync
+        fingerprint = self.sync.Fingerprint("episodes", kodiShowsCollected)
+        self.categories = self.sync.ChangedCategories("episodes", fingerprint)
+        self.traktUpdated = False
+        traktShowsCollected = {"shows": []}
+        if self.categories:
+            (
+                traktShowsCollected,
+                traktShowsWatched,
+                traktShowsRated,
+                traktEpisodesRated,
+            ) = self.__traktLoadShows()
+            if not traktShowsCollected:
+                logger.debug(
+                    "[Episodes Sync] Error getting Trakt.tv collected show list, aborting tv show sync."
+                )
+                if self.sync.show_progress and not self.sync.run_silent:
+                    progress.close()
+                return
+            if not traktShowsWatched:
+                logger.debug(
+                    "[Episodes Sync] Error getting Trakt.tv watched show list, aborting tv show sync."
+                )
+                if self.sync.show_progress and not self.sync.run_silent:
+                    progress.close()
+                return
+
+            self.__syncEpisodes(
+                traktShowsCollected,
+                traktShowsWatched,
+                traktShowsRated,
+                traktEpisodesRated,
+                kodiShowsCollected,
+                kodiShowsWatched,
             )
-            if self.sync.show_progress and not self.sync.run_silent:
-                progress.close()
-            return
-        if not traktShowsWatched:
+
+            if (
+                not self.traktUpdated
+                and not self.sync.IsCanceled()
+                and self.sync.ListsComplete("episodes")
+            ):
+                self.sync.SaveActivities("episodes", fingerprint)
+        else:
             logger.debug(
-                "[Episodes Sync] Error getting Trakt.tv watched show list, aborting tv show sync."
+                "[Episodes Sync] Nothing changed on Trakt.tv or in Kodi since the last sync, skipping."
             )
-            if self.sync.show_progress and not self.sync.run_silent:
-                progress.close()
-            return
-
-        traktShowsProgress = self.__traktLoadShowsPlaybackProgress(25, 36)
-
-        self.__addEpisodesToTraktCollection(
-            kodiShowsCollected, traktShowsCollected, 37, 47
-        )
-
-        self.__deleteEpisodesFromTraktCollection(
-            traktShowsCollected, kodiShowsCollected, 48, 58
-        )
-
-        self.__addEpisodesToTraktWatched(kodiShowsWatched, traktShowsWatched, 59, 69)
-
-        self.__addEpisodesToKodiWatched(
-            traktShowsWatched, kodiShowsWatched, kodiShowsCollected, 70, 80
-        )
-
-        self.__addEpisodeProgressToKodi(traktShowsProgress, kodiShowsCollected, 81, 91)
-
-        self.__syncShowsRatings(traktShowsRated, kodiShowsCollected, 92, 95)
-        self.__syncEpisodeRatings(traktEpisodesRated, kodiShowsCollected, 96, 99)
 
         if self.sync.show_notification:
             kodiUtilities.notification(
@@ -99,19 +119,95 @@ class SyncEpisodes:
             progress.close()
 
         logger.debug(
-            "[Episodes Sync] Shows on Trakt.tv (%d), shows in Kodi (%d)."
-            % (len(traktShowsCollected["shows"]), len(kodiShowsCollected["shows"]))
+            "[Episodes Sync] Shows on Trakt.tv (%d), shows in Kodi (%d).",
+            len(traktShowsCollected["shows"]),
+            len(kodiShowsCollected["shows"]),
         )
 
         logger.debug(
-            "[Episodes Sync] Episodes on Trakt.tv (%d), episodes in Kodi (%d)."
-            % (
-                utilities.countEpisodes(traktShowsCollected),
-                utilities.countEpisodes(kodiShowsCollected),
-            )
+            "[Episodes Sync] Episodes on Trakt.tv (%d), episodes in Kodi (%d).",
+            utilities.countEpisodes(traktShowsCollected),
+            utilities.countEpisodes(kodiShowsCollected),
         )
         logger.debug("[Episodes Sync] Complete.")
 
+    def __syncEpisodes(
+        self,
+        traktShowsCollected: Dict,
+        traktShowsWatched: Dict,
+        traktShowsRated: Dict,
+        traktEpisodesRated: Dict,
+        kodiShowsCollected: Dict,
+        kodiShowsWatched: Dict,
+    ) -> None:
+        # phases only read the loaded lists, what they write is compared
+        # into copies, so the ones on different lanes can overlap
+        phases = self.sync.Phases()
+        if "paused" in self.categories:
+            phases.add(
+                "playback", lambda: self.__traktLoadShowsPlaybackProgress(25, 36)
+            )
+
+        if "collected" in self.categories:
+            phases.add(
+                "add to trakt collection",
+                lambda: self.__addEpisodesToTraktCollection(
+                    kodiShowsCollected, traktShowsCollected, 37, 47
+                ),
+                lane="trakt",
+            )
+            phases.add(
+                "delete from trakt collection",
+                lambda: self.__deleteEpisodesFromTraktCollection(
+                    traktShowsCollected, kodiShowsCollected, 48, 58
+                ),
+                lane="trakt",
+            )
+
+        if "watched" in self.categories:
+            phases.add(
+                "add to trakt watched",
+                lambda: self.__addEpisodesToTraktWatched(
+                    kodiShowsWatched, traktShowsWatched, 59, 69
+                ),
+                lane="trakt",
+            )
+            phases.add(
+                "add to kodi watched",
+                lambda: self.__addEpisodesToKodiWatched(
+                    traktShowsWatched, kodiShowsWatched, kodiShowsCollected, 70, 80
+                ),
+                lane="kodi",
+            )
+
+        if "paused" in self.categories:
+            phases.add(
+                "add progress to kodi",
+                lambda: self.__addEpisodeProgressToKodi(
+                    phases.results["playback"], kodiShowsCollected, 81, 91
+                ),
+                requires=["playback"],
+                lane="kodi",
+            )
+
+        if "rated" in self.categories:
+            phases.add(
+                "sync show ratings",
+                lambda: self.__syncShowsRatings(
+                    traktShowsRated, kodiShowsCollected, 92, 95
+                ),
+                lane="kodi",
+            )
+            phases.add(
+                "sync episode ratings",
+                lambda: self.__syncEpisodeRatings(
+                    traktEpisodesRated, kodiShowsCollected, 96, 99
+                ),
+                lane="kodi",
+            )
+
+        self.sync.RunPhases(phases)
+
     """ begin code for episode sync """
 
     def __kodiLoadShows(self) -> Tuple[Optional[Dict], Optional[Dict]]:
@@ -135,11 +231,20 @@ class SyncEpisodes:
             return None, None
 
         tvshows = kodiUtilities.kodiRpcToTraktMediaObjects(data)
-        logger.debug("[Episode Sync] Getting shows from kodi finished %s" % tvshows)
+        logger.debug("[Episode Sync] Getting shows from kodi finished %s", tvshows)
 
         if tvshows is None:
             return None, None
         self.sync.UpdateProgress(2, line2=kodiUtilities.getString(32096))
+        episodesByShow = None
+        if self.bulk_episodes:
+            logger.debug("[Episodes Sync] Getting all episode data from Kodi")
+            episodesByShow = self.__kodiLoadAllEpisodes()
+            if episodesByShow is None:
+                logger.debug(
+                    "[Episodes Sync] There was a problem getting episode data from Kodi, aborting sync."
+                )
+                return None, None
         resultCollected = {"shows": []}
         resultWatched = {"shows": []}
         i = 0
@@ -154,62 +259,57 @@ class SyncEpisodes:
 
             if "ids" not in show_col1:
                 logger.debug(
-                    "[Episodes Sync] Tvshow %s has no imdbnumber or uniqueid"
-                    % show_col1["tvshowid"]
+                    "[Episodes Sync] Tvshow %s has no imdbnumber or uniqueid",
+                    show_col1["tvshowid"],
                 )
                 continue
 
-            show = {
-                "title": show_col1["title"],
-                "ids": show_col1["ids"],
-                "year": show_col1["year"],
-                "rating": show_col1["rating"],
-                "tvshowid": show_col1["tvshowid"],
-                "seasons": [],
-            }
-
-            data = kodiUtilities.kodiJsonRequest(
-                {
-                    "jsonrpc": "2.0",
-                    "method": "VideoLibrary.GetEpisodes",
-                    "params": {
-                        "tvshowid": show_col1["tvshowid"],
-                        "properties": [
-                            "season",
-                            "episode",
-                            "playcount",
-                            "uniqueid",
-                            "lastplayed",
-                            "file",
-                            "dateadded",
-                            "runtime",
-                            "userrating",
-                        ],
-                    },
-                    "id": 0,
-                }
+            show = records.Show(
+                title=show_col1["title"],
+                ids=show_col1["ids"],
+                year=show_col1["year"],
+                rating=show_col1["rating"],
+                tvshowid=show_col1["tvshowid"],
+                seasons=[],
             )
-            if not data:
-                logger.debug(
-                    "[Episodes Sync] There was a problem getting episode data for '%s', aborting sync."
-                    % show["title"]
+
+            if episodesByShow is not None:
+                episodes = episodesByShow.get(show_col1["tvshowid"])
+                data = {"episodes": episodes} if episodes else {}
+            else:
+                data = kodiUtilities.kodiJsonRequest(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "VideoLibrary.GetEpisodes",
+                        "params": {
+                            "tvshowid": show_col1["tvshowid"],
+                            "properties": self.episode_properties,
+                        },
+                        "id": 0,
+                    }
                 )
-                return None, None
-            elif "episodes" not in data:
+                if not data:
+                    logger.debug(
+                        "[Episodes Sync] There was a problem getting episode data for '%s', aborting sync.",
+                        show["title"],
+                    )
+                    return None, None
+            if "episodes" not in data:
                 logger.debug(
-                    "[Episodes Sync] '%s' has no episodes in Kodi." % show["title"]
+                    "[Episodes Sync] '%s' has no episodes in Kodi.",
+                    show["title"],
                 )
                 continue
 
             if "tvshowid" in show_col1:
                 del show_col1["tvshowid"]
 
-            showWatched = copy.deepcopy(show)
-            data2 = copy.deepcopy(data)
+            # both passes build new episode objects from the same RPC data
+            showWatched = show.copy()
             show["seasons"] = kodiUtilities.kodiRpcToTraktMediaObjects(data)
 
             showWatched["seasons"] = kodiUtilities.kodiRpcToTraktMediaObjects(
-                data2, "watched"
+                data, "watched"
             )
 
             resultCollected["shows"].append(show)
@@ -218,7 +318,38 @@ class SyncEpisodes:
         self.sync.UpdateProgress(10, line2=kodiUtilities.getString(32098))
         return resultCollected, resultWatched
 
-    def __traktLoadShows(self) -> Tuple[Union[Dict, bool], Union[Dict, bool], Union[Dict, bool], Union[Dict, bool]]:
+    def __kodiLoadAllEpisodes(self) -> Optional[Dict]:
+        episodesByShow = {}
+        start = 0
+        while True:
+            data = kodiUtilities.kodiJsonRequest(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "VideoLibrary.GetEpisodes",
+                    "params": {
+                        "properties": self.episode_properties + ["tvshowid"],
+                        "limits": {
+                            "start": start,
+                            "end": start + self.episode_page_size,
+                        },
+                    },
+                    "id": 0,
+                }
+            )
+            if not data:
+                return None
+            for episode in data.get("episodes", []):
+                episodesByShow.setdefault(episode["tvshowid"], []).append(episode)
+
+            start += self.episode_page_size
+            if start >= data.get("limits", {}).get("total", 0):
+                return episodesByShow
+
+    def __traktLoadShows(
+        self,
+    ) -> Tuple[
+        Union[Dict, bool], Union[Dict, bool], Union[Dict, bool], Union[Dict, bool]
+    ]:
         self.sync.UpdateProgress(
             10,
             line1=kodiUtilities.getString(32099),
@@ -230,20 +361,26 @@ class SyncEpisodes:
         )
         try:
             traktShowsCollected = {}
-            traktShowsCollected = self.sync.traktapi.getShowsCollected(
-                traktShowsCollected
-            )
+            if "collected" in self.categories:
+                traktShowsCollected = self.sync.traktapi.getShowsCollected(
+                    traktShowsCollected
+                )
             traktShowsCollected = list(traktShowsCollected.items())
 
             self.sync.UpdateProgress(12, line2=kodiUtilities.getString(32101))
             traktShowsWatched = {}
-            traktShowsWatched = self.sync.traktapi.getShowsWatched(traktShowsWatched)
+            if "watched" in self.categories:
+                traktShowsWatched = self.sync.traktapi.getShowsWatched(
+                    traktShowsWatched
+                )
             traktShowsWatched = list(traktShowsWatched.items())
 
             traktShowsRated = {}
             traktEpisodesRated = {}
 
-            if kodiUtilities.getSettingAsBool("trakt_sync_ratings"):
+            if "rated" in self.categories and kodiUtilities.getSettingAsBool(
+                "trakt_sync_ratings"
+            ):
                 traktShowsRated = self.sync.traktapi.getShowsRated(traktShowsRated)
                 traktShowsRated = list(traktShowsRated.items())
 
@@ -269,7 +406,7 @@ class SyncEpisodes:
             )
 
             # will keep the data in python structures - just like the KODI response
-            show = show.to_dict()
+            show = records.Show.from_dict(show.to_dict())
 
             showsCollected["shows"].append(show)
 
@@ -284,7 +421,7 @@ class SyncEpisodes:
             )
 
             # will keep the data in python structures - just like the KODI response
-            show = show.to_dict()
+            show = records.Show.from_dict(show.to_dict())
 
             showsWatched["shows"].append(show)
 
@@ -299,7 +436,7 @@ class SyncEpisodes:
             )
 
             # will keep the data in python structures - just like the KODI response
-            show = show.to_dict()
+            show = records.Show.from_dict(show.to_dict())
 
             showsRated["shows"].append(show)
 
@@ -314,7 +451,7 @@ class SyncEpisodes:
             )
 
             # will keep the data in python structures - just like the KODI response
-            show = show.to_dict()
+            show = records.Show.from_dict(show.to_dict())
 
             episodesRated["shows"].append(show)
 
@@ -322,7 +459,9 @@ class SyncEpisodes:
 
         return showsCollected, showsWatched, showsRated, episodesRated
 
-    def __traktLoadShowsPlaybackProgress(self, fromPercent: int, toPercent: int) -> Union[Dict, bool, None]:
+    def __traktLoadShowsPlaybackProgress(
+        self, fromPercent: int, toPercent: int
+    ) -> Union[Dict, bool, None]:
         if (
             kodiUtilities.getSettingAsBool("trakt_episode_playback")
             and not self.sync.IsCanceled()
@@ -338,8 +477,8 @@ class SyncEpisodes:
                 traktProgressShows = self.sync.traktapi.getEpisodePlaybackProgress()
             except Exception as ex:
                 logger.debug(
-                    "[Playback Sync] Invalid Trakt.tv progress list, possible error getting data from Trakt, aborting Trakt.tv playback update. Error: %s"
-                    % ex
+                    "[Playback Sync] Invalid Trakt.tv progress list, possible error getting data from Trakt, aborting Trakt.tv playback update. Error: %s",
+                    ex,
                 )
                 return False
 
@@ -354,7 +493,7 @@ class SyncEpisodes:
                 )
 
                 # will keep the data in python structures - just like the KODI response
-                show = show.to_dict()
+                show = records.Show.from_dict(show.to_dict())
 
                 showsProgress["shows"].append(show)
 
@@ -369,15 +508,11 @@ class SyncEpisodes:
             kodiUtilities.getSettingAsBool("add_episodes_to_trakt")
             and not self.sync.IsCanceled()
         ):
-            addTraktShows = copy.deepcopy(traktShows)
-            addKodiShows = copy.deepcopy(kodiShows)
-
-            tmpTraktShowsAdd = utilities.compareEpisodes(
-                addKodiShows,
-                addTraktShows,
+            traktShowsAdd = utilities.compareEpisodes(
+                kodiShows,
+                traktShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
             )
-            traktShowsAdd = copy.deepcopy(tmpTraktShowsAdd)
             utilities.sanitizeShows(traktShowsAdd)
             # logger.debug("traktShowsAdd %s" % traktShowsAdd)
 
@@ -392,13 +527,14 @@ class SyncEpisodes:
                 )
                 return
             logger.debug(
-                "[Episodes Sync] %i show(s) have episodes (%d) to be added to your Trakt.tv collection."
-                % (len(traktShowsAdd["shows"]), utilities.countEpisodes(traktShowsAdd))
+                "[Episodes Sync] %i show(s) have episodes (%d) to be added to your Trakt.tv collection.",
+                len(traktShowsAdd["shows"]),
+                utilities.countEpisodes(traktShowsAdd),
             )
             for show in traktShowsAdd["shows"]:
                 logger.debug(
-                    "[Episodes Sync] Episodes added: %s"
-                    % self.__getShowAsString(show, short=True)
+                    "[Episodes Sync] Episodes added: %s",
+                    self.__getShowAsString(show, short=True),
                 )
 
             self.sync.UpdateProgress(
@@ -408,6 +544,7 @@ class SyncEpisodes:
             )
 
             # split episode list into chunks of 50
+            self.traktUpdated = True
             chunksize = 50
             chunked_episodes = utilities.chunks(traktShowsAdd["shows"], chunksize)
             errorcount = 0
@@ -425,7 +562,7 @@ class SyncEpisodes:
                 )
 
                 request = {"shows": chunk}
-                logger.debug("[traktAddEpisodes] Shows to add %s" % request)
+                logger.debug("[traktAddEpisodes] Shows to add %s", request)
                 try:
                     self.sync.traktapi.addToCollection(request)
                 except Exception as ex:
@@ -433,7 +570,7 @@ class SyncEpisodes:
                     logging.fatal(message)
                     errorcount += 1
 
-            logger.debug("[traktAddEpisodes] Finished with %d error(s)" % errorcount)
+            logger.debug("[traktAddEpisodes] Finished with %d error(s)", errorcount)
             self.sync.UpdateProgress(
                 toPercent,
                 line2=kodiUtilities.getString(32105)
@@ -447,12 +584,9 @@ class SyncEpisodes:
             kodiUtilities.getSettingAsBool("clean_trakt_episodes")
             and not self.sync.IsCanceled()
         ):
-            removeTraktShows = copy.deepcopy(traktShows)
-            removeKodiShows = copy.deepcopy(kodiShows)
-
             traktShowsRemove = utilities.compareEpisodes(
-                removeTraktShows,
-                removeKodiShows,
+                traktShows,
+                kodiShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
             )
             utilities.sanitizeShows(traktShowsRemove)
@@ -469,13 +603,13 @@ class SyncEpisodes:
                 return
 
             logger.debug(
-                "[Episodes Sync] %i show(s) will have episodes removed from Trakt.tv collection."
-                % len(traktShowsRemove["shows"])
+                "[Episodes Sync] %i show(s) will have episodes removed from Trakt.tv collection.",
+                len(traktShowsRemove["shows"]),
             )
             for show in traktShowsRemove["shows"]:
                 logger.debug(
-                    "[Episodes Sync] Episodes removed: %s"
-                    % self.__getShowAsString(show, short=True)
+                    "[Episodes Sync] Episodes removed: %s",
+                    self.__getShowAsString(show, short=True),
                 )
 
             self.sync.UpdateProgress(
@@ -485,7 +619,8 @@ class SyncEpisodes:
                 % utilities.countEpisodes(traktShowsRemove),
             )
 
-            logger.debug("[traktRemoveEpisodes] Shows to remove %s" % traktShowsRemove)
+            self.traktUpdated = True
+            logger.debug("[traktRemoveEpisodes] Shows to remove %s", traktShowsRemove)
             try:
                 self.sync.traktapi.removeFromCollection(traktShowsRemove)
             except Exception as ex:
@@ -505,12 +640,9 @@ class SyncEpisodes:
             kodiUtilities.getSettingAsBool("trakt_episode_playcount")
             and not self.sync.IsCanceled()
         ):
-            updateTraktTraktShows = copy.deepcopy(traktShows)
-            updateTraktKodiShows = copy.deepcopy(kodiShows)
-
             traktShowsUpdate = utilities.compareEpisodes(
-                updateTraktKodiShows,
-                updateTraktTraktShows,
+                kodiShows,
+                traktShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 watched=True,
             )
@@ -529,13 +661,13 @@ class SyncEpisodes:
                 return
 
             logger.debug(
-                "[Episodes Sync] %i show(s) are missing playcounts on Trakt.tv"
-                % len(traktShowsUpdate["shows"])
+                "[Episodes Sync] %i show(s) are missing playcounts on Trakt.tv",
+                len(traktShowsUpdate["shows"]),
             )
             for show in traktShowsUpdate["shows"]:
                 logger.debug(
-                    "[Episodes Sync] Episodes updated: %s"
-                    % self.__getShowAsString(show, short=True)
+                    "[Episodes Sync] Episodes updated: %s",
+                    self.__getShowAsString(show, short=True),
                 )
 
             self.sync.UpdateProgress(
@@ -543,30 +675,54 @@ class SyncEpisodes:
                 line1=kodiUtilities.getString(32071),
                 line2=kodiUtilities.getString(32070) % (len(traktShowsUpdate["shows"])),
             )
+            self.traktUpdated = True
             errorcount = 0
             i = 0
             x = float(len(traktShowsUpdate["shows"]))
-            for show in traktShowsUpdate["shows"]:
-                if self.sync.IsCanceled():
-                    return
-                epCount = utilities.countEpisodes([show])
-                title = show["title"]
-                i += 1
-                y = ((i / x) * (toPercent - fromPercent)) + fromPercent
-                self.sync.UpdateProgress(
-                    int(y), line2=title, line3=kodiUtilities.getString(32073) % epCount
-                )
+            # shows are packed into as few requests as their episodes fit in
+            writer = self.sync.traktapi.historyWriter()
+            try:
+                for show in traktShowsUpdate["shows"]:
+                    if self.sync.IsCanceled():
+                        return
+                    epCount = utilities.countEpisodes([show])
+                    title = show["title"]
+                    i += 1
+                    y = ((i / x) * (toPercent - fromPercent)) + fromPercent
+                    self.sync.UpdateProgress(
+                        int(y),
+                        line2=title,
+                        line3=kodiUtilities.getString(32073) % epCount,
+                    )
 
-                s = {"shows": [show]}
-                logger.debug("[traktUpdateEpisodes] Shows to update %s" % s)
+                    logger.debug("[traktUpdateEpisodes] Show to update %s", show)
+                    try:
+                        writer.add(show)
+                    except Exception as ex:
+                        message = utilities.createError(ex)
+                        logging.fatal(message)
+                        errorcount += 1
+            finally:
+                # shows already packed are sent even when the sync is canceled
                 try:
-                    self.sync.traktapi.addToHistory(s)
+                    writer.flush()
+                    if not self.sync.IsCanceled():
+                        writer.retry()
                 except Exception as ex:
                     message = utilities.createError(ex)
                     logging.fatal(message)
                     errorcount += 1
 
-            logger.debug("[traktUpdateEpisodes] Finished with %d error(s)" % errorcount)
+                logger.debug(
+                    "[traktUpdateEpisodes] %d episode(s) added in %d request(s), %d show(s) not found, %d failed, %d queued, %d unknown",
+                    writer.added,
+                    writer.requests,
+                    len(writer.not_found),
+                    len(writer.failed),
+                    len(writer.queued),
+                    len(writer.unknown),
+                )
+            logger.debug("[traktUpdateEpisodes] Finished with %d error(s)", errorcount)
             self.sync.UpdateProgress(
                 toPercent,
                 line2=kodiUtilities.getString(32072) % (len(traktShowsUpdate["shows"])),
@@ -574,18 +730,20 @@ class SyncEpisodes:
             )
 
     def __addEpisodesToKodiWatched(
-        self, traktShows: Dict, kodiShows: Dict, kodiShowsCollected: Dict, fromPercent: int, toPercent: int
+        self,
+        traktShows: Dict,
+        kodiShows: Dict,
+        kodiShowsCollected: Dict,
+        fromPercent: int,
+        toPercent: int,
     ) -> None:
         if (
             kodiUtilities.getSettingAsBool("kodi_episode_playcount")
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktShows = copy.deepcopy(traktShows)
-            updateKodiKodiShows = copy.deepcopy(kodiShows)
-
             kodiShowsUpdate = utilities.compareEpisodes(
-                updateKodiTraktShows,
-                updateKodiKodiShows,
+                traktShows,
+                kodiShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 watched=True,
                 restrict=True,
@@ -602,14 +760,14 @@ class SyncEpisodes:
                 return
 
             logger.debug(
-                "[Episodes Sync] %i show(s) shows are missing playcounts on Kodi"
-                % len(kodiShowsUpdate["shows"])
+                "[Episodes Sync] %i show(s) shows are missing playcounts on Kodi",
+                len(kodiShowsUpdate["shows"]),
             )
             for s in [
                 "%s" % self.__getShowAsString(s, short=True)
                 for s in kodiShowsUpdate["shows"]
             ]:
-                logger.debug("[Episodes Sync] Episodes updated: %s" % s)
+                logger.debug("[Episodes Sync] Episodes updated: %s", s)
 
             # logger.debug("kodiShowsUpdate: %s" % kodiShowsUpdate)
             episodes = []
@@ -653,25 +811,25 @@ class SyncEpisodes:
                     % ((i) * chunksize if (i) * chunksize < x else x, x),
                 )
 
-                logger.debug("[Episodes Sync] chunk %s" % str(chunk))
+                logger.debug("[Episodes Sync] chunk %s", chunk)
                 result = kodiUtilities.kodiJsonRequest(chunk)
-                logger.debug("[Episodes Sync] result %s" % str(result))
+                logger.debug("[Episodes Sync] result %s", result)
 
             self.sync.UpdateProgress(
                 toPercent, line2=kodiUtilities.getString(32109) % len(episodes)
             )
 
-    def __addEpisodeProgressToKodi(self, traktShows: Dict, kodiShows: Dict, fromPercent: int, toPercent: int) -> None:
+    def __addEpisodeProgressToKodi(
+        self, traktShows: Dict, kodiShows: Dict, fromPercent: int, toPercent: int
+    ) -> None:
         if (
             kodiUtilities.getSettingAsBool("trakt_episode_playback")
             and traktShows
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktShows = copy.deepcopy(traktShows)
-            updateKodiKodiShows = copy.deepcopy(kodiShows)
             kodiShowsUpdate = utilities.compareEpisodes(
-                updateKodiTraktShows,
-                updateKodiKodiShows,
+                traktShows,
+                kodiShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 restrict=True,
                 playback=True,
@@ -687,14 +845,14 @@ class SyncEpisodes:
                 return
 
             logger.debug(
-                "[Episodes Sync] %i show(s) shows are missing progress in Kodi"
-                % len(kodiShowsUpdate["shows"])
+                "[Episodes Sync] %i show(s) shows are missing progress in Kodi",
+                len(kodiShowsUpdate["shows"]),
             )
             for s in [
                 "%s" % self.__getShowAsString(s, short=True)
                 for s in kodiShowsUpdate["shows"]
             ]:
-                logger.debug("[Episodes Sync] Episodes updated: %s" % s)
+                logger.debug("[Episodes Sync] Episodes updated: %s", s)
 
             episodes = []
             for show in kodiShowsUpdate["shows"]:
@@ -763,18 +921,17 @@ class SyncEpisodes:
                 toPercent, line2=kodiUtilities.getString(32131) % len(episodes)
             )
 
-    def __syncShowsRatings(self, traktShows: Dict, kodiShows: Dict, fromPercent: int, toPercent: int) -> None:
+    def __syncShowsRatings(
+        self, traktShows: Dict, kodiShows: Dict, fromPercent: int, toPercent: int
+    ) -> None:
         if (
             kodiUtilities.getSettingAsBool("trakt_sync_ratings")
             and traktShows
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktShows = copy.deepcopy(traktShows)
-            updateKodiKodiShows = copy.deepcopy(kodiShows)
-
             traktShowsToUpdate = utilities.compareShows(
-                updateKodiKodiShows,
-                updateKodiTraktShows,
+                kodiShows,
+                traktShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 rating=True,
             )
@@ -785,8 +942,8 @@ class SyncEpisodes:
                 logger.debug("[Episodes Sync] Trakt show ratings are up to date.")
             else:
                 logger.debug(
-                    "[Episodes Sync] %i show(s) will have show ratings added on Trakt"
-                    % len(traktShowsToUpdate["shows"])
+                    "[Episodes Sync] %i show(s) will have show ratings added on Trakt",
+                    len(traktShowsToUpdate["shows"]),
                 )
 
                 self.sync.UpdateProgress(
@@ -796,12 +953,13 @@ class SyncEpisodes:
                     % len(traktShowsToUpdate["shows"]),
                 )
 
+                self.traktUpdated = True
                 self.sync.traktapi.addRating(traktShowsToUpdate)
 
             # needs to be restricted, because we can't add a rating to an episode which is not in our Kodi collection
             kodiShowsUpdate = utilities.compareShows(
-                updateKodiTraktShows,
-                updateKodiKodiShows,
+                traktShows,
+                kodiShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 rating=True,
                 restrict=True,
@@ -814,8 +972,8 @@ class SyncEpisodes:
                 logger.debug("[Episodes Sync] Kodi show ratings are up to date.")
             else:
                 logger.debug(
-                    "[Episodes Sync] %i show(s) will have show ratings added in Kodi"
-                    % len(kodiShowsUpdate["shows"])
+                    "[Episodes Sync] %i show(s) will have show ratings added in Kodi",
+                    len(kodiShowsUpdate["shows"]),
                 )
 
                 shows = []
@@ -861,18 +1019,17 @@ class SyncEpisodes:
                     toPercent, line2=kodiUtilities.getString(32178) % len(shows)
                 )
 
-    def __syncEpisodeRatings(self, traktShows: Dict, kodiShows: Dict, fromPercent: int, toPercent: int) -> None:
+    def __syncEpisodeRatings(
+        self, traktShows: Dict, kodiShows: Dict, fromPercent: int, toPercent: int
+    ) -> None:
         if (
             kodiUtilities.getSettingAsBool("trakt_sync_ratings")
             and traktShows
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktShows = copy.deepcopy(traktShows)
-            updateKodiKodiShows = copy.deepcopy(kodiShows)
-
             traktShowsToUpdate = utilities.compareEpisodes(
-                updateKodiKodiShows,
-                updateKodiTraktShows,
+                kodiShows,
+                traktShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 rating=True,
             )
@@ -883,8 +1040,8 @@ class SyncEpisodes:
                 logger.debug("[Episodes Sync] Trakt episode ratings are up to date.")
             else:
                 logger.debug(
-                    "[Episodes Sync] %i show(s) will have episode ratings added on Trakt"
-                    % len(traktShowsToUpdate["shows"])
+                    "[Episodes Sync] %i show(s) will have episode ratings added on Trakt",
+                    len(traktShowsToUpdate["shows"]),
                 )
 
                 self.sync.UpdateProgress(
@@ -893,11 +1050,12 @@ class SyncEpisodes:
                     line2=kodiUtilities.getString(32182)
                     % len(traktShowsToUpdate["shows"]),
                 )
+                self.traktUpdated = True
                 self.sync.traktapi.addRating(traktShowsToUpdate)
 
             kodiShowsUpdate = utilities.compareEpisodes(
-                updateKodiTraktShows,
-                updateKodiKodiShows,
+                traktShows,
+                kodiShows,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 restrict=True,
                 rating=True,
@@ -909,14 +1067,14 @@ class SyncEpisodes:
                 logger.debug("[Episodes Sync] Kodi episode ratings are up to date.")
             else:
                 logger.debug(
-                    "[Episodes Sync] %i show(s) will have episode ratings added in Kodi"
-                    % len(kodiShowsUpdate["shows"])
+                    "[Episodes Sync] %i show(s) will have episode ratings added in Kodi",
+                    len(kodiShowsUpdate["shows"]),
                 )
                 for s in [
                     "%s" % self.__getShowAsString(s, short=True)
                     for s in kodiShowsUpdate["shows"]
                 ]:
-                    logger.debug("[Episodes Sync] Episodes updated: %s" % s)
+                    logger.debug("[Episodes Sync] Episodes updated: %s", s)
 
                 episodes = []
                 for show in kodiShowsUpdate["shows"]:
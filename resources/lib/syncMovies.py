@@ -1,10 +1,9 @@
 # -*- coding: utf-8 -*-
 
-import copy
 import logging
 from typing import Dict, List, Optional, Any, Union
 
-from resources.lib import kodiUtilities, utilities
+from resources.lib import kodiUtilities, records, utilities
 
 logger = logging.getLogger(__name__)
 
@@ -33,29 +32,36 @@ class SyncMovies:
             if sync.show_progress and not sync.run_silent:
                 progress.close()
             return
-        try:
-            traktMovies = self.__traktLoadMovies()
-        except Exception:
-            logger.debug(
-                "[Movies Sync] Error getting Trakt.tv movie list, aborting movie Sync."
-            )
-            if sync.show_progress and not sync.run_silent:
-                progress.close()
-            return
 
-        traktMoviesProgress = self.__traktLoadMoviesPlaybackProgress(25, 36)
-
-        self.__addMoviesToTraktCollection(kodiMovies, traktMovies, 37, 47)
-
-        self.__deleteMoviesFromTraktCollection(traktMovies, kodiMovies, 48, 58)
-
-        self.__addMoviesToTraktWatched(kodiMovies, traktMovies, 59, 69)
-
-        self.__addMoviesToKodiWatched(traktMovies, kodiMovies, 70, 80)
+        # only categories whose Trakt.tv watermark moved, or everything when
+        # Kodi or the sync settings changed since the last complete sync
+        fingerprint = self.sync.Fingerprint("movies", kodiMovies)
+        self.categories = self.sync.ChangedCategories("movies", fingerprint)
+        self.traktUpdated = False
+        traktMovies = []
+        if self.categories:
+            try:
+                traktMovies = self.__traktLoadMovies()
+            except Exception:
+                logger.debug(
+                    "[Movies Sync] Error getting Trakt.tv movie list, aborting movie Sync."
+                )
+                if sync.show_progress and not sync.run_silent:
+                    progress.close()
+                return
 
-        self.__addMovieProgressToKodi(traktMoviesProgress, kodiMovies, 81, 91)
+            self.__syncMovies(traktMovies, kodiMovies)
 
-        self.__syncMovieRatings(traktMovies, kodiMovies, 92, 99)
+            if (
+                not self.traktUpdated
+                and not self.sync.IsCanceled()
+                and self.sync.ListsComplete("movies")
+            ):
+                self.sync.SaveActivities("movies", fingerprint)
+        else:
+            logger.debug(
+                "[Movies Sync] Nothing changed on Trakt.tv or in Kodi since the last sync, skipping."
+            )
 
         if self.sync.show_progress and not self.sync.run_silent:
             self.sync.UpdateProgress(
@@ -71,11 +77,68 @@ class SyncMovies:
             )  # Sync complete
 
         logger.debug(
-            "[Movies Sync] Movies on Trakt.tv (%d), movies in Kodi (%d)."
-            % (len(traktMovies), len(kodiMovies))
+            "[Movies Sync] Movies on Trakt.tv (%d), movies in Kodi (%d).",
+            len(traktMovies),
+            len(kodiMovies),
         )
         logger.debug("[Movies Sync] Complete.")
 
+    def __syncMovies(self, traktMovies: List[Dict], kodiMovies: List[Dict]) -> None:
+        # phases only read the loaded lists, what they write is compared
+        # into copies, so the ones on different lanes can overlap
+        phases = self.sync.Phases()
+        if "paused" in self.categories:
+            phases.add(
+                "playback", lambda: self.__traktLoadMoviesPlaybackProgress(25, 36)
+            )
+
+        if "collected" in self.categories:
+            phases.add(
+                "add to trakt collection",
+                lambda: self.__addMoviesToTraktCollection(
+                    kodiMovies, traktMovies, 37, 47
+                ),
+                lane="trakt",
+            )
+            phases.add(
+                "delete from trakt collection",
+                lambda: self.__deleteMoviesFromTraktCollection(
+                    traktMovies, kodiMovies, 48, 58
+                ),
+                lane="trakt",
+            )
+
+        if "watched" in self.categories:
+            phases.add(
+                "add to trakt watched",
+                lambda: self.__addMoviesToTraktWatched(kodiMovies, traktMovies, 59, 69),
+                lane="trakt",
+            )
+            phases.add(
+                "add to kodi watched",
+                lambda: self.__addMoviesToKodiWatched(traktMovies, kodiMovies, 70, 80),
+                lane="kodi",
+            )
+
+        if "paused" in self.categories:
+            phases.add(
+                "add progress to kodi",
+                lambda: self.__addMovieProgressToKodi(
+                    phases.results["playback"], kodiMovies, 81, 91
+                ),
+                requires=["playback"],
+                lane="kodi",
+            )
+
+        if "rated" in self.categories:
+            phases.add(
+                "sync ratings",
+                lambda: self.__syncMovieRatings(traktMovies, kodiMovies, 92, 99),
+                lane="kodi",
+            )
+
+        self.sync.RunPhases(phases)
+
     def __kodiLoadMovies(self) -> Optional[List[Dict]]:
         self.sync.UpdateProgress(1, line2=kodiUtilities.getString(32079))
 
@@ -121,12 +184,16 @@ class SyncMovies:
         logger.debug("[Movies Sync] Getting movie collection from Trakt.tv")
 
         traktMovies = {}
-        traktMovies = self.sync.traktapi.getMoviesCollected(traktMovies)
+        if "collected" in self.categories:
+            traktMovies = self.sync.traktapi.getMoviesCollected(traktMovies)
 
         self.sync.UpdateProgress(17, line2=kodiUtilities.getString(32082))
-        traktMovies = self.sync.traktapi.getMoviesWatched(traktMovies)
+        if "watched" in self.categories:
+            traktMovies = self.sync.traktapi.getMoviesWatched(traktMovies)
 
-        if kodiUtilities.getSettingAsBool("trakt_sync_ratings"):
+        if "rated" in self.categories and kodiUtilities.getSettingAsBool(
+            "trakt_sync_ratings"
+        ):
             traktMovies = self.sync.traktapi.getMoviesRated(traktMovies)
 
         traktMovies = list(traktMovies.items())
@@ -134,13 +201,15 @@ class SyncMovies:
         self.sync.UpdateProgress(24, line2=kodiUtilities.getString(32083))
         movies = []
         for _, movie in traktMovies:
-            movie = movie.to_dict()
+            movie = records.Movie.from_dict(movie.to_dict())
 
             movies.append(movie)
 
         return movies
 
-    def __traktLoadMoviesPlaybackProgress(self, fromPercent: int, toPercent: int) -> Union[Dict, bool]:
+    def __traktLoadMoviesPlaybackProgress(
+        self, fromPercent: int, toPercent: int
+    ) -> Union[Dict, bool]:
         if (
             kodiUtilities.getSettingAsBool("trakt_movie_playback")
             and not self.sync.IsCanceled()
@@ -167,7 +236,7 @@ class SyncMovies:
                 )
 
                 # will keep the data in python structures - just like the KODI response
-                movie = movie.to_dict()
+                movie = records.Movie.from_dict(movie.to_dict())
 
                 moviesProgress["movies"].append(movie)
 
@@ -176,24 +245,25 @@ class SyncMovies:
             return moviesProgress
 
     def __addMoviesToTraktCollection(
-        self, kodiMovies: List[Dict], traktMovies: List[Dict], fromPercent: int, toPercent: int
+        self,
+        kodiMovies: List[Dict],
+        traktMovies: List[Dict],
+        fromPercent: int,
+        toPercent: int,
     ) -> None:
         if (
             kodiUtilities.getSettingAsBool("add_movies_to_trakt")
             and not self.sync.IsCanceled()
         ):
-            addTraktMovies = copy.deepcopy(traktMovies)
-            addKodiMovies = copy.deepcopy(kodiMovies)
-
             traktMoviesToAdd = utilities.compareMovies(
-                addKodiMovies,
-                addTraktMovies,
+                kodiMovies,
+                traktMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
             )
             utilities.sanitizeMovies(traktMoviesToAdd)
             logger.debug(
-                "[Movies Sync] Compared movies, found %s to add."
-                % len(traktMoviesToAdd)
+                "[Movies Sync] Compared movies, found %s to add.",
+                len(traktMoviesToAdd),
             )
 
             if len(traktMoviesToAdd) == 0:
@@ -205,16 +275,17 @@ class SyncMovies:
 
             titles = ", ".join(["%s" % (m["title"]) for m in traktMoviesToAdd])
             logger.debug(
-                "[Movies Sync] %i movie(s) will be added to Trakt.tv collection."
-                % len(traktMoviesToAdd)
+                "[Movies Sync] %i movie(s) will be added to Trakt.tv collection.",
+                len(traktMoviesToAdd),
             )
-            logger.debug("[Movies Sync] Movies to add : %s" % titles)
+            logger.debug("[Movies Sync] Movies to add : %s", titles)
 
             self.sync.UpdateProgress(
                 fromPercent,
                 line2=kodiUtilities.getString(32063) % len(traktMoviesToAdd),
             )
 
+            self.traktUpdated = True
             moviesToAdd = {"movies": traktMoviesToAdd}
             # logger.debug("Movies to add: %s" % moviesToAdd)
             try:
@@ -228,25 +299,26 @@ class SyncMovies:
             )
 
     def __deleteMoviesFromTraktCollection(
-        self, traktMovies: List[Dict], kodiMovies: List[Dict], fromPercent: int, toPercent: int
+        self,
+        traktMovies: List[Dict],
+        kodiMovies: List[Dict],
+        fromPercent: int,
+        toPercent: int,
     ) -> None:
         if (
             kodiUtilities.getSettingAsBool("clean_trakt_movies")
             and not self.sync.IsCanceled()
         ):
-            removeTraktMovies = copy.deepcopy(traktMovies)
-            removeKodiMovies = copy.deepcopy(kodiMovies)
-
             logger.debug("[Movies Sync] Starting to remove.")
             traktMoviesToRemove = utilities.compareMovies(
-                removeTraktMovies,
-                removeKodiMovies,
+                traktMovies,
+                kodiMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
             )
             utilities.sanitizeMovies(traktMoviesToRemove)
             logger.debug(
-                "[Movies Sync] Compared movies, found %s to remove."
-                % len(traktMoviesToRemove)
+                "[Movies Sync] Compared movies, found %s to remove.",
+                len(traktMoviesToRemove),
             )
 
             if len(traktMoviesToRemove) == 0:
@@ -260,16 +332,17 @@ class SyncMovies:
 
             titles = ", ".join(["%s" % (m["title"]) for m in traktMoviesToRemove])
             logger.debug(
-                "[Movies Sync] %i movie(s) will be removed from Trakt.tv collection."
-                % len(traktMoviesToRemove)
+                "[Movies Sync] %i movie(s) will be removed from Trakt.tv collection.",
+                len(traktMoviesToRemove),
             )
-            logger.debug("[Movies Sync] Movies removed: %s" % titles)
+            logger.debug("[Movies Sync] Movies removed: %s", titles)
 
             self.sync.UpdateProgress(
                 fromPercent,
                 line2=kodiUtilities.getString(32076) % len(traktMoviesToRemove),
             )
 
+            self.traktUpdated = True
             moviesToRemove = {"movies": traktMoviesToRemove}
             try:
                 self.sync.traktapi.removeFromCollection(moviesToRemove)
@@ -283,18 +356,19 @@ class SyncMovies:
             )
 
     def __addMoviesToTraktWatched(
-        self, kodiMovies: List[Dict], traktMovies: List[Dict], fromPercent: int, toPercent: int
+        self,
+        kodiMovies: List[Dict],
+        traktMovies: List[Dict],
+        fromPercent: int,
+        toPercent: int,
     ) -> None:
         if (
             kodiUtilities.getSettingAsBool("trakt_movie_playcount")
             and not self.sync.IsCanceled()
         ):
-            updateTraktTraktMovies = copy.deepcopy(traktMovies)
-            updateTraktKodiMovies = copy.deepcopy(kodiMovies)
-
             traktMoviesToUpdate = utilities.compareMovies(
-                updateTraktKodiMovies,
-                updateTraktTraktMovies,
+                kodiMovies,
+                traktMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 watched=True,
             )
@@ -309,16 +383,17 @@ class SyncMovies:
 
             titles = ", ".join(["%s" % (m["title"]) for m in traktMoviesToUpdate])
             logger.debug(
-                "[Movies Sync] %i movie(s) playcount will be updated on Trakt.tv"
-                % len(traktMoviesToUpdate)
+                "[Movies Sync] %i movie(s) playcount will be updated on Trakt.tv",
+                len(traktMoviesToUpdate),
             )
-            logger.debug("[Movies Sync] Movies updated: %s" % titles)
+            logger.debug("[Movies Sync] Movies updated: %s", titles)
 
             self.sync.UpdateProgress(
                 fromPercent,
                 line2=kodiUtilities.getString(32064) % len(traktMoviesToUpdate),
             )
             # Send request to update playcounts on Trakt.tv
+            self.traktUpdated = True
             chunksize = 200
             chunked_movies = utilities.chunks(
                 [movie for movie in traktMoviesToUpdate], chunksize
@@ -346,23 +421,26 @@ class SyncMovies:
                     logging.fatal(message)
                     errorcount += 1
 
-            logger.debug("[Movies Sync] Movies updated: %d error(s)" % errorcount)
+            logger.debug("[Movies Sync] Movies updated: %d error(s)", errorcount)
             self.sync.UpdateProgress(
                 toPercent,
                 line2=kodiUtilities.getString(32087) % len(traktMoviesToUpdate),
             )
 
-    def __addMoviesToKodiWatched(self, traktMovies: List[Dict], kodiMovies: List[Dict], fromPercent: int, toPercent: int) -> None:
+    def __addMoviesToKodiWatched(
+        self,
+        traktMovies: List[Dict],
+        kodiMovies: List[Dict],
+        fromPercent: int,
+        toPercent: int,
+    ) -> None:
         if (
             kodiUtilities.getSettingAsBool("kodi_movie_playcount")
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktMovies = copy.deepcopy(traktMovies)
-            updateKodiKodiMovies = copy.deepcopy(kodiMovies)
-
             kodiMoviesToUpdate = utilities.compareMovies(
-                updateKodiTraktMovies,
-                updateKodiKodiMovies,
+                traktMovies,
+                kodiMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 watched=True,
                 restrict=True,
@@ -377,10 +455,10 @@ class SyncMovies:
 
             titles = ", ".join(["%s" % (m["title"]) for m in kodiMoviesToUpdate])
             logger.debug(
-                "[Movies Sync] %i movie(s) playcount will be updated in Kodi"
-                % len(kodiMoviesToUpdate)
+                "[Movies Sync] %i movie(s) playcount will be updated in Kodi",
+                len(kodiMoviesToUpdate),
             )
-            logger.debug("[Movies Sync] Movies to add: %s" % titles)
+            logger.debug("[Movies Sync] Movies to add: %s", titles)
 
             self.sync.UpdateProgress(
                 fromPercent,
@@ -427,18 +505,21 @@ class SyncMovies:
                 line2=kodiUtilities.getString(32090) % len(kodiMoviesToUpdate),
             )
 
-    def __addMovieProgressToKodi(self, traktMovies: Dict, kodiMovies: List[Dict], fromPercent: int, toPercent: int) -> None:
+    def __addMovieProgressToKodi(
+        self,
+        traktMovies: Dict,
+        kodiMovies: List[Dict],
+        fromPercent: int,
+        toPercent: int,
+    ) -> None:
         if (
             kodiUtilities.getSettingAsBool("trakt_movie_playback")
             and traktMovies
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktMovies = copy.deepcopy(traktMovies)
-            updateKodiKodiMovies = copy.deepcopy(kodiMovies)
-
             kodiMoviesToUpdate = utilities.compareMovies(
-                updateKodiTraktMovies["movies"],
-                updateKodiKodiMovies,
+                traktMovies["movies"],
+                kodiMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 restrict=True,
                 playback=True,
@@ -451,8 +532,8 @@ class SyncMovies:
                 return
 
             logger.debug(
-                "[Movies Sync] %i movie(s) progress will be updated in Kodi"
-                % len(kodiMoviesToUpdate)
+                "[Movies Sync] %i movie(s) progress will be updated in Kodi",
+                len(kodiMoviesToUpdate),
             )
 
             self.sync.UpdateProgress(
@@ -513,18 +594,21 @@ class SyncMovies:
                 line2=kodiUtilities.getString(32128) % len(kodiMoviesToUpdate),
             )
 
-    def __syncMovieRatings(self, traktMovies: List[Dict], kodiMovies: List[Dict], fromPercent: int, toPercent: int) -> None:
+    def __syncMovieRatings(
+        self,
+        traktMovies: List[Dict],
+        kodiMovies: List[Dict],
+        fromPercent: int,
+        toPercent: int,
+    ) -> None:
         if (
             kodiUtilities.getSettingAsBool("trakt_sync_ratings")
             and traktMovies
             and not self.sync.IsCanceled()
         ):
-            updateKodiTraktMovies = copy.deepcopy(traktMovies)
-            updateKodiKodiMovies = copy.deepcopy(kodiMovies)
-
             traktMoviesToUpdate = utilities.compareMovies(
-                updateKodiKodiMovies,
-                updateKodiTraktMovies,
+                kodiMovies,
+                traktMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 rating=True,
             )
@@ -535,8 +619,8 @@ class SyncMovies:
                 logger.debug("[Movies Sync] Trakt movie ratings are up to date.")
             else:
                 logger.debug(
-                    "[Movies Sync] %i movie(s) ratings will be updated on Trakt"
-                    % len(traktMoviesToUpdate)
+                    "[Movies Sync] %i movie(s) ratings will be updated on Trakt",
+                    len(traktMoviesToUpdate),
                 )
 
                 self.sync.UpdateProgress(
@@ -545,13 +629,14 @@ class SyncMovies:
                     line2=kodiUtilities.getString(32180) % len(traktMoviesToUpdate),
                 )
 
+                self.traktUpdated = True
                 moviesRatings = {"movies": traktMoviesToUpdate}
 
                 self.sync.traktapi.addRating(moviesRatings)
 
             kodiMoviesToUpdate = utilities.compareMovies(
-                updateKodiTraktMovies,
-                updateKodiKodiMovies,
+                traktMovies,
+                kodiMovies,
                 kodiUtilities.getSettingAsBool("scrobble_fallback"),
                 restrict=True,
                 rating=True,
@@ -563,8 +648,8 @@ class SyncMovies:
                 logger.debug("[Movies Sync] Kodi movie ratings are up to date.")
             else:
                 logger.debug(
-                    "[Movies Sync] %i movie(s) ratings will be updated in Kodi"
-                    % len(kodiMoviesToUpdate)
+                    "[Movies Sync] %i movie(s) ratings will be updated in Kodi",
+                    len(kodiMoviesToUpdate),
                 )
 
                 self.sync.UpdateProgress(
@@ -1,18 +1,31 @@
 # -*- coding: utf-8 -*-
 #
+import codecs
+import contextvars
+import itertools
 import logging
 import os
+import re
 import socket
+import ssl
 import threading
 import time
-from json import dumps, loads
-from typing import Any, Dict, Iterable, List, Optional
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from json import JSONDecodeError, JSONDecoder, dumps, loads
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 import urllib.error
 import urllib.parse
-import urllib.request
 
 import xbmcaddon
 from resources.lib import deviceAuthDialog
+from resources.lib.connectionpool import ConnectionPool, NotSentError
+from resources.lib.outbox import Outbox
+from resources.lib.ratelimit import BACKGROUND, INTERACTIVE, USER_ACTION, RateLimiter
+from resources.lib.records import to_json
+from resources.lib.sqlitecache import SqliteCache
+from resources.lib.sqlitemirror import SqliteMirror
 from resources.lib.kodiUtilities import (
     checkAndConfigureProxy,
     getSetting,
@@ -22,6 +35,8 @@ from resources.lib.kodiUtilities import (
     setSetting,
 )
 from resources.lib.utilities import (
+    chunks,
+    countEpisodes,
     findEpisodeMatchInList,
     findMovieMatchInList,
     findSeasonMatchInList,
@@ -35,6 +50,94 @@ __addonversion__ = __addon__.getAddonInfo("version")
 
 logger = logging.getLogger(__name__)
 
+# the sync running in this context, prefetched lists are only handed to it
+_sync_scope: contextvars.ContextVar = contextvars.ContextVar(
+    "trakt_sync_scope", default=None
+)
+# endpoints of the lists the reader in this context could not download whole
+_incomplete_lists: contextvars.ContextVar = contextvars.ContextVar(
+    "trakt_incomplete_lists", default=None
+)
+
+
+# error codes returned with include_error_code when no answer came back:
+# OFFLINE when Trakt.tv could not be reached and the request never left,
+# NO_ANSWER when it was sent and may have been applied all the same
+OFFLINE = -1
+NO_ANSWER = -2
+
+_json_decoder = JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def _decode_text(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def load_json(chunks: Iterable[bytes]) -> Any:
+    """Parse a JSON body from byte chunks, building a top-level array item by item.
+
+    Only the unparsed tail of an array is held as text, so a large page never
+    sits in memory as bytes, str and objects at once. Other values are parsed
+    whole. An empty body gives None.
+    """
+    texts = _decode_text(chunks)
+    text = ""
+    for text in texts:
+        text = text.lstrip()
+        if text:
+            break
+    if not text:
+        return None
+    if text[0] != "[":
+        return loads(text + "".join(texts))
+
+    items = []
+    pos = 1
+    last = "["
+    exhausted = False
+    while True:
+        pos = _whitespace.match(text, pos).end()
+        if pos < len(text):
+            char = text[pos]
+            if char == "]" and last != ",":
+                return items
+            if last == "item":
+                if char != ",":
+                    raise JSONDecodeError("Expecting ',' delimiter", text, pos)
+                pos += 1
+                last = ","
+                continue
+            try:
+                item, end = _json_decoder.raw_decode(text, pos)
+            except JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # a value is only complete once its delimiter has arrived, a
+                # number cut off by the chunk boundary would parse too early
+                after = _whitespace.match(text, end).end()
+                if exhausted or (after < len(text) and text[after] in ",]"):
+                    items.append(item)
+                    pos = end
+                    last = "item"
+                    continue
+        elif exhausted:
+            raise JSONDecodeError("Expecting ']'", text, pos)
+        more = next(texts, None)
+        if more is None:
+            exhausted = True
+        else:
+            text = text[pos:] + more
+            pos = 0
+
 
 class TraktObject(object):
     def __init__(
@@ -96,6 +199,9 @@ class TraktSeason(object):
 class TraktClient(object):
     api_url = "https://api.trakt.tv"
     max_retry_after = 60
+    # idle keep-alive connections kept for reuse across requests and threads
+    pool_size = 4
+    ssl_context: Optional[ssl.SSLContext] = None
 
     def __init__(
         self,
@@ -103,11 +209,34 @@ class TraktClient(object):
         client_secret: str,
         user_agent: str,
         proxy_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        cache: Optional[SqliteCache] = None,
+        limiter: Optional[RateLimiter] = None,
     ) -> None:
         self.client_id = client_id
         self.client_secret = client_secret
         self.user_agent = user_agent
         self.proxy_url = proxy_url
+        # unauthorized GETs asked to be cached are revalidated against it
+        self.cache = cache
+        # paces requests under the API limits, shared by the clients given it
+        self.limiter = limiter
+        if pool_size is not None:
+            self.pool_size = pool_size
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ConnectionPool(
+                    self.api_url,
+                    proxy_url=self.proxy_url,
+                    size=self.pool_size,
+                    context=self.ssl_context,
+                )
+            return self._pool
 
     def request(
         self,
@@ -119,9 +248,12 @@ class TraktClient(object):
         retry: bool = True,
         include_headers: bool = False,
         include_error_code: bool = False,
+        cache: bool = False,
+        priority: int = BACKGROUND,
     ) -> Any:
-        url = self.api_url + path
-        data = dumps(body).encode("utf-8") if body is not None else None
+        data = (
+            dumps(body, default=to_json).encode("utf-8") if body is not None else None
+        )
         headers = {
             "Content-Type": "application/json",
             "trakt-api-version": "2",
@@ -131,33 +263,64 @@ class TraktClient(object):
         if authorization and authorization.get("access_token"):
             headers["Authorization"] = "Bearer %s" % authorization["access_token"]
 
-        request = urllib.request.Request(url, data=data, headers=headers, method=method)
-        opener = urllib.request.build_opener()
-        if self.proxy_url:
-            opener = urllib.request.build_opener(
-                urllib.request.ProxyHandler(
-                    {"http": self.proxy_url, "https": self.proxy_url}
-                )
-            )
-
+        cached = None
+        cache = (
+            cache and self.cache is not None and method == "GET" and not authorization
+        )
+        if cache:
+            cached = self.cache.get(path)
+            if cached:
+                etag, last_modified, _ = cached
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+        if self.limiter is not None:
+            self.limiter.acquire(method, priority)
         try:
-            with opener.open(request, timeout=timeout) as response:
-                raw = response.read().decode("utf-8")
-                data = loads(raw) if raw else None
-                if include_error_code:
-                    return data, None
-                if include_headers:
-                    return data, response.headers
-                return data
+            try:
+                chunks, response_headers = self.pool.stream(
+                    method,
+                    path,
+                    body=data,
+                    headers=headers,
+                    timeout=timeout,
+                    retry=retry,
+                )
+            except urllib.error.HTTPError as exc:
+                if exc.code != 304 or not cached:
+                    raise
+                logger.debug("Trakt response for %s not modified, using cache", path)
+                chunks, response_headers = [cached[2]], exc.headers
+            else:
+                etag = response_headers.get("ETag")
+                last_modified = response_headers.get("Last-Modified")
+                if cache and (etag or last_modified):
+                    raw = b"".join(chunks)
+                    self.cache.put(path, etag, last_modified, raw)
+                    chunks = [raw]
+            data = load_json(chunks)
+            if include_error_code:
+                return data, None
+            if include_headers:
+                return data, response_headers
+            return data
         except urllib.error.HTTPError as exc:
             if exc.code == 429 and retry:
                 retry_after = self._retry_after(exc)
                 if retry_after is not None:
                     logger.debug(
-                        "Trakt rate limit reached: retrying %s %s after %s seconds"
-                        % (method, path, retry_after)
+                        "Trakt rate limit reached: retrying %s %s after %s seconds",
+                        method,
+                        path,
+                        retry_after,
                     )
-                    time.sleep(retry_after)
+                    if self.limiter is not None:
+                        # every thread holds off, the retry waits its turn
+                        self.limiter.pause(method, retry_after)
+                    else:
+                        time.sleep(retry_after)
                     return self.request(
                         method,
                         path,
@@ -167,17 +330,24 @@ class TraktClient(object):
                         retry=False,
                         include_headers=include_headers,
                         include_error_code=include_error_code,
+                        cache=cache,
+                        priority=priority,
                     )
             if exc.code == 401 and authorization and authorization.get("refresh_token"):
                 raise
-            logger.debug("Trakt request failed: %s %s -> %s" % (method, path, exc.code))
+            logger.debug("Trakt request failed: %s %s -> %s", method, path, exc.code)
             if include_error_code:
                 return None, exc.code
             return None
+        except NotSentError as exc:
+            logger.debug("Trakt request not sent: %s %s -> %s", method, path, exc)
+            if include_error_code:
+                return None, OFFLINE
+            return None
         except (urllib.error.URLError, TimeoutError, socket.timeout) as exc:
-            logger.debug("Trakt request failed: %s %s -> %s" % (method, path, exc))
+            logger.debug("Trakt request failed: %s %s -> %s", method, path, exc)
             if include_error_code:
-                return None, None
+                return None, NO_ANSWER
             return None
 
     def _retry_after(self, exc: urllib.error.HTTPError) -> Optional[int]:
@@ -200,6 +370,222 @@ class TraktClient(object):
         return "%s%s%s" % (path, separator, urllib.parse.urlencode(clean_params))
 
 
+class HistoryWriter(object):
+    """Sends shows to /sync/history packed into requests of at most
+    ``max_episodes`` episodes, splitting shows and seasons too large for one.
+
+    The response is matched back to the shows sent: those in ``not_found``
+    were not added and are collected in ``not_found``. A request Trakt.tv
+    refused was not applied, so its shows are sent again in halves until
+    the ones refused are found and collected in ``failed``; a request
+    refused for being rate limited, unauthorized or by a server error is
+    not split, all its shows are ``failed``. A request that never left,
+    Trakt.tv could not be reached, is kept in the outbox, which replays it,
+    and its shows are collected in ``queued``. One sent without an answer
+    may have been applied, its shows are collected in ``unknown`` and never
+    sent again. retry() sends the failed shows once more, one request each.
+    """
+
+    max_episodes = 1000
+
+    def __init__(self, api: "traktAPI", max_episodes: Optional[int] = None) -> None:
+        self.api = api
+        if max_episodes is not None:
+            self.max_episodes = max_episodes
+        self.added = 0
+        self.requests = 0
+        self.not_found: List[Dict] = []
+        self.failed: List[Dict] = []
+        self.queued: List[Dict] = []
+        self.unknown: List[Dict] = []
+        self._shows: List[Dict] = []
+        self._count = 0
+
+    def add(self, show: Dict) -> None:
+        for part in self._split(show):
+            count = countEpisodes([part])
+            if self._shows and self._count + count > self.max_episodes:
+                self.flush()
+            self._shows.append(part)
+            self._count += count
+
+    def flush(self) -> None:
+        shows, self._shows, self._count = self._shows, [], 0
+        if shows:
+            self._send(shows)
+
+    def retry(self) -> None:
+        """Send every failed show again on its own, once. None of them was
+        added, so no play is recorded twice; those refused again are
+        collected again. Shows not found would not be matched a second time
+        and are not sent again."""
+        shows, self.failed = self.failed, []
+        for show in shows:
+            self._send([show])
+
+    def _split(self, show: Dict) -> Iterator[Dict]:
+        if countEpisodes([show]) <= self.max_episodes:
+            yield show
+            return
+        seasons: List[Dict] = []
+        count = 0
+        for season in show["seasons"]:
+            for episodes in chunks(season["episodes"], self.max_episodes):
+                if seasons and count + len(episodes) > self.max_episodes:
+                    yield self._part(show, seasons)
+                    seasons, count = [], 0
+                part = season.copy()
+                part["episodes"] = episodes
+                seasons.append(part)
+                count += len(episodes)
+        if seasons:
+            yield self._part(show, seasons)
+
+    @staticmethod
+    def _part(show: Dict, seasons: List[Dict]) -> Dict:
+        part = show.copy()
+        part["seasons"] = seasons
+        return part
+
+    def _send(self, shows: List[Dict]) -> None:
+        self.requests += 1
+        data, error_code = self.api.addToHistory(
+            {"shows": shows}, include_error_code=True
+        )
+        if error_code is None:
+            self._matchResponse(shows, data or {})
+        elif error_code == OFFLINE:
+            self.queued.extend(shows)
+        elif error_code == NO_ANSWER:
+            self.unknown.extend(shows)
+        elif len(shows) > 1 and error_code < 500 and error_code not in (401, 403, 429):
+            # something in the request was refused, look for it in halves
+            middle = len(shows) // 2
+            self._send(shows[:middle])
+            self._send(shows[middle:])
+        else:
+            logger.debug(
+                "Trakt.tv refused history of %d show(s) with %s", len(shows), error_code
+            )
+            self.failed.extend(shows)
+
+    def _matchResponse(self, shows: List[Dict], data: Dict) -> None:
+        self.added += (data.get("added") or {}).get("episodes", 0)
+        missing = set()
+        for item in (data.get("not_found") or {}).get("shows", []):
+            missing.update(
+                (id_type, str(value))
+                for id_type, value in (item.get("ids") or {}).items()
+            )
+        if not missing:
+            return
+        for show in shows:
+            ids = show.get("ids") or {}
+            if any((id_type, str(value)) in missing for id_type, value in ids.items()):
+                self.not_found.append(show)
+
+
+class ShowMerger(object):
+    """Merges show items from the Trakt.tv sync lists into a store of shows.
+
+    Every show touched is kept as mutable dicts, its seasons and episodes
+    indexed by number, so an item is merged in place whatever the show
+    already holds. freeze() turns them into the store's TraktObjects once
+    all items are merged.
+    """
+
+    def __init__(self, store: Dict, normalize: Callable[[Dict, Dict], None]) -> None:
+        self.store = store
+        self.normalize = normalize
+        self._shows: Dict[Any, Dict] = {}
+
+    def _show(self, key: Any) -> Dict:
+        show = self._shows.get(key)
+        if show is None:
+            existing = self.store.get(key)
+            show = existing.to_dict() if existing else {}
+            show["seasons"] = self._index(show.get("seasons"))
+            self._shows[key] = show
+        return show
+
+    @staticmethod
+    def _index(seasons: Optional[List]) -> Dict:
+        indexed = {}
+        for season in seasons or []:
+            season = dict(season)
+            season["episodes"] = {
+                episode.get("number"): dict(episode)
+                for episode in season.get("episodes") or []
+            }
+            indexed[season.get("number")] = season
+        return indexed
+
+    def add(self, item: Dict, metadata_keys: Iterable[str]) -> None:
+        show = item.get("show") or item
+        incoming_seasons = item.get("seasons", show.get("seasons", []))
+        if item.get("season"):
+            season = dict(item["season"])
+            for key in metadata_keys:
+                if key in item:
+                    season[key] = item[key]
+            incoming_seasons = [season]
+        elif item.get("episode"):
+            episode = dict(item["episode"])
+            for key in metadata_keys:
+                if key in item:
+                    episode[key] = item[key]
+            incoming_seasons = [
+                {"number": episode.get("season"), "episodes": [episode]}
+            ]
+        else:
+            show = dict(show)
+            for key in metadata_keys:
+                if key in item:
+                    show[key] = item[key]
+        ids = show.get("ids") or {}
+        key = (
+            ids.get("trakt") or show.get("title") or len(self.store) + len(self._shows)
+        )
+        merged = self._show(key)
+        seasons = merged["seasons"]
+        if "seasons" in show:
+            # a show that lists its seasons replaces those merged before
+            seasons.clear()
+        for name, value in show.items():
+            if name != "seasons":
+                merged[name] = value
+
+        for season in incoming_seasons or []:
+            number = season.get("number")
+            merged_season = seasons.get(number)
+            if merged_season is None:
+                merged_season = seasons[number] = {"number": number, "episodes": {}}
+            episodes = merged_season["episodes"]
+            for episode in season.get("episodes") or []:
+                episode_number = episode.get("number")
+                merged_episode = episodes.get(episode_number)
+                if merged_episode is None:
+                    merged_episode = episodes[episode_number] = {
+                        "number": episode_number
+                    }
+                merged_episode.update(episode)
+                self.normalize(merged_episode, episode)
+            for name, value in season.items():
+                if name != "episodes":
+                    merged_season[name] = value
+
+    def freeze(self) -> Dict:
+        for key, show in self._shows.items():
+            data = dict(show)
+            data["seasons"] = [
+                dict(season, episodes=list(season["episodes"].values()))
+                for season in show["seasons"].values()
+            ]
+            self.store[key] = TraktObject(data)
+        self._shows = {}
+        return self.store
+
+
 class traktAPI(object):
     # Placeholders for build-time injection
     __client_id: str = "TRAKT_CLIENT_ID_PLACEHOLDER"
@@ -207,6 +593,60 @@ class traktAPI(object):
     authorization: Optional[Dict] = None
     authDialog: Optional[deviceAuthDialog.DeviceAuthDialog] = None
     client: Optional[TraktClient] = None
+    mirror: Optional[SqliteMirror] = None
+    # one outbox per process, every traktAPI instance shares it
+    outbox: Optional[Outbox] = None
+    _outbox_lock = threading.Lock()
+    # a queued write must be replayed by one thread only, or it is sent twice
+    _flush_lock = threading.Lock()
+    lastActivities: Optional[Dict] = None
+    # pages after the first are fetched concurrently by at most this many
+    # workers, keeping bursts well inside Trakt.tv's GET rate limit
+    page_workers = 4
+    # a scrobble stopped past this progress is a play on Trakt.tv
+    watched_percent = 80
+    # the paginated lists read for every sync category, as (path, params);
+    # prefetchLists() downloads up to list_workers of them at once
+    sync_lists = {
+        "movies": {
+            "collected": [("/sync/collection/movies", None)],
+            "watched": [("/sync/watched/movies", None)],
+            "rated": [("/sync/ratings/movies", None)],
+            "paused": [("/sync/playback/movies", None)],
+        },
+        "episodes": {
+            "collected": [("/sync/collection/shows", None)],
+            "watched": [("/sync/watched/shows", {"extended": "progress"})],
+            "rated": [("/sync/ratings/shows", None), ("/sync/ratings/episodes", None)],
+            "paused": [("/sync/playback/episodes", None)],
+        },
+    }
+    list_workers = 4
+    _prefetched: Optional[Dict] = None
+    _prefetch_lock = threading.Lock()
+    _refresh_lock = threading.Lock()
+    # user ratings per media type, indexed by (id type, id), kept for
+    # ratings_ttl seconds and dropped whenever a rating is sent
+    ratings_ttl = 15 * 60
+    _ratings_cache: Optional[Dict] = None
+    _ratings_lock = threading.Lock()
+    # one budget for every thread and traktAPI instance of the add-on
+    limiter = RateLimiter()
+
+    # paginated sync lists and the /sync/last_activities timestamp that moves
+    # whenever their content changes on Trakt.tv
+    mirrored_activities = {
+        "/sync/collection/movies": ("movies", "collected_at"),
+        "/sync/watched/movies": ("movies", "watched_at"),
+        "/sync/playback/movies": ("movies", "paused_at"),
+        "/sync/ratings/movies": ("movies", "rated_at"),
+        "/sync/collection/shows": ("episodes", "collected_at"),
+        "/sync/watched/shows": ("episodes", "watched_at"),
+        "/sync/playback/episodes": ("episodes", "paused_at"),
+        "/sync/ratings/episodes": ("episodes", "rated_at"),
+        "/sync/ratings/shows": ("shows", "rated_at"),
+        "/sync/ratings/seasons": ("seasons", "rated_at"),
+    }
 
     def __init__(self, force: bool = False) -> None:
         logger.debug("Initializing.")
@@ -222,7 +662,18 @@ class traktAPI(object):
             client_secret = deobfuscate(self.__client_secret)
 
         user_agent = "Kodi script.trakt/%s" % __addonversion__
-        self.client = TraktClient(client_id, client_secret, user_agent, proxyURL)
+        self.client = TraktClient(
+            client_id,
+            client_secret,
+            user_agent,
+            proxyURL,
+            cache=SqliteCache(),
+            limiter=self.limiter,
+        )
+        self.mirror = SqliteMirror()
+        with self._outbox_lock:
+            if traktAPI.outbox is None:
+                traktAPI.outbox = Outbox()
 
         if getSetting("authorization") and not force:
             self.authorization = loads(getSetting("authorization"))
@@ -250,8 +701,9 @@ class traktAPI(object):
             return
 
         logger.debug(
-            'Enter the code "%s" at %s to authenticate your account'
-            % (code.get("user_code"), code.get("verification_url"))
+            'Enter the code "%s" at %s to authenticate your account',
+            code.get("user_code"),
+            code.get("verification_url"),
         )
 
         self.authDialog = deviceAuthDialog.DeviceAuthDialog(
@@ -298,7 +750,8 @@ class traktAPI(object):
                 continue
             if error_code in (404, 409, 410, 418):
                 logger.debug(
-                    "Device authentication stopped with status %s" % error_code
+                    "Device authentication stopped with status %s",
+                    error_code,
                 )
                 self.on_expired()
                 return
@@ -314,9 +767,12 @@ class traktAPI(object):
         timeout: int = 30,
         include_headers: bool = False,
         retry: bool = True,
+        cache: bool = False,
+        include_error_code: bool = False,
+        priority: int = BACKGROUND,
     ) -> Any:
         if not self.client:
-            return None
+            return (None, OFFLINE) if include_error_code else None
         authorization = self.authorization if authorized else None
         try:
             return self.client.request(
@@ -327,6 +783,9 @@ class traktAPI(object):
                 timeout=timeout,
                 retry=retry,
                 include_headers=include_headers,
+                include_error_code=include_error_code,
+                cache=cache,
+                priority=priority,
             )
         except urllib.error.HTTPError as exc:
             if (
@@ -335,23 +794,32 @@ class traktAPI(object):
                 and self.authorization
                 and self.authorization.get("refresh_token")
             ):
-                refreshed = self.client.request(
-                    "POST",
-                    "/oauth/token",
-                    {
-                        "refresh_token": self.authorization.get("refresh_token"),
-                        "client_id": self.client.client_id,
-                        "client_secret": self.client.client_secret,
-                        "redirect_uri": "urn:ietf:wg:oauth:2.0:oob",
-                        "grant_type": "refresh_token",
-                    },
-                    timeout=90,
-                    retry=False,
-                )
-                if refreshed:
-                    self.on_token_refreshed(refreshed)
-                    if not retry:
-                        return None
+                # refresh tokens are single use, so concurrent page requests
+                # must not refresh twice; a token another thread already
+                # refreshed is simply reused
+                with self._refresh_lock:
+                    if self.authorization is authorization:
+                        refreshed = self.client.request(
+                            "POST",
+                            "/oauth/token",
+                            {
+                                "refresh_token": self.authorization.get(
+                                    "refresh_token"
+                                ),
+                                "client_id": self.client.client_id,
+                                "client_secret": self.client.client_secret,
+                                "redirect_uri": "urn:ietf:wg:oauth:2.0:oob",
+                                "grant_type": "refresh_token",
+                            },
+                            timeout=90,
+                            retry=False,
+                            priority=priority,
+                        )
+                        if refreshed:
+                            self.on_token_refreshed(refreshed)
+                    else:
+                        refreshed = self.authorization
+                if refreshed and retry:
                     return self.client.request(
                         method,
                         path,
@@ -360,9 +828,11 @@ class traktAPI(object):
                         timeout=timeout,
                         retry=False,
                         include_headers=include_headers,
+                        include_error_code=include_error_code,
+                        priority=priority,
                     )
-            logger.debug("Trakt request failed: %s %s -> %s" % (method, path, exc.code))
-            return None
+            logger.debug("Trakt request failed: %s %s -> %s", method, path, exc.code)
+            return (None, exc.code) if include_error_code else None
 
     def _get(
         self,
@@ -371,6 +841,7 @@ class traktAPI(object):
         timeout: int = 30,
         include_headers: bool = False,
         retry: bool = True,
+        cache: bool = False,
     ) -> Any:
         return self._request(
             "GET",
@@ -379,6 +850,7 @@ class traktAPI(object):
             timeout=timeout,
             include_headers=include_headers,
             retry=retry,
+            cache=cache,
         )
 
     def _post(
@@ -388,6 +860,7 @@ class traktAPI(object):
         authorized: bool = True,
         timeout: int = 30,
         retry: bool = True,
+        priority: int = BACKGROUND,
     ) -> Any:
         return self._request(
             "POST",
@@ -396,8 +869,109 @@ class traktAPI(object):
             authorized=authorized,
             timeout=timeout,
             retry=retry,
+            priority=priority,
         )
 
+    def _write(
+        self,
+        path: str,
+        body: Dict,
+        retry: bool = True,
+        include_error_code: bool = False,
+        priority: int = BACKGROUND,
+    ) -> Any:
+        # writes that never left because Trakt.tv could not be reached are
+        # kept in the outbox and replayed by flushOutbox() once it can be; a
+        # write that got no answer may have been applied and is not kept
+        data, error_code = self._request(
+            "POST",
+            path,
+            body=body,
+            authorized=True,
+            timeout=30,
+            retry=retry,
+            include_error_code=True,
+            priority=priority,
+        )
+        if self.outbox is not None:
+            if error_code is None:
+                self.outbox.wake()
+            elif error_code == OFFLINE:
+                self.outbox.put(path, body)
+        if include_error_code:
+            return data, error_code
+        return data
+
+    def flushOutbox(self, force: bool = False) -> bool:
+        """Replay the queued writes, every endpoint's in one request.
+
+        Returns False when Trakt.tv could not be reached and the writes left
+        are retried after a growing delay, unless forced. A forced flush
+        waits for one running in another thread, any other leaves it to it.
+        """
+        if self.outbox is None or not (force or self.outbox.due()):
+            return True
+        if not self._flush_lock.acquire(blocking=force):
+            return True
+        try:
+            return self._flushOutbox()
+        finally:
+            self._flush_lock.release()
+
+    def _flushOutbox(self) -> bool:
+        while True:
+            batches = self.outbox.batches()
+            if not batches:
+                return True
+            for path, body, count in batches:
+                # never retried automatically, a replay must not add a play twice
+                data, error_code = self._request(
+                    "POST",
+                    path,
+                    body=body,
+                    authorized=True,
+                    timeout=30,
+                    retry=False,
+                    include_error_code=True,
+                )
+                if (
+                    error_code == OFFLINE
+                    or error_code in (401, 429)
+                    or (error_code is not None and error_code >= 500)
+                ):
+                    delay = self.outbox.failed()
+                    logger.debug(
+                        "Replaying %d queued writes to %s failed with %s, retrying in %s seconds",
+                        count,
+                        path,
+                        error_code,
+                        delay,
+                    )
+                    return False
+                if error_code is None:
+                    logger.debug(
+                        "Replayed %d queued writes to %s: %s", count, path, data
+                    )
+                elif error_code == NO_ANSWER:
+                    # it may have been applied, sending it again could not
+                    # be told apart from a second play
+                    logger.debug(
+                        "Dropping %d queued writes to %s left without an answer",
+                        count,
+                        path,
+                    )
+                else:
+                    # rejected by Trakt.tv, sending it again would not help
+                    logger.debug(
+                        "Dropping %d queued writes to %s rejected with %s",
+                        count,
+                        path,
+                        error_code,
+                    )
+                self.outbox.sent(path, count)
+                if path == "/sync/ratings":
+                    self.invalidateRatings()
+
     def _get_all_pages(
         self,
         path: str,
@@ -406,52 +980,262 @@ class traktAPI(object):
         limit: int = 100,
         params: Optional[Dict] = None,
     ) -> List:
+        return list(
+            self._iter_all_pages(
+                path, authorized=authorized, timeout=timeout, limit=limit, params=params
+            )
+        )
+
+    def _iter_all_pages(
+        self,
+        path: str,
+        authorized: bool = False,
+        timeout: int = 90,
+        limit: int = 100,
+        params: Optional[Dict] = None,
+    ) -> Iterator:
         if not self.client:
+            return
+        prefetched = self._takePrefetched(self.client.build_path(path, params))
+        if prefetched is not None:
+            yield from prefetched.result()
+            return
+        yield from self._iter_pages(path, authorized, timeout, limit, params)
+
+    @contextmanager
+    def syncScope(self) -> Iterator[None]:
+        """Lists prefetched inside this block are only served to readers in
+        it, or in the threads its scheduler runs; a scrobbler lookup in the
+        meantime downloads its own copy."""
+        token = _sync_scope.set(object())
+        try:
+            with self._recordIncomplete():
+                yield
+        finally:
+            self.forgetPrefetched(_sync_scope.get())
+            _sync_scope.reset(token)
+
+    @contextmanager
+    def _recordIncomplete(self) -> Iterator[set]:
+        """Collects the endpoints of the lists cut short inside this block,
+        in the threads it hands its context to as well."""
+        incomplete: set = set()
+        outer = _incomplete_lists.get()
+        token = _incomplete_lists.set(incomplete)
+        try:
+            yield incomplete
+        finally:
+            _incomplete_lists.reset(token)
+            if outer is not None:
+                outer.update(incomplete)
+
+    def prefetchLists(self, media_type: str, categories: Iterable[str]) -> None:
+        """Start downloading the lists of these sync categories in the
+        background, the getters of the same sync scope reading them later are
+        served the result."""
+        scope = _sync_scope.get()
+        if not self.client or scope is None:
+            return
+        lists = [
+            entry
+            for category in categories
+            for entry in self.sync_lists[media_type].get(category, [])
+        ]
+        if not lists:
+            return
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.list_workers, len(lists)),
+            thread_name_prefix="trakt-lists",
+        )
+        with self._prefetch_lock:
+            if self._prefetched is None:
+                self._prefetched = {}
+            for path, params in lists:
+                logger.debug("Prefetching %s", path)
+                # a list cut short is recorded in the scope of the sync
+                context = contextvars.copy_context()
+                self._prefetched[self.client.build_path(path, params)] = (
+                    scope,
+                    executor.submit(context.run, self._fetch_list, path, params),
+                )
+        executor.shutdown(wait=False)
+
+    def _fetch_list(self, path: str, params: Optional[Dict]) -> List:
+        return list(self._iter_pages(path, True, 90, 100, params))
+
+    def _takePrefetched(self, endpoint: str) -> Any:
+        scope = _sync_scope.get()
+        with self._prefetch_lock:
+            if scope is None or not self._prefetched:
+                return None
+            entry = self._prefetched.get(endpoint)
+            if entry is None or entry[0] is not scope:
+                return None
+            del self._prefetched[endpoint]
+            return entry[1]
+
+    def incompleteLists(self, media_type: str) -> List[str]:
+        """The lists of this media type the current sync could not download
+        whole; what it synced from them is partial and must be synced again."""
+        incomplete = _incomplete_lists.get()
+        if not incomplete:
             return []
+        paths = [
+            path
+            for entries in self.sync_lists[media_type].values()
+            for path, _ in entries
+        ]
+        return sorted(
+            endpoint for endpoint in incomplete if endpoint.split("?", 1)[0] in paths
+        )
 
-        results = []
-        page = 1
-        page_count = 1
-        while page <= page_count:
-            query = {"page": page, "limit": limit}
-            if params:
-                query.update(params)
-            page_path = self.client.build_path(path, query)
-            response = self._get(
-                page_path,
-                authorized=authorized,
-                timeout=timeout,
-                include_headers=True,
-            )
-            if not response:
-                break
+    def _listIncomplete(self, endpoint: str) -> None:
+        logger.debug("Download of %s failed, the list is incomplete", endpoint)
+        incomplete = _incomplete_lists.get()
+        if incomplete is not None:
+            incomplete.add(endpoint)
+
+    def forgetPrefetched(self, scope: Any = None) -> None:
+        """Drop the lists prefetched in this sync scope, or all of them."""
+        with self._prefetch_lock:
+            forgotten = [
+                endpoint
+                for endpoint, entry in (self._prefetched or {}).items()
+                if scope is None or entry[0] is scope
+            ]
+            futures = [self._prefetched.pop(endpoint)[1] for endpoint in forgotten]
+        for future in futures:
+            future.cancel()
 
-            data, headers = response
-            if data:
-                if isinstance(data, list):
-                    results.extend(data)
-                else:
-                    results.append(data)
+    def _iter_pages(
+        self,
+        path: str,
+        authorized: bool,
+        timeout: int,
+        limit: int,
+        params: Optional[Dict],
+    ) -> Iterator:
+        # items are yielded page by page, with at most page_workers pages
+        # downloaded ahead of the consumer, so a long list is never held whole
+
+        endpoint = self.client.build_path(path, params)
+        watermark = self._mirror_watermark(path)
+        if watermark:
+            mirrored = self.mirror.get(endpoint, watermark)
+            if mirrored is not None:
+                logger.debug("Using mirrored %s from %s", endpoint, watermark)
+                yield from mirrored
+                return
+            # never leave a stale or incomplete list behind in the mirror
+            self.mirror.discard(endpoint)
 
-            try:
-                page_count = int(headers.get("X-Pagination-Page-Count", page_count))
-            except (TypeError, ValueError):
-                page_count = page
-            page += 1
-
-        return results
-
-    def _get_all_ratings(self, media_type: str) -> List:
-        results = []
-        for rating in range(1, 11):
-            results.extend(
-                self._get_all_pages(
-                    "/sync/ratings/%s/%s" % (media_type, rating),
-                    authorized=True,
-                    timeout=90,
+        response = self._get_page(path, 1, authorized, timeout, limit, params)
+        if not response:
+            self._listIncomplete(endpoint)
+            return
+
+        data, headers = response
+        try:
+            page_count = int(headers.get("X-Pagination-Page-Count", 1))
+        except (TypeError, ValueError):
+            page_count = 1
+
+        position = 0
+        items = self._page_items(data)
+        if watermark and not self.mirror.append(endpoint, position, items):
+            watermark = None
+        position += len(items)
+        yield from items
+
+        if page_count > 1:
+            workers = min(self.page_workers, page_count - 1)
+            remaining = iter(range(2, page_count + 1))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+
+                def fetch(page: int) -> Any:
+                    return executor.submit(
+                        self._get_page, path, page, authorized, timeout, limit, params
+                    )
+
+                pages = deque(
+                    fetch(page) for page in itertools.islice(remaining, workers)
                 )
+                try:
+                    while pages:
+                        response = pages.popleft().result()
+                        if not response:
+                            watermark = None
+                            self._listIncomplete(endpoint)
+                            break
+                        page = next(remaining, None)
+                        if page is not None:
+                            pages.append(fetch(page))
+                        items = self._page_items(response[0])
+                        if watermark and not self.mirror.append(
+                            endpoint, position, items
+                        ):
+                            watermark = None
+                        position += len(items)
+                        yield from items
+                finally:
+                    for pending in pages:
+                        pending.cancel()
+
+        if watermark:
+            self.mirror.mark(endpoint, watermark)
+
+    def _get_page(
+        self,
+        path: str,
+        page: int,
+        authorized: bool,
+        timeout: int,
+        limit: int,
+        params: Optional[Dict],
+    ) -> Any:
+        query = {"page": page, "limit": limit}
+        if params:
+            query.update(params)
+        return self._get(
+            self.client.build_path(path, query),
+            authorized=authorized,
+            timeout=timeout,
+            include_headers=True,
+        )
+
+    @staticmethod
+    def _page_items(data: Any) -> List:
+        if not data:
+            return []
+        if isinstance(data, list):
+            return data
+        return [data]
+
+    def _mirror_watermark(self, path: str) -> Optional[str]:
+        if not self.mirror or not self.lastActivities:
+            return None
+        # rating buckets (/sync/ratings/movies/10) share the activity of their type
+        activity = self.mirrored_activities.get(path) or self.mirrored_activities.get(
+            path.rsplit("/", 1)[0]
+        )
+        if not activity:
+            return None
+        group, key = activity
+        return (self.lastActivities.get(group) or {}).get(key)
+
+    def _get_all_ratings(self, media_type: str, rating: Optional[int] = None) -> List:
+        if rating is not None:
+            return self._get_all_pages(
+                "/sync/ratings/%s/%s" % (media_type, rating),
+                authorized=True,
+                timeout=90,
             )
-        return results
+        # one paginated walk over every score, bucketed by rating like the
+        # former per-score requests returned them
+        results = self._get_all_pages(
+            "/sync/ratings/%s" % media_type, authorized=True, timeout=90
+        )
+        return sorted(results, key=lambda item: item.get("rating") or 0)
 
     def _merge_object(
         self, store: Dict, item: Dict, media_key: str, metadata_keys: Iterable[str]
@@ -492,35 +1276,18 @@ class traktAPI(object):
     def _merge_show(
         self, store: Dict, item: Dict, metadata_keys: Iterable[str]
     ) -> None:
-        show = dict(item.get("show") or item)
-        incoming_seasons = item.get("seasons", show.get("seasons", []))
-        if item.get("season"):
-            season = dict(item["season"])
-            for key in metadata_keys:
-                if key in item:
-                    season[key] = item[key]
-            incoming_seasons = [season]
-        elif item.get("episode"):
-            episode = dict(item["episode"])
-            for key in metadata_keys:
-                if key in item:
-                    episode[key] = item[key]
-            incoming_seasons = [
-                {"number": episode.get("season"), "episodes": [episode]}
-            ]
-        else:
-            for key in metadata_keys:
-                if key in item:
-                    show[key] = item[key]
-        ids = show.get("ids") or {}
-        key = ids.get("trakt") or show.get("title") or len(store)
-        existing = store.get(key)
-        merged = existing.to_dict() if existing else {}
-        merged.update(show)
-        merged["seasons"] = self._merge_seasons(
-            merged.get("seasons", []), incoming_seasons
-        )
-        store[key] = TraktObject(merged)
+        merger = ShowMerger(store, self._normalize_video)
+        merger.add(item, metadata_keys)
+        merger.freeze()
+
+    def _merge_shows(
+        self, store: Dict, items: Iterable[Dict], metadata_keys: Iterable[str]
+    ) -> Dict:
+        merger = ShowMerger(store, self._normalize_video)
+        for item in items:
+            merger.add(item, metadata_keys)
+        merger.freeze()
+        return store
 
     def _merge_seasons(self, existing: List, incoming: List) -> List:
         seasons = {season.get("number"): dict(season) for season in existing or []}
@@ -562,12 +1329,21 @@ class traktAPI(object):
         """
         self.authorization = token
         setSetting("authorization", dumps(self.authorization))
-        logger.debug("Authentication complete: %r" % token)
+        setSetting("last_activities", "")
+        self.invalidateRatings()
+        if self.mirror:
+            self.mirror.purge()
+        self.purgeCache()
+        logger.debug("Authentication complete: %r", token)
         if self.authDialog:
             self.authDialog.close()
         notification(getString(32157), getString(32152), 3000)
         self.updateUser()
 
+    def purgeCache(self) -> None:
+        if self.client and self.client.cache:
+            self.client.cache.purge()
+
     def on_expired(self) -> None:
         """Triggered when the device authentication code has expired"""
 
@@ -605,28 +1381,84 @@ class traktAPI(object):
         if status not in ("start", "pause", "stop"):
             logger.debug("scrobble() Bad scrobble status")
             return None
-        return self._post(
-            "/scrobble/%s" % status,
-            {"show": show, "episode": episode, "progress": percent},
+        response, error_code = self._scrobble(
+            status, {"show": show, "episode": episode, "progress": percent}
         )
+        if (
+            error_code == OFFLINE
+            and status == "stop"
+            and percent >= self.watched_percent
+        ):
+            self._queueWatched(
+                {
+                    "shows": [
+                        dict(
+                            show,
+                            seasons=[
+                                {
+                                    "number": episode["season"],
+                                    "episodes": [{"number": episode["number"]}],
+                                }
+                            ],
+                        )
+                    ]
+                }
+            )
+        return response
 
     def scrobbleMovie(self, movie: Dict, percent: float, status: str) -> Optional[Dict]:
         if status not in ("start", "pause", "stop"):
             logger.debug("scrobble() Bad scrobble status")
             return None
-        return self._post(
-            "/scrobble/%s" % status, {"movie": movie, "progress": percent}
+        response, error_code = self._scrobble(
+            status, {"movie": movie, "progress": percent}
         )
+        if (
+            error_code == OFFLINE
+            and status == "stop"
+            and percent >= self.watched_percent
+        ):
+            self._queueWatched({"movies": [movie]})
+        return response
+
+    def _scrobble(self, status: str, body: Dict) -> Any:
+        response = self._request(
+            "POST",
+            "/scrobble/%s" % status,
+            body=body,
+            authorized=True,
+            include_error_code=True,
+            # what is playing now goes ahead of any sync traffic
+            priority=INTERACTIVE,
+        )
+        if response[1] is None and self.outbox is not None:
+            self.outbox.wake()
+        return response
+
+    def _queueWatched(self, body: Dict) -> None:
+        # a scrobble stop lost on the way is replayed as a play in the history
+        if self.outbox is not None:
+            self.outbox.put("/sync/history", body)
+
+    def getLastActivities(self) -> Optional[Dict]:
+        # remembered until forgetLastActivities() so the sync lists fetched in
+        # between can be served from the mirror
+        self.lastActivities = self._get("/sync/last_activities", authorized=True)
+        return self.lastActivities
+
+    def forgetLastActivities(self) -> None:
+        self.lastActivities = None
+        self.forgetPrefetched(_sync_scope.get())
 
     def getShowsCollected(self, shows: Dict) -> Dict:
-        for item in self._get_all_pages(
-            "/sync/collection/shows", authorized=True, timeout=90
-        ):
-            self._merge_show(shows, item, ("collected_at",))
-        return shows
+        return self._merge_shows(
+            shows,
+            self._iter_all_pages("/sync/collection/shows", authorized=True, timeout=90),
+            ("collected_at",),
+        )
 
     def getMoviesCollected(self, movies: Dict) -> Dict:
-        for item in self._get_all_pages(
+        for item in self._iter_all_pages(
             "/sync/collection/movies", authorized=True, timeout=90
         ):
             self._merge_object(movies, item, "movie", ("collected_at",))
@@ -636,19 +1468,19 @@ class traktAPI(object):
         # extended=progress is required for the season/episode breakdown; without
         # it Trakt returns show-level plays only and episode watched-state can't
         # be synced. All sync endpoints are also paginated, so page through them.
-        for item in self._get_all_pages(
-            "/sync/watched/shows",
-            authorized=True,
-            timeout=90,
-            params={"extended": "progress"},
-        ):
-            self._merge_show(
-                shows, item, ("plays", "last_watched_at", "last_updated_at", "reset_at")
-            )
-        return shows
+        return self._merge_shows(
+            shows,
+            self._iter_all_pages(
+                "/sync/watched/shows",
+                authorized=True,
+                timeout=90,
+                params={"extended": "progress"},
+            ),
+            ("plays", "last_watched_at", "last_updated_at", "reset_at"),
+        )
 
     def getMoviesWatched(self, movies: Dict) -> Dict:
-        for item in self._get_all_pages(
+        for item in self._iter_all_pages(
             "/sync/watched/movies", authorized=True, timeout=90
         ):
             self._merge_object(
@@ -657,14 +1489,14 @@ class traktAPI(object):
         return movies
 
     def getShowsRated(self, shows: Dict) -> Dict:
-        for item in self._get_all_ratings("shows"):
-            self._merge_show(shows, item, ("rated_at", "rating"))
-        return shows
+        return self._merge_shows(
+            shows, self._get_all_ratings("shows"), ("rated_at", "rating")
+        )
 
     def getEpisodesRated(self, shows: Dict) -> Dict:
-        for item in self._get_all_ratings("episodes"):
-            self._merge_show(shows, item, ("rated_at", "rating"))
-        return shows
+        return self._merge_shows(
+            shows, self._get_all_ratings("episodes"), ("rated_at", "rating")
+        )
 
     def getMoviesRated(self, movies: Dict) -> Dict:
         for item in self._get_all_ratings("movies"):
@@ -677,52 +1509,96 @@ class traktAPI(object):
     def removeFromCollection(self, mediaObject: Dict) -> Optional[Dict]:
         return self._post("/sync/collection/remove", mediaObject)
 
-    def addToHistory(self, mediaObject: Dict) -> Optional[Dict]:
+    def addToHistory(self, mediaObject: Dict, include_error_code: bool = False) -> Any:
         # don't retry this call; it may cause multiple watches
-        return self._request(
-            "POST",
+        return self._write(
             "/sync/history",
-            body=mediaObject,
-            authorized=True,
-            timeout=30,
+            mediaObject,
             retry=False,
+            include_error_code=include_error_code,
         )
 
+    def historyWriter(self, max_episodes: Optional[int] = None) -> HistoryWriter:
+        return HistoryWriter(self, max_episodes)
+
     def addToWatchlist(self, mediaObject: Dict) -> Optional[Dict]:
-        return self._post("/sync/watchlist", mediaObject)
+        return self._write("/sync/watchlist", mediaObject, priority=USER_ACTION)
+
+    def _getRatingsIndex(self, media_type: str) -> Dict:
+        with self._ratings_lock:
+            cached = (self._ratings_cache or {}).get(media_type)
+            if cached and time.time() - cached[0] < self.ratings_ttl:
+                return cached[1]
 
-    def getShowRatingForUser(self, showId: str, idType: str = "tvdb") -> Dict:
         ratings = {}
-        self.getShowsRated(ratings)
+        with self._recordIncomplete() as incomplete:
+            if media_type == "movies":
+                self.getMoviesRated(ratings)
+            elif media_type == "shows":
+                self.getShowsRated(ratings)
+            elif media_type == "episodes":
+                self.getEpisodesRated(ratings)
+            else:
+                self._merge_shows(
+                    ratings, self._get_all_ratings(media_type), ("rated_at", "rating")
+                )
+
+        index = {}
+        for item in ratings.values():
+            for id_type, value in item.keys:
+                index.setdefault((id_type, str(value)), item)
+
+        # a list cut short would hide ratings until the ttl, the next lookup
+        # downloads it again
+        if incomplete:
+            return index
+        # kept empty too, a user without ratings would otherwise download
+        # the list on every lookup
+        with self._ratings_lock:
+            if self._ratings_cache is None:
+                self._ratings_cache = {}
+            self._ratings_cache[media_type] = (time.time(), index)
+        return index
+
+    def _getRatedItem(self, media_type: str, id: str, idType: str) -> Dict:
+        item = self._getRatingsIndex(media_type).get((idType, str(id)))
+        return {id: item} if item else {}
+
+    def invalidateRatings(self) -> None:
+        with self._ratings_lock:
+            self._ratings_cache = None
+
+    def getShowRatingForUser(self, showId: str, idType: str = "tvdb") -> Dict:
+        ratings = self._getRatedItem("shows", showId, idType)
         return findShowMatchInList(showId, ratings, idType)
 
     def getSeasonRatingForUser(
         self, showId: str, season: int, idType: str = "tvdb"
     ) -> Dict:
-        ratings = {}
-        for item in self._get_all_ratings("seasons"):
-            self._merge_show(ratings, item, ("rated_at", "rating"))
+        ratings = self._getRatedItem("seasons", showId, idType)
         return findSeasonMatchInList(showId, season, ratings, idType)
 
     def getEpisodeRatingForUser(
         self, showId: str, season: int, episode: int, idType: str = "tvdb"
     ) -> Dict:
-        ratings = {}
-        self.getEpisodesRated(ratings)
+        ratings = self._getRatedItem("episodes", showId, idType)
         return findEpisodeMatchInList(showId, season, episode, ratings, idType)
 
     def getMovieRatingForUser(self, movieId: str, idType: str = "imdb") -> Dict:
-        ratings = {}
-        self.getMoviesRated(ratings)
+        ratings = self._getRatedItem("movies", movieId, idType)
         return findMovieMatchInList(movieId, ratings, idType)
 
     # Send a rating to Trakt as mediaObject so we can add the rating
     def addRating(self, mediaObject: Dict) -> Optional[Dict]:
-        return self._post("/sync/ratings", mediaObject)
+        response = self._write("/sync/ratings", mediaObject, priority=USER_ACTION)
+        self.invalidateRatings()
+        return response
 
     # Send a rating to Trakt as mediaObject so we can remove the rating
     def removeRating(self, mediaObject: Dict) -> Optional[Dict]:
-        return self._post("/sync/ratings/remove", mediaObject)
+        response = self._post("/sync/ratings/remove", mediaObject, priority=USER_ACTION)
+        self.invalidateRatings()
+        return response
 
     def getMoviePlaybackProgress(self) -> List[TraktObject]:
         progressMovies = []
@@ -762,13 +1638,15 @@ class traktAPI(object):
         path = "/movies/%s" % urllib.parse.quote(str(movieId), safe="")
         if self.client:
             path = self.client.build_path(path, {"extended": extended})
-        result = self._get(path)
+        result = self._get(path, cache=True)
         if result is not None:
             result.setdefault("watched", False)
         return TraktObject(result or {})
 
     def getShowSummary(self, showId: str) -> TraktObject:
-        result = self._get("/shows/%s" % urllib.parse.quote(str(showId), safe=""))
+        result = self._get(
+            "/shows/%s" % urllib.parse.quote(str(showId), safe=""), cache=True
+        )
         if result is not None:
             result.setdefault("seasons", [])
         return TraktObject(result or {})
@@ -778,6 +1656,7 @@ class traktAPI(object):
             "/shows/%s/seasons?extended=episodes"
             % urllib.parse.quote(str(showId), safe=""),
             timeout=90,
+            cache=True,
         )
         return [TraktSeason(season) for season in result or []]
 
@@ -791,7 +1670,7 @@ class traktAPI(object):
         )
         if self.client:
             path = self.client.build_path(path, {"extended": extended})
-        result = self._get(path)
+        result = self._get(path, cache=True)
         if result is not None:
             result.setdefault("season", season)
         return TraktObject(result or {})
@@ -814,8 +1693,8 @@ class traktAPI(object):
             return None
         if type not in ("movie", "show", "person"):
             logger.debug(
-                "Skipping %s text search; current Trakt API contract only exposes movie, show, and person search"
-                % type
+                "Skipping %s text search; current Trakt API contract only exposes movie, show, and person search",
+                type,
             )
             return None
         path = self.client.build_path(
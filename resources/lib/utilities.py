@@ -10,6 +10,7 @@ from typing import Tuple, List, Dict, Union, Optional
 import dateutil.parser
 from datetime import datetime
 from dateutil.tz import tzutc, tzlocal
+from resources.lib import records
 
 # make strptime call prior to doing anything, to try and prevent threading
 # errors
@@ -63,32 +64,65 @@ def getFormattedItemName(type: str, info: Dict) -> str:
     return s
 
 
-def __findInList(list_data: List, case_sensitive: bool = True, **kwargs) -> Optional[Dict]:
-    for item in list_data:
-        i = 0
-        for key in kwargs:
-            # because we can need to find at the root level and inside ids this
-            # is is required
-            if key in item:
-                key_val = item[key]
-            else:
-                if "ids" in item and key in item["ids"]:
-                    key_val = item["ids"][key]
-                else:
-                    continue
-            if not case_sensitive and isinstance(key_val, str):
-                if key_val.lower() == kwargs[key].lower():
-                    i = i + 1
-            else:
-                # forcing the compare to be done at the string level
-                if str(key_val) == str(kwargs[key]):
-                    i = i + 1
-        if i == len(kwargs):
-            return item
-    return None
-
+class MediaIndex(object):
+    """Hash lookups over a list of media objects, built once per collection.
+
+    Matching follows the old linear scan: values are compared on their ``str()``
+    form, a key at the root of an item wins over the same key in its ``ids`` and
+    the first item in list order is kept when several items share a value.
+    """
+
+    id_types = ("imdb", "tmdb", "tvdb")
+
+    def __init__(self, list_data: List) -> None:
+        self.ids = {id_type: {} for id_type in self.id_types}
+        self.titles = {}
+        self.titlesAndYears = {}
+        for item in list_data or []:
+            if not item:
+                continue
+            for id_type in self.id_types:
+                value = self.__lookup(item, id_type)
+                if value is not None:
+                    self.ids[id_type].setdefault(value, item)
+            title = self.__lookup(item, "title")
+            if title is not None:
+                self.titles.setdefault(title, item)
+                year = self.__lookup(item, "year")
+                if year is not None:
+                    self.titlesAndYears.setdefault((title, year), item)
+
+    @staticmethod
+    def __lookup(item: Dict, key: str) -> Optional[str]:
+        # because we can need to find at the root level and inside ids this
+        # is is required
+        if key in item:
+            return str(item[key])
+        ids = item.get("ids") or {}
+        if key in ids:
+            return str(ids[key])
+        return None
+
+    def findById(self, id_type: str, value: Union[str, int]) -> Optional[Dict]:
+        return self.ids[id_type].get(str(value))
+
+    def findByTitle(self, title: str) -> Optional[Dict]:
+        return self.titles.get(str(title))
+
+    def findByTitleAndYear(self, title: str, year: Union[str, int]) -> Optional[Dict]:
+        return self.titlesAndYears.get((str(title), str(year)))
+
+
+def findMediaObject(
+    mediaObjectToMatch: Dict,
+    listToSearch: Union[List, MediaIndex],
+    matchByTitleAndYear: bool,
+) -> Optional[Dict]:
+    if isinstance(listToSearch, MediaIndex):
+        index = listToSearch
+    else:
+        index = MediaIndex(listToSearch)
 
-def findMediaObject(mediaObjectToMatch: Dict, listToSearch: List, matchByTitleAndYear: bool) -> Optional[Dict]:
     result = None
     if (
         result is None
@@ -96,7 +130,7 @@ def findMediaObject(mediaObjectToMatch: Dict, listToSearch: List, matchByTitleAn
         and "imdb" in mediaObjectToMatch["ids"]
         and str(mediaObjectToMatch["ids"]["imdb"]).startswith("tt")
     ):
-        result = __findInList(listToSearch, imdb=mediaObjectToMatch["ids"]["imdb"])
+        result = index.findById("imdb", mediaObjectToMatch["ids"]["imdb"])
     # we don't want to give up if we don't find a match based on the first
     # field so we use if instead of elif
     if (
@@ -105,14 +139,14 @@ def findMediaObject(mediaObjectToMatch: Dict, listToSearch: List, matchByTitleAn
         and "tmdb" in mediaObjectToMatch["ids"]
         and mediaObjectToMatch["ids"]["tmdb"]
     ):
-        result = __findInList(listToSearch, tmdb=mediaObjectToMatch["ids"]["tmdb"])
+        result = index.findById("tmdb", mediaObjectToMatch["ids"]["tmdb"])
     if (
         result is None
         and "ids" in mediaObjectToMatch
         and "tvdb" in mediaObjectToMatch["ids"]
         and mediaObjectToMatch["ids"]["tvdb"]
     ):
-        result = __findInList(listToSearch, tvdb=mediaObjectToMatch["ids"]["tvdb"])
+        result = index.findById("tvdb", mediaObjectToMatch["ids"]["tvdb"])
 
     if matchByTitleAndYear:
         # match by title and year it will result in movies with the same title and
@@ -122,14 +156,12 @@ def findMediaObject(mediaObjectToMatch: Dict, listToSearch: List, matchByTitleAn
             and "title" in mediaObjectToMatch
             and "year" in mediaObjectToMatch
         ):
-            result = __findInList(
-                listToSearch,
-                title=mediaObjectToMatch["title"],
-                year=mediaObjectToMatch["year"],
+            result = index.findByTitleAndYear(
+                mediaObjectToMatch["title"], mediaObjectToMatch["year"]
             )
         # match only by title, as some items don't have a year on trakt
         elif result is None and "title" in mediaObjectToMatch:
-            result = __findInList(listToSearch, title=mediaObjectToMatch["title"])
+            result = index.findByTitle(mediaObjectToMatch["title"])
 
     return result
 
@@ -192,7 +224,9 @@ def findShowMatchInList(id: str, listToMatch: Dict, idType: str) -> Dict:
     )
 
 
-def findSeasonMatchInList(id: str, seasonNumber: int, listToMatch: Dict, idType: str) -> Dict:
+def findSeasonMatchInList(
+    id: str, seasonNumber: int, listToMatch: Dict, idType: str
+) -> Dict:
     show = findShowMatchInList(id, listToMatch, idType)
     logger.debug("findSeasonMatchInList %s" % show)
     if "seasons" in show:
@@ -203,7 +237,9 @@ def findSeasonMatchInList(id: str, seasonNumber: int, listToMatch: Dict, idType:
     return {}
 
 
-def findEpisodeMatchInList(id: str, seasonNumber: int, episodeNumber: int, list_data: Dict, idType: str) -> Dict:
+def findEpisodeMatchInList(
+    id: str, seasonNumber: int, episodeNumber: int, list_data: Dict, idType: str
+) -> Dict:
     season = findSeasonMatchInList(id, seasonNumber, list_data, idType)
     if season:
         for episode in season["episodes"]:
@@ -296,7 +332,9 @@ def best_id(ids: Dict, type: str) -> Tuple[str, str]:
         return ids["slug"], "slug"
 
 
-def checkExcludePath(excludePath: str, excludePathEnabled: bool, fullpath: str, x: int) -> bool:
+def checkExcludePath(
+    excludePath: str, excludePathEnabled: bool, fullpath: str, x: int
+) -> bool:
     if excludePath != "" and excludePathEnabled and fullpath.startswith(excludePath):
         logger.debug(
             "checkExclusion(): Video is from location, which is currently set as excluded path %i."
@@ -353,7 +391,9 @@ def compareMovies(
     playback: bool = False,
     rating: bool = False,
 ) -> List:
+    # neither collection is modified, the result holds copies of the movies
     movies = []
+    movies_col2 = MediaIndex(movies_col2)
     for movie_col1 in movies_col1:
         if movie_col1:
             movie_col2 = findMediaObject(movie_col1, movies_col2, matchByTitleAndYear)
@@ -363,58 +403,63 @@ def compareMovies(
             if movie_col2:  # match found
                 if watched:  # are we looking for watched items
                     if movie_col2["watched"] == 0 and movie_col1["watched"] == 1:
-                        if "movieid" not in movie_col1:
-                            movie_col1["movieid"] = movie_col2["movieid"]
-                        movies.append(movie_col1)
+                        movies.append(__withMovieId(movie_col1, movie_col2))
                 elif playback:
-                    if "movieid" not in movie_col1:
-                        movie_col1["movieid"] = movie_col2["movieid"]
-                    movie_col1["runtime"] = movie_col2["runtime"]
-                    movies.append(movie_col1)
+                    movie = __withMovieId(movie_col1, movie_col2)
+                    movie["runtime"] = movie_col2["runtime"]
+                    movies.append(movie)
                 elif rating:
                     if (
                         "rating" in movie_col1
                         and movie_col1["rating"] != 0
                         and ("rating" not in movie_col2 or movie_col2["rating"] == 0)
                     ):
-                        if "movieid" not in movie_col1:
-                            movie_col1["movieid"] = movie_col2["movieid"]
-                        movies.append(movie_col1)
+                        movies.append(__withMovieId(movie_col1, movie_col2))
                 else:
                     if "collected" in movie_col2 and not movie_col2["collected"]:
-                        movies.append(movie_col1)
+                        movies.append(movie_col1.copy())
             else:  # no match found
                 if not restrict:
                     if "collected" in movie_col1 and movie_col1["collected"]:
                         if watched and (movie_col1["watched"] == 1):
-                            movies.append(movie_col1)
+                            movies.append(movie_col1.copy())
                         elif rating and movie_col1["rating"] != 0:
-                            movies.append(movie_col1)
+                            movies.append(movie_col1.copy())
                         elif not watched and not rating:
-                            movies.append(movie_col1)
+                            movies.append(movie_col1.copy())
     return movies
 
 
+def __withMovieId(movie_col1: Dict, movie_col2: Dict) -> Dict:
+    movie = movie_col1.copy()
+    if "movieid" not in movie:
+        movie["movieid"] = movie_col2["movieid"]
+    return movie
+
+
 def compareShows(
-    shows_col1: Dict, shows_col2: Dict, matchByTitleAndYear: bool, rating: bool = False, restrict: bool = False
+    shows_col1: Dict,
+    shows_col2: Dict,
+    matchByTitleAndYear: bool,
+    rating: bool = False,
+    restrict: bool = False,
 ) -> Dict:
     shows = []
     # logger.debug("shows_col1 %s" % shows_col1)
     # logger.debug("shows_col2 %s" % shows_col2)
+    shows_col2 = MediaIndex(shows_col2["shows"])
     for show_col1 in shows_col1["shows"]:
         if show_col1:
-            show_col2 = findMediaObject(
-                show_col1, shows_col2["shows"], matchByTitleAndYear
-            )
+            show_col2 = findMediaObject(show_col1, shows_col2, matchByTitleAndYear)
             # logger.debug("show_col1 %s" % show_col1)
             # logger.debug("show_col2 %s" % show_col2)
 
             if show_col2:
-                show = {
-                    "title": show_col1["title"],
-                    "ids": {},
-                    "year": show_col1["year"],
-                }
+                show = records.Show(
+                    title=show_col1["title"],
+                    ids={},
+                    year=show_col1["year"],
+                )
                 if show_col1["ids"]:
                     show["ids"].update(show_col1["ids"])
                 if show_col2["ids"]:
@@ -434,11 +479,11 @@ def compareShows(
                     shows.append(show)
             else:
                 if not restrict:
-                    show = {
-                        "title": show_col1["title"],
-                        "ids": {},
-                        "year": show_col1["year"],
-                    }
+                    show = records.Show(
+                        title=show_col1["title"],
+                        ids={},
+                        year=show_col1["year"],
+                    )
                     if show_col1["ids"]:
                         show["ids"].update(show_col1["ids"])
 
@@ -452,7 +497,8 @@ def compareShows(
     return result
 
 
-# always return shows_col1 if you have enrich it, but don't return shows_col2
+# always return shows_col1 if you have enrich it, but don't return shows_col2;
+# neither collection is modified, the result holds copies of the episodes
 def compareEpisodes(
     shows_col1: Dict,
     shows_col2: Dict,
@@ -466,11 +512,12 @@ def compareEpisodes(
     shows = []
     # logger.debug("epi shows_col1 %s" % shows_col1)
     # logger.debug("epi shows_col2 %s" % shows_col2)
+    shows_col2 = MediaIndex(shows_col2["shows"])
+    if restrict and collected:
+        collected = MediaIndex(collected["shows"])
     for show_col1 in shows_col1["shows"]:
         if show_col1:
-            show_col2 = findMediaObject(
-                show_col1, shows_col2["shows"], matchByTitleAndYear
-            )
+            show_col2 = findMediaObject(show_col1, shows_col2, matchByTitleAndYear)
             # logger.debug("show_col1 %s" % show_col1)
             # logger.debug("show_col2 %s" % show_col2)
 
@@ -489,18 +536,9 @@ def compareEpisodes(
                             if len(t) > 0:
                                 eps = {}
                                 for ep in t:
-                                    eps[ep] = a[ep]
-                                    if "episodeid" in season_col2[season][ep]["ids"]:
-                                        if "ids" in eps:
-                                            eps[ep]["ids"]["episodeid"] = season_col2[
-                                                season
-                                            ][ep]["ids"]["episodeid"]
-                                        else:
-                                            eps[ep]["ids"] = {
-                                                "episodeid": season_col2[season][ep][
-                                                    "ids"
-                                                ]["episodeid"]
-                                            }
+                                    eps[ep] = __withEpisodeId(
+                                        a[ep], season_col2[season][ep]
+                                    )
                                     eps[ep]["runtime"] = season_col2[season][ep][
                                         "runtime"
                                     ]
@@ -515,30 +553,16 @@ def compareEpisodes(
                                         and a[ep]["rating"] != 0
                                         and season_col2[season][ep]["rating"] == 0
                                     ):
-                                        eps[ep] = a[ep]
-                                        if (
-                                            "episodeid"
-                                            in season_col2[season][ep]["ids"]
-                                        ):
-                                            if "ids" in eps:
-                                                eps[ep]["ids"]["episodeid"] = (
-                                                    season_col2[season][ep]["ids"][
-                                                        "episodeid"
-                                                    ]
-                                                )
-                                            else:
-                                                eps[ep]["ids"] = {
-                                                    "episodeid": season_col2[season][
-                                                        ep
-                                                    ]["ids"]["episodeid"]
-                                                }
+                                        eps[ep] = __withEpisodeId(
+                                            a[ep], season_col2[season][ep]
+                                        )
                                 if len(eps) > 0:
                                     season_diff[season] = eps
                         elif len(diff) > 0:
                             if restrict:
                                 # get all the episodes that we have in Kodi, watched or not - update kodi
                                 collectedShow = findMediaObject(
-                                    show_col1, collected["shows"], matchByTitleAndYear
+                                    show_col1, collected, matchByTitleAndYear
                                 )
                                 # logger.debug("collected %s" % collectedShow)
                                 collectedSeasons = __getEpisodes(
@@ -552,43 +576,31 @@ def compareEpisodes(
                                 if len(t) > 0:
                                     eps = {}
                                     for ep in t:
-                                        eps[ep] = a[ep]
-                                        if (
-                                            "episodeid"
-                                            in collectedSeasons[season][ep]["ids"]
-                                        ):
-                                            if "ids" in eps:
-                                                eps[ep]["ids"]["episodeid"] = (
-                                                    collectedSeasons[season][ep]["ids"][
-                                                        "episodeid"
-                                                    ]
-                                                )
-                                            else:
-                                                eps[ep]["ids"] = {
-                                                    "episodeid": collectedSeasons[
-                                                        season
-                                                    ][ep]["ids"]["episodeid"]
-                                                }
+                                        eps[ep] = __withEpisodeId(
+                                            a[ep], collectedSeasons[season][ep]
+                                        )
                                     season_diff[season] = eps
                             else:
                                 eps = {}
                                 for ep in diff:
-                                    eps[ep] = a[ep]
+                                    eps[ep] = __copyEpisode(a[ep])
                                 if len(eps) > 0:
                                     season_diff[season] = eps
                     else:
                         if not restrict and not rating:
                             if len(a) > 0:
-                                season_diff[season] = a
+                                season_diff[season] = {
+                                    ep: __copyEpisode(a[ep]) for ep in a
+                                }
                 # logger.debug("season_diff %s" % season_diff)
                 if len(season_diff) > 0:
                     # logger.debug("Season_diff")
-                    show = {
-                        "title": show_col1["title"],
-                        "ids": {},
-                        "year": show_col1["year"],
-                        "seasons": [],
-                    }
+                    show = records.Show(
+                        title=show_col1["title"],
+                        ids={},
+                        year=show_col1["year"],
+                        seasons=[],
+                    )
                     if show_col1["ids"]:
                         show["ids"].update(show_col1["ids"])
                     if show_col2["ids"]:
@@ -598,7 +610,7 @@ def compareEpisodes(
                         for episodeKey in season_diff[seasonKey]:
                             episodes.append(season_diff[seasonKey][episodeKey])
                         show["seasons"].append(
-                            {"number": seasonKey, "episodes": episodes}
+                            records.Season(number=seasonKey, episodes=episodes)
                         )
                     if "tvshowid" in show_col2:
                         show["tvshowid"] = show_col2["tvshowid"]
@@ -607,33 +619,31 @@ def compareEpisodes(
             else:
                 if not restrict:
                     if countEpisodes([show_col1]) > 0:
-                        show = {
-                            "title": show_col1["title"],
-                            "ids": {},
-                            "year": show_col1["year"],
-                            "seasons": [],
-                        }
+                        show = records.Show(
+                            title=show_col1["title"],
+                            ids={},
+                            year=show_col1["year"],
+                            seasons=[],
+                        )
                         if show_col1["ids"]:
                             show["ids"].update(show_col1["ids"])
                         for seasonKey in show_col1["seasons"]:
                             episodes = []
                             for episodeKey in seasonKey["episodes"]:
                                 if watched and (episodeKey["watched"] == 1):
-                                    episodes.append(episodeKey)
+                                    episodes.append(__copyEpisode(episodeKey))
                                 elif rating and episodeKey["rating"] != 0:
-                                    episodes.append(episodeKey)
+                                    episodes.append(__copyEpisode(episodeKey))
                                 elif not watched and not rating:
-                                    episodes.append(episodeKey)
+                                    episodes.append(__copyEpisode(episodeKey))
                             if len(episodes) > 0:
                                 show["seasons"].append(
-                                    {
-                                        "number": seasonKey["number"],
-                                        "episodes": episodes,
-                                    }
+                                    records.Season(
+                                        number=seasonKey["number"],
+                                        episodes=episodes,
+                                    )
                                 )
 
-                        if "tvshowid" in show_col1:
-                            del show_col1["tvshowid"]
                         if countEpisodes([show]) > 0:
                             shows.append(show)
     result = {"shows": shows}
@@ -659,6 +669,21 @@ def countEpisodes(shows: Union[Dict, List], collection: bool = True) -> int:
     return count
 
 
+def __copyEpisode(episode: Dict) -> Dict:
+    # sanitizeShows() edits the ids of the episodes it is given
+    episode = episode.copy()
+    if "ids" in episode:
+        episode["ids"] = dict(episode["ids"])
+    return episode
+
+
+def __withEpisodeId(episode: Dict, library_episode: Dict) -> Dict:
+    episode = __copyEpisode(episode)
+    if "episodeid" in library_episode["ids"]:
+        episode["ids"] = {"episodeid": library_episode["ids"]["episodeid"]}
+    return episode
+
+
 def __getEpisodes(seasons: List) -> Dict:
     data = {}
     for season in seasons:
@@ -686,7 +711,9 @@ def checkIfNewVersion(old: str, new: str) -> bool:
     return False
 
 
-def _to_sec(timedelta_string: str, factors: Tuple[int, ...] = (1, 60, 3600, 86400)) -> float:
+def _to_sec(
+    timedelta_string: str, factors: Tuple[int, ...] = (1, 60, 3600, 86400)
+) -> float:
     """[[[days:]hours:]minutes:]seconds -> seconds"""
     return sum(
         x * y
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+import math
+import ssl
+import threading
+import time
+import zlib
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+
+
+class FakeTrakt(object):
+    """Local stand-in for api.trakt.tv that records every request.
+
+    ``lists`` holds paginated GET endpoints, ``responses`` fixed JSON bodies
+    for any method; everything else answers 404. ``connections`` counts
+    accepted TCP connections (TLS handshakes when a certificate is given),
+    and ``drop_idle`` closes every connection after one response without
+    announcing it, the way a server drops idle keep-alive connections.
+    Bodies are compressed with ``compress`` ("gzip" or "deflate") when the
+    client accepts it; ``sent_bytes`` counts the body bytes on the wire.
+    With ``etags`` set, bodies carry an ETag and a matching If-None-Match is
+    answered with 304 Not Modified. While ``offline`` is set connections are
+    refused, as by a network that went away, while ``hang_up`` is set every
+    request is read and recorded but dropped unanswered, as by a read
+    timeout, and every answer is held back ``delay`` seconds.
+    ``max_in_flight`` is the most requests that were being answered at once. ``limits`` maps a method to at most how
+    many requests it takes in how many seconds, like the API limits; any
+    more is answered 429 with a Retry-After and counted in ``limited``.
+    """
+
+    def __init__(self, certfile=None, keyfile=None):
+        self.lists = {}
+        self.responses = {}
+        self.calls = []
+        self.connections = 0
+        self.drop_idle = False
+        self.compress = None
+        self.sent_bytes = 0
+        self.etags = False
+        self.hang_up = False
+        self.delay = 0
+        self.limits = {}
+        self.limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._context = None
+        self._scheme = "http"
+        if certfile:
+            self._context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self._context.load_cert_chain(certfile, keyfile)
+            self._scheme = "https"
+        self._server = self._listen(0)
+        self._address = self._server.server_address
+        self._offline = False
+
+    def _listen(self, port):
+        server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        if self._context is not None:
+            server.socket = self._context.wrap_socket(server.socket, server_side=True)
+        return server
+
+    def _serve_forever(self):
+        thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def url(self):
+        host, port = self._address
+        return "%s://%s:%s" % (self._scheme, host, port)
+
+    @property
+    def offline(self):
+        return self._offline
+
+    @offline.setter
+    def offline(self, offline):
+        if offline == self._offline:
+            return
+        self._offline = offline
+        if offline:
+            # nothing listens on the port until it is back online
+            self._server.shutdown()
+            self._server.server_close()
+        else:
+            self._server = self._listen(self._address[1])
+            self._serve_forever()
+
+    def start(self):
+        self._serve_forever()
+        return self
+
+    def stop(self):
+        if not self._offline:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, path):
+        with self._lock:
+            return len([call for call in self.calls if call[1] == path])
+
+    def _record(self, method, path, query, body, headers):
+        with self._lock:
+            self.calls.append((method, path, query, body, headers))
+
+    def _limit(self, method):
+        if method not in self.limits:
+            return None
+        count, period = self.limits[method]
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.setdefault(method, [])
+            seen[:] = [at for at in seen if at > now - period]
+            if len(seen) >= count:
+                self.limited += 1
+                return max(1, int(math.ceil(seen[0] + period - now)))
+            seen.append(now)
+        return None
+
+    def _encode(self, payload, accept_encoding):
+        if not payload or not self.compress or self.compress not in accept_encoding:
+            return payload, {}
+        wbits = 16 + zlib.MAX_WBITS if self.compress == "gzip" else zlib.MAX_WBITS
+        compressor = zlib.compressobj(wbits=wbits)
+        payload = compressor.compress(payload) + compressor.flush()
+        return payload, {"Content-Encoding": self.compress}
+
+    def _started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _sent(self, size):
+        with self._lock:
+            self.sent_bytes += size
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def _respond(self, method, path, query):
+        if method == "GET" and path in self.lists:
+            items = self.lists[path]
+            limit = int(query.get("limit", 10))
+            page = int(query.get("page", 1))
+            page_count = max(1, -(-len(items) // limit))
+            headers = {
+                "X-Pagination-Page": str(page),
+                "X-Pagination-Limit": str(limit),
+                "X-Pagination-Page-Count": str(page_count),
+                "X-Pagination-Item-Count": str(len(items)),
+            }
+            return 200, items[(page - 1) * limit : page * limit], headers
+        if path in self.responses:
+            return 200, self.responses[path], {}
+        return 404, None, {}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, keep-alive clients
+            # would otherwise wait for delayed ACKs
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                fake._connected()
+                BaseHTTPRequestHandler.setup(self)
+
+            def _serve(self):
+                if fake.offline:
+                    self.close_connection = True
+                    return
+                url = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = loads(self.rfile.read(length)) if length else None
+                fake._record(self.command, url.path, query, body, dict(self.headers))
+                if fake.hang_up:
+                    self.close_connection = True
+                    return
+                fake._started()
+                try:
+                    self._answer(url, query)
+                finally:
+                    fake._finished()
+
+            def _answer(self, url, query):
+                if fake.delay:
+                    time.sleep(fake.delay)
+
+                retry_after = fake._limit(self.command)
+                if retry_after is not None:
+                    status, data = 429, None
+                    headers = {"Retry-After": str(retry_after)}
+                else:
+                    status, data, headers = fake._respond(self.command, url.path, query)
+                payload = dumps(data).encode("utf-8") if data is not None else b""
+                if fake.etags and status == 200:
+                    headers["ETag"] = '"%08x"' % zlib.crc32(payload)
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        status, payload = 304, b""
+                payload, encoding = fake._encode(
+                    payload, self.headers.get("Accept-Encoding") or ""
+                )
+                headers.update(encoding)
+                fake._sent(len(payload))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                if fake.drop_idle:
+                    self.close_connection = True
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
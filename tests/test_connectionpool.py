@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+import ssl
+import subprocess
+import time
+import urllib.error
+import urllib.request
+import zlib
+
+import mock
+import pytest
+
+from resources.lib.connectionpool import ConnectionPool, NotSentError, decode_body
+from tests.fake_trakt import FakeTrakt
+
+
+@pytest.fixture
+def fake_trakt():
+    server = FakeTrakt().start()
+    server.responses["/users/settings"] = {"user": {"username": "tester"}}
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_trakt_tls(tmp_path):
+    if not shutil.which("openssl"):
+        pytest.skip("openssl is required to create the stub certificate")
+    certfile = str(tmp_path / "cert.pem")
+    keyfile = str(tmp_path / "key.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-keyout",
+            keyfile,
+            "-out",
+            certfile,
+            "-days",
+            "1",
+            "-subj",
+            "/CN=127.0.0.1",
+            "-addext",
+            "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    server = FakeTrakt(certfile, keyfile).start()
+    server.responses["/users/settings"] = {"user": {"username": "tester"}}
+    yield server, ssl.create_default_context(cafile=certfile)
+    server.stop()
+
+
+def test_pool_reuses_connection_across_requests(fake_trakt):
+    pool = ConnectionPool(fake_trakt.url)
+
+    for _ in range(5):
+        data, headers = pool.request("GET", "/users/settings")
+
+    assert data == b'{"user": {"username": "tester"}}'
+    assert headers.get("Content-Type") == "application/json"
+    assert fake_trakt.connections == 1
+
+
+def test_pool_handshakes_benchmark_against_tls_stub(fake_trakt_tls):
+    server, context = fake_trakt_tls
+    requests = 50
+
+    pool = ConnectionPool(server.url, context=context)
+    for _ in range(requests):
+        pool.request("GET", "/users/settings")
+    pooled_handshakes = server.connections
+
+    # what every request used to pay: a fresh urllib opener and connection
+    for _ in range(requests):
+        with urllib.request.urlopen(
+            server.url + "/users/settings", context=context
+        ) as response:
+            response.read()
+    fresh_handshakes = server.connections - pooled_handshakes
+
+    assert pooled_handshakes == 1
+    assert fresh_handshakes == requests
+
+
+def test_pool_keeps_at_most_size_idle_connections(fake_trakt):
+    pool = ConnectionPool(fake_trakt.url, size=2)
+    conns = [pool._acquire(30)[0] for _ in range(3)]
+
+    for conn in conns:
+        pool._release(conn)
+
+    assert pool._idle.qsize() == 2
+    assert conns[2].sock is None
+
+
+def test_pool_reconnects_stale_connection(fake_trakt):
+    fake_trakt.drop_idle = True
+    pool = ConnectionPool(fake_trakt.url)
+    pool.request("GET", "/users/settings")
+    time.sleep(0.05)
+
+    data, _ = pool.request("GET", "/users/settings")
+
+    assert data
+    assert fake_trakt.connections == 2
+
+
+def test_pool_sends_request_without_retry_on_a_fresh_connection(fake_trakt):
+    fake_trakt.drop_idle = True
+    fake_trakt.responses["/sync/history"] = {"added": {}}
+    pool = ConnectionPool(fake_trakt.url)
+    pool.request("GET", "/users/settings")
+    time.sleep(0.05)
+
+    data, _ = pool.request("POST", "/sync/history", body=b"{}", retry=False)
+
+    assert data == b'{"added": {}}'
+    assert fake_trakt.count("/sync/history") == 1
+    assert fake_trakt.connections == 2
+
+
+def test_pool_raises_http_errors_like_urllib(fake_trakt):
+    pool = ConnectionPool(fake_trakt.url)
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        pool.request("GET", "/missing")
+
+    assert error.value.code == 404
+    # the connection stays usable after an error status
+    pool.request("GET", "/users/settings")
+    assert fake_trakt.connections == 1
+
+
+def test_pool_sends_plain_http_through_proxy_with_credentials(fake_trakt):
+    pool = ConnectionPool(
+        "http://api.trakt.example",
+        proxy_url=fake_trakt.url.replace("http://", "http://user:secret@"),
+    )
+
+    pool.request("GET", "/users/settings")
+
+    method, path, _, _, headers = fake_trakt.calls[0]
+    assert path == "/users/settings"
+    assert headers["Proxy-Authorization"] == "Basic dXNlcjpzZWNyZXQ="
+
+
+def test_pool_wraps_transport_errors_as_url_error():
+    pool = ConnectionPool("http://127.0.0.1:9")
+
+    with pytest.raises(urllib.error.URLError):
+        pool.request("GET", "/users/settings", timeout=1)
+
+
+def test_pool_tells_requests_never_sent_from_unanswered_ones(fake_trakt):
+    pool = ConnectionPool(fake_trakt.url)
+    fake_trakt.offline = True
+
+    with pytest.raises(NotSentError):
+        pool.request("POST", "/sync/history", body=b"{}", retry=False)
+
+    fake_trakt.offline = False
+    fake_trakt.hang_up = True
+    with pytest.raises(urllib.error.URLError) as error:
+        pool.request("POST", "/sync/history", body=b"{}", retry=False)
+    assert not isinstance(error.value, NotSentError)
+    assert fake_trakt.count("/sync/history") == 1
+
+
+def watched_shows(count):
+    return [
+        {
+            "plays": 1,
+            "last_watched_at": "2024-01-01T00:00:00.000Z",
+            "show": {"title": "Show %s" % index, "year": 2000, "ids": {"trakt": index}},
+            "seasons": [
+                {
+                    "number": season,
+                    "episodes": [
+                        {
+                            "number": episode,
+                            "plays": 1,
+                            "last_watched_at": "2024-01-01T00:00:00.000Z",
+                        }
+                        for episode in range(1, 21)
+                    ],
+                }
+                for season in range(1, 4)
+            ],
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_pool_decompresses_response_bodies(fake_trakt, encoding):
+    fake_trakt.compress = encoding
+    fake_trakt.lists["/sync/watched/shows"] = watched_shows(50)
+    pool = ConnectionPool(fake_trakt.url)
+
+    data, headers = pool.request("GET", "/sync/watched/shows?limit=100")
+
+    assert headers.get("Content-Encoding") == encoding
+    assert json.loads(data) == fake_trakt.lists["/sync/watched/shows"]
+    assert "gzip" in fake_trakt.calls[0][4]["Accept-Encoding"]
+
+
+def test_decode_body_accepts_raw_deflate_stream():
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    payload = compressor.compress(b'{"ok": true}') + compressor.flush()
+    response = mock.Mock()
+    response.getheader.return_value = "deflate"
+    response.read.side_effect = [payload, b""]
+
+    assert b"".join(decode_body(response)) == b'{"ok": true}'
+
+
+def test_pool_compressed_transfer_benchmark(fake_trakt):
+    fake_trakt.lists["/sync/watched/shows"] = watched_shows(200)
+    pool = ConnectionPool(fake_trakt.url)
+
+    pool.request(
+        "GET", "/sync/watched/shows?limit=200", headers={"Accept-Encoding": "identity"}
+    )
+    plain = fake_trakt.sent_bytes
+    fake_trakt.compress = "gzip"
+    pool.request("GET", "/sync/watched/shows?limit=200")
+    compressed = fake_trakt.sent_bytes - plain
+
+    assert compressed * 10 < plain
+
+
+def test_pool_stream_releases_connection_once_body_is_read(fake_trakt):
+    fake_trakt.compress = "gzip"
+    fake_trakt.lists["/sync/watched/shows"] = watched_shows(50)
+    pool = ConnectionPool(fake_trakt.url)
+
+    chunks, headers = pool.stream("GET", "/sync/watched/shows?limit=100")
+    assert pool._idle.empty()
+    assert json.loads(b"".join(chunks)) == fake_trakt.lists["/sync/watched/shows"]
+    pool.request("GET", "/users/settings")
+
+    assert fake_trakt.connections == 1
+
+
+def test_pool_stream_closes_abandoned_connection(fake_trakt):
+    fake_trakt.lists["/sync/watched/shows"] = watched_shows(200)
+    pool = ConnectionPool(fake_trakt.url)
+
+    chunks, headers = pool.stream("GET", "/sync/watched/shows?limit=200")
+    next(chunks)
+    chunks.close()
+    pool.request("GET", "/users/settings")
+
+    assert fake_trakt.connections == 2
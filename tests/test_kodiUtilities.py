@@ -10,7 +10,7 @@ xbmcgui_mock = mock.Mock()
 sys.modules["xbmcgui"] = xbmcgui_mock
 xbmcaddon_mock = mock.Mock()
 sys.modules["xbmcaddon"] = xbmcaddon_mock
-from resources.lib import kodiUtilities  # noqa: E402
+from resources.lib import kodiUtilities, utilities  # noqa: E402
 
 
 def test_notification():
@@ -23,3 +23,187 @@ def test_showSettings():
     assert not xbmcaddon_mock.Addon().openSettings.called
     kodiUtilities.showSettings()
     assert xbmcaddon_mock.Addon().openSettings.called
+
+
+def exclusion_settings(paths, **flags):
+    settings = {}
+    for x, path in enumerate(paths, 1):
+        suffix = "" if x == 1 else str(x)
+        settings["ExcludePath" + suffix] = path
+        settings["ExcludePathOption" + suffix] = path != ""
+    settings.update(flags)
+    return settings
+
+
+def checking_exclusions(settings):
+    kodiUtilities.resetExclusionMatcher()
+    getSetting = mock.Mock(side_effect=lambda key: settings.get(key, ""))
+    getSettingAsBool = mock.Mock(side_effect=lambda key: bool(settings.get(key)))
+    return (
+        getSetting,
+        getSettingAsBool,
+        mock.patch.multiple(
+            kodiUtilities, getSetting=getSetting, getSettingAsBool=getSettingAsBool
+        ),
+    )
+
+
+def test_checkExclusion_paths():
+    settings = exclusion_settings(
+        [
+            "",
+            "/media/tv/kids/",
+            "/media/tv/",
+            "/media/tv/kids/old/",
+            "smb://nas/private/",
+        ]
+    )
+    getSetting, getSettingAsBool, patch = checking_exclusions(settings)
+    with patch:
+        assert kodiUtilities.checkExclusion("/media/tv/kids/show/s01e01.mkv")
+        assert kodiUtilities.checkExclusion("/media/tv/news.mkv")
+        assert kodiUtilities.checkExclusion("smb://nas/private/a.mkv")
+        assert not kodiUtilities.checkExclusion("/media/movies/a.mkv")
+        assert not kodiUtilities.checkExclusion("/media/tu.mkv")
+        assert not kodiUtilities.checkExclusion("smb://nas/public/a.mkv")
+        assert kodiUtilities.checkExclusion("")
+    # the settings were read once, for the first file
+    assert getSettingAsBool.call_count == 16
+    assert kodiUtilities.getExclusionMatcher().paths == [
+        "/media/tv/",
+        "smb://nas/private/",
+    ]
+
+
+def test_checkExclusion_sources():
+    settings = exclusion_settings([], ExcludeLiveTV=True, ExcludePlugin=True)
+    getSetting, getSettingAsBool, patch = checking_exclusions(settings)
+    with patch, mock.patch.object(kodiUtilities, "xbmcgui") as xbmcgui:
+        assert kodiUtilities.checkExclusion("pvr://channels/tv/1")
+        assert kodiUtilities.checkExclusion("plugin://plugin.video.x/?play=1")
+        assert not kodiUtilities.checkExclusion("http://host/video.mkv")
+        # the paused property is only read with the script exclusion enabled
+        assert not xbmcgui.Window.called
+        settings["ExcludeScript"] = True
+        kodiUtilities.resetExclusionMatcher()
+        xbmcgui.Window.return_value.getProperty.return_value = "true"
+        assert kodiUtilities.checkExclusion("/media/tv/a.mkv")
+
+
+def test_checkExclusion_rereads_settings_after_reset():
+    settings = exclusion_settings(["/media/tv/"])
+    getSetting, getSettingAsBool, patch = checking_exclusions(settings)
+    with patch:
+        assert kodiUtilities.checkExclusion("/media/tv/a.mkv")
+        settings.update(exclusion_settings(["/media/movies/"]))
+        assert kodiUtilities.checkExclusion("/media/tv/a.mkv")
+        kodiUtilities.resetExclusionMatcher()
+        assert not kodiUtilities.checkExclusion("/media/tv/a.mkv")
+        assert kodiUtilities.checkExclusion("/media/movies/a.mkv")
+
+
+def test_checkExclusion_matches_checkExcludePath():
+    paths = [
+        "/a/",
+        "/a/b/",
+        "/ab",
+        "/b/c/",
+        "",
+        "/b/",
+        "/c/d/e/",
+        "/c/d",
+        "/z",
+        "/a/b/c/",
+        "/y/",
+        "/",
+    ]
+    settings = exclusion_settings(paths[1:])
+    getSetting, getSettingAsBool, patch = checking_exclusions(settings)
+    with patch:
+        for fullpath in [
+            "/a/x",
+            "/ab/x",
+            "/abc",
+            "/b/c/d",
+            "/c/d/e",
+            "/c/dx",
+            "/d",
+            "/y",
+            "/y/1",
+            "/zz",
+            "a",
+        ]:
+            expected = any(
+                utilities.checkExcludePath(path, path != "", fullpath, x)
+                for x, path in enumerate(paths[1:], 1)
+            )
+            assert kodiUtilities.checkExclusion(fullpath) == expected, fullpath
+
+
+def test_checkExclusion_benchmark():
+    settings = exclusion_settings(["/media/excluded%d/" % x for x in range(12)])
+    getSetting, getSettingAsBool, patch = checking_exclusions(settings)
+    files = ["/media/tv/show%d/s01e%02d.mkv" % (i // 20, i % 20) for i in range(40000)]
+    with patch:
+        excluded = [kodiUtilities.checkExclusion(fullpath) for fullpath in files]
+
+    assert not any(excluded)
+    assert getSetting.call_count + getSettingAsBool.call_count == 28
+
+
+def addon_with(values):
+    addon = mock.Mock()
+    addon.getSetting.side_effect = lambda key: " %s " % values.get(key, "")
+    return addon
+
+
+def test_settings_are_read_from_kodi_once():
+    values = {"debug": "true", "scrobble_start_offset": "2.5", "custom": "x"}
+    addon = addon_with(values)
+    snapshot = kodiUtilities.SettingsSnapshot()
+    with (
+        mock.patch.object(kodiUtilities, "__addon__", addon),
+        mock.patch.object(kodiUtilities, "settings", snapshot),
+    ):
+        assert kodiUtilities.getSettingAsBool("debug")
+        declared = addon.getSetting.call_count
+        assert declared > 50
+        for _ in range(100):
+            assert kodiUtilities.getSettingAsBool("debug")
+            assert kodiUtilities.getSettingAsInt("scrobble_start_offset") == 2
+            assert kodiUtilities.getSetting("custom") == "x"
+        # the undeclared setting is read on first use only
+        assert addon.getSetting.call_count == declared + 1
+
+        kodiUtilities.setSetting("custom", "y")
+        assert addon.setSetting.call_args == mock.call("custom", "y")
+        assert kodiUtilities.getSetting("custom") == "y"
+        assert addon.getSetting.call_count == declared + 1
+
+
+def test_settings_refresh_notifies_listeners():
+    values = {
+        "debug": "false",
+        "ExcludePathOption": "true",
+        "ExcludePath": "/media/tv/",
+    }
+    addon = addon_with(values)
+    snapshot = kodiUtilities.SettingsSnapshot()
+    listener = mock.Mock()
+    snapshot.subscribe(listener)
+    snapshot.subscribe(kodiUtilities.resetExclusionMatcher)
+    kodiUtilities.resetExclusionMatcher()
+    with (
+        mock.patch.object(kodiUtilities, "__addon__", addon),
+        mock.patch.object(kodiUtilities, "settings", snapshot),
+    ):
+        assert not kodiUtilities.getSettingAsBool("debug")
+        assert kodiUtilities.checkExclusion("/media/tv/a.mkv")
+
+        values.update({"debug": "true", "ExcludePath": "/media/movies/"})
+        assert not kodiUtilities.getSettingAsBool("debug")
+        snapshot.refresh()
+
+        assert listener.call_count == 1
+        assert kodiUtilities.getSettingAsBool("debug")
+        assert not kodiUtilities.checkExclusion("/media/tv/a.mkv")
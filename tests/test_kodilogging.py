@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import sys
+
+import mock
+import pytest
+
+xbmc_mock = mock.Mock()
+sys.modules["xbmc"] = xbmc_mock
+xbmcgui_mock = mock.Mock()
+sys.modules["xbmcgui"] = xbmcgui_mock
+xbmcaddon_mock = mock.Mock()
+sys.modules["xbmcaddon"] = xbmcaddon_mock
+
+from resources.lib import kodilogging, records  # noqa: E402
+
+
+@pytest.fixture
+def kodi_log():
+    root = logging.getLogger()
+    level = root.level
+    handler = kodilogging.KodiLogHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+    with mock.patch.object(kodilogging, "xbmc") as xbmc:
+        yield xbmc.log
+    root.removeHandler(handler)
+    root.setLevel(level)
+
+
+def test_level_follows_debug_setting(kodi_log):
+    with mock.patch.object(kodilogging, "getSettingAsBool", return_value=False):
+        kodilogging.setLevel()
+    payload = mock.MagicMock()
+    logging.getLogger("test").debug("payload %s", payload)
+    logging.getLogger("test").error("failed")
+    assert not kodi_log.called
+    assert not payload.__str__.called
+
+    with mock.patch.object(kodilogging, "getSettingAsBool", return_value=True):
+        kodilogging.setLevel()
+    logging.getLogger("test").debug("payload %s", "body")
+    assert kodi_log.call_args[0][0] == "payload body"
+
+
+def test_large_payloads_are_summarized(kodi_log):
+    with mock.patch.object(kodilogging, "getSettingAsBool", return_value=True):
+        kodilogging.setLevel()
+    shows = {
+        "shows": [
+            records.Show(title="Show %d" % i, ids={"tvdb": i}, seasons=[])
+            for i in range(1000)
+        ]
+    }
+
+    logging.getLogger("test").debug("Shows to add %s", shows)
+    logging.getLogger("test").debug("%d show(s), %s", 2, "first")
+    logging.getLogger("test").debug("%(title)s", {"title": "Show"})
+
+    summarized, counted, named = [call[0][0] for call in kodi_log.call_args_list]
+    assert summarized.startswith("Shows to add {'shows': [{'ids': {'tvdb': 0}, ")
+    assert summarized.endswith("...]}")
+    assert len(summarized) < 3000
+    assert counted == "2 show(s), first"
+    assert named == "Show"
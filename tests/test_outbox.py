@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import threading
+
+import mock
+import pytest
+
+
+class WindowXMLDialog(object):
+    pass
+
+
+sys.modules.setdefault("xbmc", mock.Mock())
+sys.modules.setdefault("xbmcgui", mock.Mock()).WindowXMLDialog = WindowXMLDialog
+sys.modules.setdefault("xbmcaddon", mock.Mock())
+sys.modules.setdefault("xbmcvfs", mock.Mock())
+
+from resources.lib import outbox, sqlitequeue  # noqa: E402
+from resources.lib.traktapi import (  # noqa: E402
+    NO_ANSWER,
+    OFFLINE,
+    TraktClient,
+    traktAPI,
+)
+from tests.fake_trakt import FakeTrakt  # noqa: E402
+
+MOVIE = {"title": "Movie", "year": 2000, "ids": {"tmdb": 1}}
+SHOW = {"title": "Show", "year": 2010, "ids": {"tvdb": 2}}
+EPISODE = {"season": 1, "number": 3, "title": "Episode", "ids": {"tvdb": 23}}
+
+
+@pytest.fixture
+def fake_trakt():
+    server = FakeTrakt().start()
+    for path in ("/sync/history", "/sync/ratings", "/sync/watchlist"):
+        server.responses[path] = {"added": {}}
+    server.responses["/scrobble/stop"] = {"action": "scrobble"}
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_outbox(tmp_path):
+    def make():
+        with mock.patch.object(sqlitequeue, "xbmcvfs") as xbmcvfs:
+            xbmcvfs.translatePath.return_value = str(tmp_path)
+            xbmcvfs.exists.return_value = True
+            return outbox.Outbox()
+
+    return make
+
+
+@pytest.fixture
+def api(fake_trakt, make_outbox):
+    api = traktAPI.__new__(traktAPI)
+    api.client = TraktClient("id", "secret", "ua")
+    api.client.api_url = fake_trakt.url
+    api.authorization = {"access_token": "token"}
+    api.outbox = make_outbox()
+    yield api
+    api.outbox.close()
+
+
+def posts(server, path):
+    return [call[3] for call in server.calls if call[0] == "POST" and call[1] == path]
+
+
+def test_writes_lost_offline_are_replayed_in_one_request_per_endpoint(fake_trakt, api):
+    fake_trakt.offline = True
+
+    assert api.addToHistory({"movies": [MOVIE]}) is None
+    assert api.addRating({"movies": [dict(MOVIE, rating=8)]}) is None
+    assert api.addToHistory({"shows": [dict(SHOW, seasons=[])]}) is None
+    assert api.addToWatchlist({"movies": [MOVIE]}) is None
+    assert api.addRating({"shows": [dict(SHOW, rating=6)]}) is None
+    assert len(api.outbox) == 5 and fake_trakt.calls == []
+
+    fake_trakt.offline = False
+    assert api.flushOutbox() is True
+
+    history = posts(fake_trakt, "/sync/history")
+    assert len(history) == 1
+    assert [movie["ids"] for movie in history[0]["movies"]] == [MOVIE["ids"]]
+    assert [show["ids"] for show in history[0]["shows"]] == [SHOW["ids"]]
+    assert posts(fake_trakt, "/sync/ratings") == [
+        {"movies": [dict(MOVIE, rating=8)], "shows": [dict(SHOW, rating=6)]}
+    ]
+    assert posts(fake_trakt, "/sync/watchlist") == [{"movies": [MOVIE]}]
+    assert len(api.outbox) == 0 and not api.outbox.due()
+
+
+def test_queued_history_keeps_the_time_it_was_watched(fake_trakt, api):
+    fake_trakt.offline = True
+    api.addToHistory(
+        {"movies": [MOVIE, dict(MOVIE, watched_at="2020-01-01T00:00:00.000Z")]}
+    )
+
+    fake_trakt.offline = False
+    api.flushOutbox()
+
+    first, second = posts(fake_trakt, "/sync/history")[0]["movies"]
+    assert first["watched_at"].endswith(".000Z")
+    assert second["watched_at"] == "2020-01-01T00:00:00.000Z"
+
+
+def test_the_same_write_is_queued_once(fake_trakt, api):
+    fake_trakt.offline = True
+    for _ in range(3):
+        api.addToWatchlist({"movies": [MOVIE]})
+
+    assert len(api.outbox) == 1
+
+
+def test_replay_backs_off_while_trakt_can_not_be_reached(fake_trakt, api):
+    api.outbox.backoff = 0.1
+    fake_trakt.offline = True
+    api.addRating({"movies": [dict(MOVIE, rating=8)]})
+    assert api.outbox.due()
+
+    with mock.patch.object(outbox.time, "time", return_value=1000.0):
+        assert api.flushOutbox() is False
+        assert not api.outbox.due()
+    with mock.patch.object(outbox.time, "time", return_value=1000.1):
+        assert api.outbox.due()
+        assert api.flushOutbox() is False
+    with mock.patch.object(outbox.time, "time", return_value=1000.25):
+        # the second failure doubled the delay
+        assert not api.outbox.due()
+    assert len(api.outbox) == 1
+
+    fake_trakt.offline = False
+    assert api.flushOutbox(force=True) is True
+    assert len(posts(fake_trakt, "/sync/ratings")) == 1
+    assert len(api.outbox) == 0
+
+
+def test_successful_write_retries_the_queue_right_away(fake_trakt, api):
+    fake_trakt.offline = True
+    api.addToWatchlist({"movies": [MOVIE]})
+    api.flushOutbox()
+    assert not api.outbox.due()
+
+    fake_trakt.offline = False
+    api.addToHistory({"movies": [MOVIE]})
+
+    assert api.outbox.due()
+
+
+def test_rejected_writes_are_dropped_not_retried(fake_trakt, api):
+    fake_trakt.offline = True
+    api.addToWatchlist({"movies": [MOVIE]})
+    del fake_trakt.responses["/sync/watchlist"]
+
+    fake_trakt.offline = False
+    assert api.flushOutbox() is True
+
+    assert fake_trakt.count("/sync/watchlist") == 1
+    assert len(api.outbox) == 0 and not api.outbox.due()
+
+
+def test_queued_writes_survive_a_restart(fake_trakt, api, make_outbox):
+    fake_trakt.offline = True
+    api.addToHistory({"movies": [MOVIE]})
+    api.outbox.close()
+
+    api.outbox = make_outbox()
+    assert len(api.outbox) == 1
+    fake_trakt.offline = False
+    api.flushOutbox()
+
+    assert [len(body["movies"]) for body in posts(fake_trakt, "/sync/history")] == [1]
+    assert len(api.outbox) == 0
+
+
+@pytest.mark.parametrize("percent, queued", [(92.5, True), (40.0, False)])
+def test_scrobble_stop_lost_offline_is_replayed_as_a_play(
+    fake_trakt, api, percent, queued
+):
+    fake_trakt.offline = True
+
+    assert api.scrobbleEpisode(SHOW, EPISODE, percent, "stop") is None
+    assert api.scrobbleMovie(MOVIE, percent, "stop") is None
+    assert api.scrobbleMovie(MOVIE, percent, "pause") is None
+
+    fake_trakt.offline = False
+    api.flushOutbox()
+    history = posts(fake_trakt, "/sync/history")
+
+    if not queued:
+        assert history == []
+        return
+    assert len(history) == 1
+    (show,) = history[0]["shows"]
+    assert show["ids"] == SHOW["ids"]
+    assert show["seasons"] == [{"number": 1, "episodes": [{"number": 3}]}]
+    assert "watched_at" in show
+    assert [movie["ids"] for movie in history[0]["movies"]] == [MOVIE["ids"]]
+
+
+def test_answered_scrobble_is_not_queued(fake_trakt, api):
+    assert api.scrobbleMovie(MOVIE, 95.0, "stop") == {"action": "scrobble"}
+    del fake_trakt.responses["/scrobble/stop"]
+    # a refused scrobble reached Trakt.tv, replaying it would not help
+    assert api.scrobbleMovie(MOVIE, 95.0, "stop") is None
+
+    assert len(api.outbox) == 0
+
+
+def test_client_reports_unreachable_trakt_as_offline(fake_trakt):
+    fake_trakt.offline = True
+    client = TraktClient("id", "secret", "ua")
+    client.api_url = fake_trakt.url
+
+    assert client.request("GET", "/users/settings", include_error_code=True) == (
+        None,
+        OFFLINE,
+    )
+    fake_trakt.offline = False
+    assert client.request("GET", "/users/settings", include_error_code=True) == (
+        None,
+        404,
+    )
+
+
+def test_write_sent_without_an_answer_is_not_queued(fake_trakt, api):
+    fake_trakt.hang_up = True
+
+    assert api.addToHistory({"movies": [MOVIE]}, include_error_code=True) == (
+        None,
+        NO_ANSWER,
+    )
+    assert api.scrobbleMovie(MOVIE, 95.0, "stop") is None
+
+    # both reached Trakt.tv, which may have recorded the play already
+    assert fake_trakt.count("/sync/history") == 1
+    assert fake_trakt.count("/scrobble/stop") == 1
+    assert len(api.outbox) == 0
+
+
+def test_replay_without_an_answer_is_not_sent_again(fake_trakt, api):
+    fake_trakt.offline = True
+    api.addToHistory({"movies": [MOVIE]})
+    fake_trakt.offline = False
+    fake_trakt.hang_up = True
+
+    assert api.flushOutbox() is True
+    fake_trakt.hang_up = False
+    api.flushOutbox(force=True)
+
+    assert fake_trakt.count("/sync/history") == 1
+    assert len(api.outbox) == 0
+
+
+def test_concurrent_flushes_replay_a_write_once(fake_trakt, api):
+    fake_trakt.offline = True
+    api.addToHistory({"movies": [MOVIE]})
+    fake_trakt.offline = False
+    fake_trakt.delay = 0.1
+
+    # the dispatcher's flush and the one the sync starts with
+    flushes = [
+        threading.Thread(target=api.flushOutbox),
+        threading.Thread(target=api.flushOutbox, kwargs={"force": True}),
+    ]
+    for thread in flushes:
+        thread.start()
+    for thread in flushes:
+        thread.join()
+
+    assert len(posts(fake_trakt, "/sync/history")) == 1
+    assert len(api.outbox) == 0
+
+
+def test_every_api_instance_shares_one_outbox():
+    with (
+        mock.patch.multiple(
+            "resources.lib.traktapi",
+            checkAndConfigureProxy=mock.DEFAULT,
+            deobfuscate=mock.DEFAULT,
+            SqliteCache=mock.DEFAULT,
+            SqliteMirror=mock.DEFAULT,
+            Outbox=mock.DEFAULT,
+            getSetting=mock.Mock(return_value='{"access_token": "token"}'),
+            getSettingAsInt=mock.Mock(return_value=-1),
+        ) as patched,
+        mock.patch.object(traktAPI, "outbox", None),
+        mock.patch.object(traktAPI, "login"),
+    ):
+        first = traktAPI()
+        # auth_info builds a new instance while the scrobbler keeps the old one
+        second = traktAPI(True)
+
+        assert first.outbox is second.outbox
+        assert patched["Outbox"].call_count == 1
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from resources.lib.ratelimit import (
+    BACKGROUND,
+    INTERACTIVE,
+    USER_ACTION,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+def test_bucket_bursts_up_to_capacity_then_paces():
+    bucket = TokenBucket(rate=50.0, capacity=3)
+
+    assert [bucket.acquire() < 0.01 for _ in range(3)] == [True] * 3
+    assert bucket.acquire() >= 0.015
+    assert bucket.remaining() == 0
+
+    time.sleep(0.2)
+    # refilled to capacity, not beyond
+    assert bucket.remaining() == 3
+
+
+def test_paused_bucket_hands_out_nothing_until_it_resumes():
+    bucket = TokenBucket(rate=100.0, capacity=5)
+    bucket.pause(0.1)
+
+    assert bucket.remaining() == 0
+    assert bucket.acquire() >= 0.1
+    time.sleep(0.1)
+    assert bucket.remaining() == 5
+
+
+def test_reads_and_writes_have_separate_budgets():
+    limiter = RateLimiter()
+    for _ in range(100):
+        assert limiter.acquire("GET") < 0.01
+
+    assert limiter.budget() == {"GET": 0, "POST": 1}
+    assert limiter.remaining("DELETE") == 1
+    assert limiter.acquire("POST") < 0.01
+    assert limiter.remaining("PUT") == 0
+
+
+def test_next_token_goes_to_the_most_urgent_caller():
+    bucket = TokenBucket(rate=5.0, capacity=1)
+    bucket.acquire()
+    served = []
+
+    def take(name, priority):
+        bucket.acquire(priority)
+        served.append(name)
+
+    threads = [
+        threading.Thread(target=take, args=("sync %d" % i, BACKGROUND))
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    while bucket.waiting() < 3:
+        time.sleep(0.001)
+    threads.append(threading.Thread(target=take, args=("rating", USER_ACTION)))
+    threads.append(threading.Thread(target=take, args=("scrobble", INTERACTIVE)))
+    for thread in threads[3:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert served == ["scrobble", "rating", "sync 0", "sync 1", "sync 2"]
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from resources.lib import records, utilities
+
+
+def test_record_reads_and_writes_like_a_dict():
+    episode = records.Episode(season=1, number=2, ids={"episodeid": 3})
+
+    assert episode["number"] == 2
+    assert "title" not in episode
+    assert episode.get("title") is None
+    with pytest.raises(KeyError):
+        episode["title"]
+
+    episode["title"] = "Pilot"
+    episode["metadata"] = {"hdr": "dolby_vision"}
+    del episode["season"]
+
+    assert dict(episode) == {
+        "number": 2,
+        "title": "Pilot",
+        "ids": {"episodeid": 3},
+        "metadata": {"hdr": "dolby_vision"},
+    }
+    assert len(episode) == 4
+    with pytest.raises(KeyError):
+        del episode["season"]
+    assert not hasattr(episode, "__dict__")
+
+
+def test_record_equals_the_dict_it_replaces():
+    movie = {
+        "title": "Movie",
+        "year": 2000,
+        "ids": {"tmdb": 1},
+        "movieid": 7,
+        "playcount": 2,
+    }
+
+    assert records.Movie.from_dict(movie) == movie
+    assert movie == records.Movie.from_dict(movie)
+    assert records.Movie.from_dict(movie) != dict(movie, year=2001)
+
+
+def test_copy_is_shallow_and_independent():
+    show = records.Show(title="Show", ids={"tvdb": 1}, seasons=[], status="ended")
+
+    copied = show.copy()
+    copied["title"] = "Other"
+    copied["status"] = "returning series"
+
+    assert type(copied) is records.Show
+    assert show["title"] == "Show" and show["status"] == "ended"
+    assert copied["ids"] is show["ids"]
+
+
+def test_from_dict_builds_nested_records():
+    show = records.Show.from_dict(
+        {
+            "title": "Show",
+            "ids": {"trakt": 1},
+            "seasons": [{"number": 1, "episodes": [{"number": 1, "plays": 2}]}],
+        }
+    )
+
+    season = show["seasons"][0]
+    assert isinstance(season, records.Season)
+    assert isinstance(season["episodes"][0], records.Episode)
+    assert season["episodes"][0]["plays"] == 2
+
+
+def test_to_json_serializes_nested_records():
+    show = records.Show(
+        title="Show",
+        ids={"trakt": 1},
+        seasons=[records.Season(number=1, episodes=[records.Episode(number=1)])],
+    )
+
+    body = json.dumps({"shows": [show]}, default=records.to_json, sort_keys=True)
+
+    assert json.loads(body) == {
+        "shows": [
+            {
+                "title": "Show",
+                "ids": {"trakt": 1},
+                "seasons": [{"number": 1, "episodes": [{"number": 1}]}],
+            }
+        ]
+    }
+    with pytest.raises(TypeError):
+        json.dumps({"when": object()}, default=records.to_json)
+
+
+def library_shows(count, watched):
+    return {
+        "shows": [
+            records.Show(
+                title="Show %d" % i,
+                year=2000 + i % 20,
+                ids={"tvdb": i},
+                tvshowid=i,
+                rating=0,
+                seasons=[
+                    records.Season(
+                        number=season,
+                        episodes=[
+                            records.Episode(
+                                season=season,
+                                number=number,
+                                title="Episode %d" % number,
+                                ids={"episodeid": i * 1000 + season * 100 + number},
+                                watched=watched,
+                                plays=watched,
+                                collected=1,
+                                watched_at="2024-01-01T00:00:00.000Z",
+                                collected_at="2024-01-01T00:00:00.000Z",
+                                runtime=2700,
+                                rating=0,
+                            )
+                            for number in range(1, 21)
+                        ],
+                    )
+                    for season in range(1, 6)
+                ],
+            )
+            for i in range(count)
+        ]
+    }
+
+
+def as_dicts(shows):
+    return json.loads(json.dumps(shows, default=records.to_json))
+
+
+@pytest.mark.parametrize(
+    "record", [records.Episode, records.Season, records.Show, records.Movie]
+)
+def test_records_are_slotted(record):
+    # no per-instance dict: known fields live in slots, others in _extra
+    # only once one is set
+    assert all("__slots__" in vars(cls) for cls in record.__mro__[:-1])
+    instance = record(**{field: None for field in record.__slots__})
+    assert not hasattr(instance, "__dict__")
+    assert instance._extra is None
+
+
+def test_records_compare_like_dicts():
+    # 30 shows of 100 episodes in Kodi, 15 of them on Trakt.tv
+    kodi = library_shows(30, 1)
+    trakt = library_shows(15, 0)
+
+    added = utilities.compareEpisodes(kodi, trakt, True)
+    watched = utilities.compareEpisodes(kodi, trakt, True, watched=True)
+
+    assert as_dicts(added) == utilities.compareEpisodes(
+        as_dicts(kodi), as_dicts(trakt), True
+    )
+    assert as_dicts(watched) == utilities.compareEpisodes(
+        as_dicts(kodi), as_dicts(trakt), True, watched=True
+    )
+    assert utilities.countEpisodes(added) == 1500
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+
+from resources.lib.scheduler import PhaseScheduler
+
+
+def test_phases_start_after_the_phases_they_read():
+    order = []
+    scheduler = PhaseScheduler()
+    scheduler.add("playback", lambda: order.append("playback") or {"movies": []})
+    scheduler.add(
+        "progress",
+        lambda: order.append("progress") or scheduler.results["playback"],
+        requires=["playback"],
+    )
+
+    results = scheduler.run()
+
+    assert order == ["playback", "progress"]
+    assert results == {"playback": {"movies": []}, "progress": {"movies": []}}
+
+
+def test_phases_on_a_lane_run_one_at_a_time_in_order():
+    running = []
+    order = []
+
+    def phase(name):
+        def run():
+            running.append(name)
+            assert running == [name]
+            time.sleep(0.01)
+            order.append(name)
+            running.remove(name)
+
+        return run
+
+    scheduler = PhaseScheduler()
+    for name in ("add", "delete", "watched"):
+        scheduler.add(name, phase(name), lane="trakt")
+
+    scheduler.run()
+
+    assert order == ["add", "delete", "watched"]
+    assert len(scheduler.trace) == 3
+
+
+def test_unknown_or_repeated_phases_are_refused():
+    scheduler = PhaseScheduler()
+    scheduler.add("playback", lambda: None)
+
+    with pytest.raises(ValueError):
+        scheduler.add("playback", lambda: None)
+    with pytest.raises(ValueError):
+        scheduler.add("progress", lambda: None, requires=["ratings"])
+
+
+def test_cancel_starts_no_new_phase():
+    canceled = threading.Event()
+    ran = []
+    scheduler = PhaseScheduler(is_canceled=canceled.is_set)
+    scheduler.add("first", lambda: ran.append("first") or canceled.set(), lane="trakt")
+    scheduler.add("second", lambda: ran.append("second"), lane="trakt")
+
+    results = scheduler.run()
+
+    assert ran == ["first"]
+    assert list(results) == ["first"]
+
+
+def test_failed_phase_is_raised_after_the_running_ones_finish():
+    finished = []
+
+    def fail():
+        raise RuntimeError("Kodi went away")
+
+    def slow():
+        time.sleep(0.05)
+        finished.append("slow")
+
+    scheduler = PhaseScheduler()
+    scheduler.add("slow", slow, lane="trakt")
+    scheduler.add("fail", fail, lane="kodi")
+    scheduler.add("after", lambda: finished.append("after"), lane="kodi")
+
+    with pytest.raises(RuntimeError):
+        scheduler.run()
+
+    assert finished == ["slow"]
+
+
+def test_episode_phases_on_different_lanes_overlap():
+    # the trakt and kodi lanes each wait for the other to have started,
+    # which only returns when the phases run at the same time
+    both_lanes = threading.Barrier(2, timeout=5)
+    phases = [
+        ("playback", None, (), None),
+        ("add to trakt collection", "trakt", (), both_lanes.wait),
+        ("delete from trakt collection", "trakt", (), None),
+        ("add to trakt watched", "trakt", (), None),
+        ("add to kodi watched", "kodi", (), both_lanes.wait),
+        ("add progress to kodi", "kodi", ("playback",), None),
+        ("sync show ratings", "kodi", (), None),
+        ("sync episode ratings", "kodi", (), None),
+    ]
+    scheduler = PhaseScheduler()
+    for name, lane, requires, run in phases:
+        scheduler.add(name, run or (lambda: None), requires, lane)
+
+    results = scheduler.run()
+
+    assert sorted(results) == sorted(name for name, _, _, _ in phases)
+    spans = {span.name: span for span in scheduler.trace}
+    assert spans["add progress to kodi"].start >= spans["playback"].end
+    assert spans["add to kodi watched"].start < spans["add to trakt collection"].end
+    assert spans["add to trakt collection"].start < spans["add to kodi watched"].end
+    for lane in ("trakt", "kodi"):
+        lane_spans = [span for span in scheduler.trace if span.lane == lane]
+        assert [span.name for span in lane_spans] == [
+            name for name, phase_lane, _, _ in phases if phase_lane == lane
+        ]
+        for previous, span in zip(lane_spans, lane_spans[1:]):
+            assert span.start >= previous.end
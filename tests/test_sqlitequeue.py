@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import sys
+import threading
+import time
+
+import mock
+import pytest
+
+sys.modules.setdefault("xbmcvfs", mock.Mock())
+sys.modules.setdefault("xbmcaddon", mock.Mock())
+
+from resources.lib import sqlitequeue  # noqa: E402
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    def make():
+        with mock.patch.object(sqlitequeue, "xbmcvfs") as xbmcvfs:
+            xbmcvfs.translatePath.return_value = str(tmp_path)
+            xbmcvfs.exists.return_value = True
+            return sqlitequeue.SqliteQueue()
+
+    return make
+
+
+def persisted(queue):
+    with sqlite3.connect(queue.path) as conn:
+        return [row[0] for row in conn.execute("SELECT item FROM queue ORDER BY id")]
+
+
+def test_queue_is_fifo_and_persisted(make_queue):
+    queue = make_queue()
+    queue.append({"action": "started", "id": 1})
+    queue.append({"action": "ended"})
+
+    assert len(queue) == 2
+    assert queue.peek() == {"action": "started", "id": 1}
+    assert list(queue) == [{"action": "started", "id": 1}, {"action": "ended"}]
+    assert queue.get() == {"action": "started", "id": 1}
+    assert persisted(queue) == ['{"action": "ended"}']
+    assert queue.get() == {"action": "ended"}
+    assert queue.get(sleep_wait=False) is None
+    assert persisted(queue) == []
+
+
+def test_queue_recovers_items_left_by_a_previous_instance(make_queue):
+    queue = make_queue()
+    queue.append({"action": "paused"})
+    queue.append({"action": "resumed"})
+    queue.get()
+
+    recovered = make_queue()
+
+    assert len(recovered) == 1
+    assert recovered.get() == {"action": "resumed"}
+    recovered.append({"action": "seek"})
+    recovered.purge()
+    assert len(recovered) == 0 and persisted(recovered) == []
+
+
+def test_items_appended_by_another_process_are_served(make_queue):
+    service = make_queue()
+    service.append({"action": "started"})
+    script = make_queue()
+
+    # appended by a context menu script after the service loaded its rows,
+    # which are only read once the script notifies the service
+    script.append({"action": "markWatched"})
+    assert len(service) == 1
+    service.wake()
+    assert service.get(timeout=1) == {"action": "started"}
+    assert service.get(timeout=1) == {"action": "markWatched"}
+
+    received = []
+    served = threading.Event()
+
+    def consume():
+        received.append(service.get())
+        served.set()
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    script.append({"action": "manualSync"})
+    service.wake()
+
+    assert served.wait(5)
+    assert received == [{"action": "manualSync"}]
+    assert persisted(service) == []
+
+
+def test_only_items_taken_are_deleted(make_queue):
+    service = make_queue()
+    script = make_queue()
+    service.append({"n": 1})
+    script.append({"n": 2})
+    service.append({"n": 3})
+    script.append({"n": 4})
+
+    # served in the order they were appended, whoever appended them
+    assert service.get_many(3, sleep_wait=False) == [{"n": 1}, {"n": 2}, {"n": 3}]
+    assert persisted(service) == ['{"n": 4}']
+    service.wake()
+    assert service.get(sleep_wait=False) == {"n": 4}
+
+
+def test_get_times_out_on_an_empty_queue(make_queue):
+    queue = make_queue()
+
+    started = time.perf_counter()
+    assert queue.get(timeout=0.05) is None
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_waiting_consumer_wakes_on_append(make_queue):
+    queue = make_queue()
+    received = []
+    served = threading.Event()
+
+    def consume():
+        # waits without a timeout, only an append can wake it
+        received.append(queue.get())
+        served.set()
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    queue.append({"action": "seek"})
+
+    assert served.wait(5)
+    assert received == [{"action": "seek"}]
+
+
+def test_queue_uses_write_ahead_log(make_queue):
+    queue = make_queue()
+
+    with sqlite3.connect(queue.path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_batches_are_appended_and_taken_in_order(make_queue):
+    queue = make_queue()
+    queue.append_many([{"n": n} for n in range(5)])
+    queue.append({"n": 5})
+
+    assert queue.get_many(4) == [{"n": n} for n in range(4)]
+    assert len(persisted(queue)) == 2
+    assert queue.get_many(10) == [{"n": 4}, {"n": 5}]
+    assert queue.get_many(10, sleep_wait=False) == []
+    assert persisted(queue) == []
+
+
+def test_connections_of_finished_threads_are_closed(make_queue):
+    queue = make_queue()
+
+    def append():
+        queue.append({"action": "seek"})
+
+    for _ in range(5):
+        worker = threading.Thread(target=append)
+        worker.start()
+        worker.join()
+
+    # the init connection plus the one of the last worker
+    assert len(queue._connection_cache) == 2
+    queue.close()
+    assert queue._connection_cache == {}
+    assert len(queue) == 5 and queue.get_many(5) == [{"action": "seek"}] * 5
+
+
+def test_batches_are_written_in_one_transaction(make_queue):
+    queue = make_queue()
+    statements = []
+    queue._get_conn().set_trace_callback(statements.append)
+
+    def commits():
+        count = statements.count("COMMIT")
+        del statements[:]
+        return count
+
+    for n in range(100):
+        queue.append({"n": n})
+    while queue.get(sleep_wait=False) is not None:
+        pass
+    # one transaction for every item appended and every item taken
+    assert commits() == 200
+
+    queue.append_many([{"n": n} for n in range(100)])
+    assert queue.get_many(100, sleep_wait=False) == [{"n": n} for n in range(100)]
+    assert commits() == 2
+    assert persisted(queue) == []
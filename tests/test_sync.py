@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+import mock
+
+xbmc_mock = mock.Mock()
+sys.modules["xbmc"] = xbmc_mock
+xbmcgui_mock = mock.Mock()
+sys.modules["xbmcgui"] = xbmcgui_mock
+xbmcaddon_mock = mock.Mock()
+sys.modules["xbmcaddon"] = xbmcaddon_mock
+
+from resources.lib import sync  # noqa: E402
+
+ACTIVITIES = {
+    "movies": {
+        "collected_at": "2024-01-01T00:00:00.000Z",
+        "watched_at": "2024-01-02T00:00:00.000Z",
+        "rated_at": "2024-01-03T00:00:00.000Z",
+        "paused_at": "2024-01-04T00:00:00.000Z",
+    },
+    "episodes": {},
+    "shows": {},
+}
+
+
+def make_sync(settings, show_progress=False):
+    getSetting = mock.Mock(side_effect=lambda key: settings.get(key, ""))
+    setSetting = mock.Mock(side_effect=lambda key, value: settings.update({key: value}))
+    with mock.patch.object(sync, "getSettingAsBool", return_value=False):
+        instance = sync.Sync(show_progress=show_progress, api=mock.Mock())
+    instance.lastActivities = {
+        group: dict(values) for group, values in ACTIVITIES.items()
+    }
+    return instance, getSetting, setSetting
+
+
+def test_changed_categories_runs_everything_without_saved_state():
+    settings = {}
+    instance, getSetting, setSetting = make_sync(settings)
+
+    with mock.patch.object(sync, "getSetting", getSetting):
+        categories = instance.ChangedCategories("movies", "kodi")
+
+    assert categories == ["collected", "watched", "rated", "paused"]
+
+
+def test_changed_categories_skips_unchanged_watermarks():
+    settings = {}
+    instance, getSetting, setSetting = make_sync(settings)
+
+    with (
+        mock.patch.object(sync, "getSetting", getSetting),
+        mock.patch.object(sync, "setSetting", setSetting),
+    ):
+        instance.SaveActivities("movies", "kodi")
+        assert instance.ChangedCategories("movies", "kodi") == []
+
+        instance.lastActivities["movies"]["watched_at"] = "2024-02-01T00:00:00.000Z"
+        assert instance.ChangedCategories("movies", "kodi") == ["watched"]
+
+
+def test_changed_categories_runs_everything_when_kodi_changed():
+    settings = {}
+    instance, getSetting, setSetting = make_sync(settings)
+
+    with (
+        mock.patch.object(sync, "getSetting", getSetting),
+        mock.patch.object(sync, "setSetting", setSetting),
+    ):
+        instance.SaveActivities("movies", "kodi")
+        categories = instance.ChangedCategories("movies", "kodi-changed")
+
+    assert categories == ["collected", "watched", "rated", "paused"]
+
+
+def test_changed_categories_runs_everything_for_manual_sync():
+    settings = {}
+    instance, getSetting, setSetting = make_sync(settings, show_progress=True)
+
+    with (
+        mock.patch.object(sync, "getSetting", getSetting),
+        mock.patch.object(sync, "setSetting", setSetting),
+    ):
+        instance.SaveActivities("movies", "kodi")
+        categories = instance.ChangedCategories("movies", "kodi")
+
+    assert categories == ["collected", "watched", "rated", "paused"]
+
+
+def test_changed_categories_runs_everything_without_last_activities():
+    settings = {}
+    instance, getSetting, setSetting = make_sync(settings)
+
+    with (
+        mock.patch.object(sync, "getSetting", getSetting),
+        mock.patch.object(sync, "setSetting", setSetting),
+    ):
+        instance.SaveActivities("movies", "kodi")
+        instance.lastActivities = None
+        categories = instance.ChangedCategories("movies", "kodi")
+
+    assert categories == ["collected", "watched", "rated", "paused"]
+
+
+def test_fingerprint_follows_sync_settings():
+    settings = {"add_movies_to_trakt": "true"}
+    instance, getSetting, setSetting = make_sync(settings)
+
+    with mock.patch.object(sync, "getSetting", getSetting):
+        before = instance.Fingerprint("movies", [{"title": "Movie"}])
+        settings["add_movies_to_trakt"] = "false"
+        after = instance.Fingerprint("movies", [{"title": "Movie"}])
+
+    assert before != after
+
+
+def test_prefetch_downloads_only_moved_lists_the_sync_reads():
+    settings = {}
+    instance, getSetting, setSetting = make_sync(settings)
+    enabled = {"trakt_sync_ratings": False, "trakt_movie_playback": True}
+
+    with (
+        mock.patch.object(sync, "getSetting", getSetting),
+        mock.patch.object(sync, "setSetting", setSetting),
+        mock.patch.object(
+            sync, "getSettingAsBool", side_effect=lambda key: enabled.get(key, False)
+        ),
+    ):
+        instance.SaveActivities("movies", "kodi")
+        instance.lastActivities["movies"]["rated_at"] = "2024-02-01T00:00:00.000Z"
+        instance.lastActivities["movies"]["paused_at"] = "2024-02-01T00:00:00.000Z"
+        instance.PrefetchLists("movies")
+
+        # a changed Kodi library still reads every list, from the mirror
+        assert instance.ChangedCategories("movies", "kodi-changed") == [
+            "collected",
+            "watched",
+            "rated",
+            "paused",
+        ]
+
+    instance.traktapi.prefetchLists.assert_called_once_with("movies", ["paused"])
+
+
+def test_progress_only_moves_forward_while_phases_overlap():
+    instance, _, _ = make_sync({}, show_progress=True)
+    phases = instance.Phases()
+    phases.add(
+        "watched", lambda: instance.UpdateProgress(47, line2="watched"), lane="trakt"
+    )
+    phases.add(
+        "collection",
+        lambda: instance.UpdateProgress(37, line2="collection"),
+        lane="trakt",
+    )
+
+    with mock.patch.object(sync, "progress") as progress:
+        progress.iscanceled.return_value = False
+        instance.RunPhases(phases)
+        instance.UpdateProgress(1, line2="episodes")
+
+    percents = [call[0][0] for call in progress.update.call_args_list]
+    assert percents == [47, 47, 1]
+    assert instance.phasePercent is None
+
+
+def test_lists_cut_short_keep_the_activities_unsaved():
+    instance, getSetting, setSetting = make_sync({})
+    instance.traktapi.incompleteLists.return_value = ["/sync/watched/movies"]
+
+    assert not instance.ListsComplete("movies")
+
+    instance.traktapi.incompleteLists.return_value = []
+    assert instance.ListsComplete("movies")
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import sys
+
+import mock
+import pytest
+
+xbmc_mock = mock.Mock()
+sys.modules["xbmc"] = xbmc_mock
+xbmcgui_mock = mock.Mock()
+sys.modules["xbmcgui"] = xbmcgui_mock
+xbmcaddon_mock = mock.Mock()
+sys.modules["xbmcaddon"] = xbmcaddon_mock
+
+from resources.lib import kodilogging, kodiUtilities  # noqa: E402
+from resources.lib.syncEpisodes import SyncEpisodes  # noqa: E402
+
+
+def load_library():
+    path = os.path.join(os.path.dirname(__file__), "fixtures", "kodi_library.json")
+    with open(path) as f:
+        return json.load(f)
+
+
+def grow_library(library, copies):
+    """Repeat the recorded library with fresh ids, as a large Kodi setup."""
+    tvshows = []
+    episodes = []
+    for copy in range(copies):
+        offset = copy * 1000
+        for show in library["GetTVShows"]["tvshows"]:
+            tvshows.append(dict(show, tvshowid=show["tvshowid"] + offset))
+        for episode in library["GetEpisodes"]["episodes"]:
+            episodes.append(
+                dict(
+                    episode,
+                    episodeid=episode["episodeid"] + offset,
+                    tvshowid=episode["tvshowid"] + offset,
+                )
+            )
+    return {
+        "GetTVShows": {"limits": {"total": len(tvshows)}, "tvshows": tvshows},
+        "GetEpisodes": {"limits": {"total": len(episodes)}, "episodes": episodes},
+    }
+
+
+class FakeKodi(object):
+    """Answers VideoLibrary JSON-RPC calls from a recorded library."""
+
+    def __init__(self, library):
+        self.library = library
+        self.calls = []
+        self.by_show = {}
+        for episode in library["GetEpisodes"]["episodes"]:
+            self.by_show.setdefault(episode["tvshowid"], []).append(episode)
+
+    def executeJSONRPC(self, request):
+        request = json.loads(request)
+        method = request["method"].split(".")[1]
+        params = request.get("params", {})
+        self.calls.append((method, params))
+        if method == "GetTVShows":
+            result = self.library["GetTVShows"]
+        elif "tvshowid" in params:
+            episodes = self.by_show.get(params["tvshowid"], [])
+            result = {"limits": {"total": len(episodes)}}
+            if episodes:
+                result["episodes"] = episodes
+        else:
+            episodes = self.library["GetEpisodes"]["episodes"]
+            limits = params.get("limits", {})
+            start = limits.get("start", 0)
+            end = limits.get("end", len(episodes))
+            result = {"limits": {"total": len(episodes)}}
+            if episodes[start:end]:
+                result["episodes"] = episodes[start:end]
+        return json.dumps({"result": result})
+
+
+def load_shows(library, bulk, page_size=None):
+    kodi = FakeKodi(library)
+    loader = SyncEpisodes.__new__(SyncEpisodes)
+    loader.sync = mock.Mock()
+    loader.bulk_episodes = bulk
+    if page_size:
+        loader.episode_page_size = page_size
+    with (
+        mock.patch.object(kodiUtilities.xbmc, "executeJSONRPC", kodi.executeJSONRPC),
+        mock.patch.object(kodiUtilities, "checkExclusion", return_value=False),
+        mock.patch.object(kodiUtilities, "getString", return_value="%s/%s"),
+    ):
+        result = loader._SyncEpisodes__kodiLoadShows()
+    return result, kodi.calls
+
+
+def test_bulk_episode_load_matches_per_show_load():
+    library = load_library()
+
+    bulk, bulk_calls = load_shows(library, bulk=True)
+    per_show, per_show_calls = load_shows(library, bulk=False)
+
+    assert bulk == per_show
+    collected, watched = bulk
+    # the recorded show without episodes is left out
+    assert [show["title"] for show in collected["shows"]] == [
+        "Breaking Bad",
+        "Game of Thrones",
+        "Chernobyl",
+    ]
+    assert len(bulk_calls) == 2
+    assert len(per_show_calls) == 1 + len(library["GetTVShows"]["tvshows"])
+
+
+def test_bulk_episode_load_pages_with_limits():
+    library = load_library()
+
+    paged, calls = load_shows(library, bulk=True, page_size=10)
+
+    assert paged == load_shows(library, bulk=False)[0]
+    total = library["GetEpisodes"]["limits"]["total"]
+    assert [params["limits"]["start"] for _, params in calls[1:]] == list(
+        range(0, total, 10)
+    )
+
+
+def test_bulk_episode_load_aborts_when_kodi_fails():
+    loader = SyncEpisodes.__new__(SyncEpisodes)
+    loader.sync = mock.Mock()
+    with (
+        mock.patch.object(
+            kodiUtilities,
+            "kodiJsonRequest",
+            side_effect=[load_library()["GetTVShows"], None],
+        ),
+        mock.patch.object(kodiUtilities, "getString", return_value="%s/%s"),
+    ):
+        assert loader._SyncEpisodes__kodiLoadShows() == (None, None)
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_episode_load_benchmark_against_recorded_library(bulk):
+    library = grow_library(load_library(), 150)
+
+    (collected, watched), calls = load_shows(library, bulk=bulk)
+
+    assert len(collected["shows"]) == 450
+    # 5250 episodes fit in two pages of episode_page_size
+    assert len(calls) == (3 if bulk else 601)
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_episode_load_logging_benchmark(debug):
+    library = grow_library(load_library(), 150)
+    root = logging.getLogger()
+    level = root.level
+    handler = kodilogging.KodiLogHandler()
+    root.addHandler(handler)
+    try:
+        with (
+            mock.patch.object(kodilogging, "xbmc") as xbmc,
+            mock.patch.object(kodilogging, "getSettingAsBool", return_value=debug),
+        ):
+            kodilogging.setLevel()
+            load_shows(library, bulk=True)
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+
+    logged = [len(call[0][0]) for call in xbmc.log.call_args_list]
+    if debug:
+        # the converted show list is summarized, not written out whole
+        assert 0 < max(logged) < 10000
+    else:
+        assert not xbmc.log.called
+
+
+def test_canceled_history_upload_still_sends_the_shows_packed():
+    syncer = SyncEpisodes.__new__(SyncEpisodes)
+    syncer.sync = mock.Mock()
+    # canceled after the second of three shows was packed
+    syncer.sync.IsCanceled.side_effect = [False, False, False, True, True]
+    writer = syncer.sync.traktapi.historyWriter.return_value
+    writer.not_found = writer.failed = writer.queued = writer.unknown = []
+    shows = {
+        "shows": [
+            {"title": "Show %d" % n, "ids": {"tvdb": n}, "seasons": []}
+            for n in range(3)
+        ]
+    }
+    with (
+        mock.patch.object(kodiUtilities, "getSettingAsBool", return_value=True),
+        mock.patch.object(kodiUtilities, "getString", return_value="%s"),
+        mock.patch("resources.lib.utilities.compareEpisodes", return_value=shows),
+    ):
+        syncer._SyncEpisodes__addEpisodesToTraktWatched({}, {}, 59, 69)
+
+    assert writer.add.call_count == 2
+    writer.flush.assert_called_once_with()
+    assert not writer.retry.called
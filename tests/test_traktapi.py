@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import json
 import sys
+import threading
+import time
 import urllib.error
+import urllib.parse
 
 import mock
+import pytest
 
 
 class WindowXMLDialog(object):
@@ -18,9 +23,25 @@ sys.modules["xbmcgui"] = xbmcgui_mock
 xbmcaddon_mock = mock.Mock()
 xbmcaddon_mock.Addon.return_value.getAddonInfo.return_value = "3.8.2"
 sys.modules["xbmcaddon"] = xbmcaddon_mock
+# shared with the test modules that import the sqlite stores first
+xbmcvfs_mock = sys.modules.setdefault("xbmcvfs", mock.Mock())
 
 from resources.lib import utilities  # noqa: E402
-from resources.lib.traktapi import TraktClient, TraktObject, TraktSeason, traktAPI  # noqa: E402
+from tests.fake_trakt import FakeTrakt  # noqa: E402
+from resources.lib.sqlitecache import SqliteCache  # noqa: E402
+from resources.lib.sqlitemirror import SqliteMirror  # noqa: E402
+from resources.lib.ratelimit import BACKGROUND, RateLimiter  # noqa: E402
+from resources.lib.scheduler import PhaseScheduler  # noqa: E402
+from resources.lib.traktapi import (  # noqa: E402
+    NO_ANSWER,
+    OFFLINE,
+    HistoryWriter,
+    TraktClient,
+    TraktObject,
+    TraktSeason,
+    load_json,
+    traktAPI,
+)
 
 
 def test_trakt_object_exposes_legacy_contract():
@@ -279,6 +300,118 @@ def test_merge_episode_rating_payload_attaches_rating_to_episode():
     assert episode["rated_at"] == "2024-01-01"
 
 
+def test_merge_shows_merges_items_in_place_of_existing_shows():
+    api = traktAPI.__new__(traktAPI)
+    store = {}
+    api._merge_show(
+        store,
+        {
+            "show": {"title": "Show", "ids": {"trakt": 1}},
+            "seasons": [{"number": 1, "episodes": [{"number": 1, "plays": 1}]}],
+        },
+        ("plays",),
+    )
+    frozen = store[1]
+
+    api._merge_shows(
+        store,
+        [
+            {
+                "rating": 9,
+                "show": {"title": "Show", "ids": {"trakt": 1}},
+                "episode": {"season": 1, "number": number},
+            }
+            for number in (1, 2)
+        ]
+        + [{"rating": 7, "show": {"title": "Other", "ids": {"trakt": 2}}}],
+        ("rating",),
+    )
+
+    assert list(store) == [1, 2]
+    episodes = store[1].to_dict()["seasons"][0]["episodes"]
+    assert [
+        (episode["number"], episode["plays"], episode["rating"]) for episode in episodes
+    ] == [
+        (1, 1, 9),
+        (2, 0, 9),
+    ]
+    assert store[2].rating == 7
+    # shows frozen before are replaced, never changed
+    assert "rating" not in frozen.to_dict()["seasons"][0]["episodes"][0]
+
+
+def rated_episodes(shows, episodes_per_show):
+    return [
+        {
+            "rated_at": "2024-01-01T00:00:00.000Z",
+            "rating": index % 10 + 1,
+            "type": "episode",
+            "show": {
+                "title": "Show %d" % show,
+                "year": 2000,
+                "ids": {"trakt": show + 1},
+            },
+            "episode": {
+                "season": index // 20 + 1,
+                "number": index % 20 + 1,
+                "ids": {"trakt": show * episodes_per_show + index + 1},
+            },
+        }
+        for show in range(shows)
+        for index in range(episodes_per_show)
+    ]
+
+
+def test_episodes_rated_merge_builds_every_show_once():
+    # 20k rated episodes over 100 shows
+    api = traktAPI.__new__(traktAPI)
+    api._get_all_ratings = mock.Mock(return_value=rated_episodes(100, 200))
+    built = []
+    copied = []
+
+    class CountingTraktObject(TraktObject):
+        def __init__(self, data=None, show=None, keys=None):
+            if show is None:
+                built.append(data)
+            super().__init__(data, show, keys)
+
+        def to_dict(self):
+            copied.append(self)
+            return super().to_dict()
+
+    with (
+        mock.patch("resources.lib.traktapi.TraktObject", CountingTraktObject),
+        mock.patch.object(
+            traktAPI,
+            "_normalize_video",
+            autospec=True,
+            side_effect=traktAPI._normalize_video,
+        ) as normalize,
+    ):
+        shows = api.getEpisodesRated({})
+
+    assert len(shows) == 100
+    # merged in place: every episode once, every show frozen once and never
+    # copied back out while the items were merged
+    assert normalize.call_count == 20000
+    assert len(built) == 100
+    assert copied == []
+    assert (
+        sum(
+            len(season["episodes"])
+            for show in shows.values()
+            for season in show.to_dict()["seasons"]
+        )
+        == 20000
+    )
+    # merged one item at a time, as before, the result is the same
+    one_by_one = {}
+    api = traktAPI.__new__(traktAPI)
+    for item in rated_episodes(1, 200):
+        api._merge_show(one_by_one, item, ("rated_at", "rating"))
+    assert one_by_one[1].to_dict() == shows[1].to_dict()
+
+
 def test_show_summary_defaults_seasons_for_rating_compatibility():
     api = traktAPI.__new__(traktAPI)
     api._get = mock.Mock(return_value={"title": "Show", "ids": {"trakt": 1}})
@@ -395,19 +528,411 @@ def test_get_all_pages_merges_extra_params_into_query():
     )
 
 
-def test_get_all_ratings_fetches_current_rating_bucket_endpoints():
+def test_get_all_pages_fetches_remaining_pages_concurrently_in_order():
     api = traktAPI.__new__(traktAPI)
-    api._get_all_pages = mock.Mock(return_value=[])
+    api.client = TraktClient("id", "secret", "ua")
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def get(path, **kwargs):
+        page = int(urllib.parse.parse_qs(urllib.parse.urlsplit(path).query)["page"][0])
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        # later pages answer first, results must still follow page order
+        time.sleep(0.01 * (10 - page))
+        with lock:
+            active[0] -= 1
+        return [{"page": page}], {"X-Pagination-Page-Count": "8"}
+
+    api._get = mock.Mock(side_effect=get)
+
+    result = api._get_all_pages("/sync/watched/shows", authorized=True)
+
+    assert result == [{"page": page} for page in range(1, 9)]
+    assert api._get.call_count == 8
+    assert 1 < peak[0] <= api.page_workers
+
+
+def test_iter_all_pages_downloads_at_most_page_workers_pages_ahead():
+    api = traktAPI.__new__(traktAPI)
+    api.client = TraktClient("id", "secret", "ua")
+    api._get = mock.Mock(
+        side_effect=lambda path, **kwargs: (
+            [{"path": path}],
+            {"X-Pagination-Page-Count": "20"},
+        )
+    )
+
+    items = api._iter_all_pages("/sync/watched/shows", authorized=True)
+    next(items)
+    next(items)
+    # page 2 is consumed, so one more page is requested to refill the window
+    time.sleep(0.05)
+    assert api._get.call_count == 2 + api.page_workers
+
+    assert len(list(items)) == 18
+    assert api._get.call_count == 20
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [],
+        [
+            {"title": "Caf\u00e9 \u2603", "ids": {"trakt": 1234567}},
+            12345,
+            -1.5e3,
+            True,
+            None,
+        ],
+        {"user": {"username": "tester"}},
+        12345,
+    ],
+)
+def test_load_json_parses_body_split_at_every_byte(body):
+    raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+    for size in range(1, len(raw) + 1):
+        chunks = [raw[index : index + size] for index in range(0, len(raw), size)]
+        assert load_json(chunks) == body
+
+
+def test_load_json_rejects_truncated_array():
+    with pytest.raises(ValueError):
+        load_json([b'[{"title": "One"}, {"tit'])
+
+
+def test_load_json_returns_none_for_empty_body():
+    assert load_json([]) is None
+    assert load_json([b"  "]) is None
+
+
+def mirrored_api(tmp_path, collected_at):
+    xbmcvfs_mock.translatePath.return_value = str(tmp_path)
+    xbmcvfs_mock.exists.return_value = True
+    api = traktAPI.__new__(traktAPI)
+    api.client = TraktClient("id", "secret", "ua")
+    api.mirror = SqliteMirror()
+    api.lastActivities = {"movies": {"collected_at": collected_at}}
+    return api
+
+
+def test_get_all_pages_serves_unchanged_list_from_mirror(tmp_path):
+    api = mirrored_api(tmp_path, "2024-01-01T00:00:00.000Z")
+    api._get = mock.Mock(return_value=([{"title": "One"}], {}))
+    assert api._get_all_pages("/sync/collection/movies", authorized=True) == [
+        {"title": "One"}
+    ]
+
+    api._get.reset_mock()
+    result = api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    assert result == [{"title": "One"}]
+    api._get.assert_not_called()
+
+
+def test_get_all_pages_refetches_list_when_activity_moved(tmp_path):
+    api = mirrored_api(tmp_path, "2024-01-01T00:00:00.000Z")
+    api._get = mock.Mock(return_value=([{"title": "One"}], {}))
+    api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    api.lastActivities = {"movies": {"collected_at": "2024-02-01T00:00:00.000Z"}}
+    api._get = mock.Mock(return_value=([{"title": "Two"}], {}))
+    result = api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    assert result == [{"title": "Two"}]
+    api._get.assert_called_once()
 
-    api._get_all_ratings("movies")
 
-    assert api._get_all_pages.call_args_list[0] == mock.call(
-        "/sync/ratings/movies/1", authorized=True, timeout=90
+def test_get_all_pages_does_not_mirror_incomplete_list(tmp_path):
+    api = mirrored_api(tmp_path, "2024-01-01T00:00:00.000Z")
+    api._get = mock.Mock(
+        side_effect=[([{"title": "One"}], {"X-Pagination-Page-Count": "2"}), None]
     )
-    assert api._get_all_pages.call_args_list[-1] == mock.call(
+    api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    api._get = mock.Mock(return_value=([{"title": "One"}], {}))
+    api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    api._get.assert_called_once()
+
+
+def test_list_cut_short_is_reported_incomplete_to_its_sync():
+    api = traktAPI.__new__(traktAPI)
+    api.client = TraktClient("id", "secret", "ua")
+    api._get = mock.Mock(
+        side_effect=lambda path, **kwargs: (
+            ([{"title": "One"}], {"X-Pagination-Page-Count": "2"})
+            if "page=1" in path
+            else None
+        )
+    )
+
+    with api.syncScope():
+        api.prefetchLists("movies", ["collected"])
+        api.getMoviesCollected({})
+        assert api.incompleteLists("movies") == ["/sync/collection/movies"]
+        assert api.incompleteLists("episodes") == []
+    with api.syncScope():
+        api._get_all_pages("/sync/watched/movies", authorized=True)
+        assert api.incompleteLists("movies") == ["/sync/watched/movies"]
+    assert api.incompleteLists("movies") == []
+
+
+def test_get_all_pages_skips_mirror_without_last_activities(tmp_path):
+    api = mirrored_api(tmp_path, "2024-01-01T00:00:00.000Z")
+    api._get = mock.Mock(return_value=([{"title": "One"}], {}))
+    api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    api.forgetLastActivities()
+    api._get.reset_mock()
+    api._get_all_pages("/sync/collection/movies", authorized=True)
+
+    api._get.assert_called_once()
+
+
+def test_get_all_ratings_fetches_all_scores_in_one_walk():
+    api = traktAPI.__new__(traktAPI)
+    api._get_all_pages = mock.Mock(
+        return_value=[{"rating": 10}, {"rating": 3}, {"rating": 7}, {"rating": 3}]
+    )
+
+    result = api._get_all_ratings("movies")
+
+    api._get_all_pages.assert_called_once_with(
+        "/sync/ratings/movies", authorized=True, timeout=90
+    )
+    assert [item["rating"] for item in result] == [3, 3, 7, 10]
+
+
+def test_get_all_ratings_fetches_single_rating_bucket_endpoint():
+    api = traktAPI.__new__(traktAPI)
+    api._get_all_pages = mock.Mock(return_value=[])
+
+    api._get_all_ratings("movies", rating=10)
+
+    api._get_all_pages.assert_called_once_with(
         "/sync/ratings/movies/10", authorized=True, timeout=90
     )
-    assert api._get_all_pages.call_count == 10
+
+
+@pytest.fixture
+def fake_trakt():
+    server = FakeTrakt().start()
+    yield server
+    server.stop()
+
+
+def fake_api(server):
+    api = traktAPI.__new__(traktAPI)
+    api.client = TraktClient("id", "secret", "ua")
+    api.client.api_url = server.url
+    api.authorization = {"access_token": "token"}
+    return api
+
+
+def test_get_movies_rated_against_fake_server_needs_one_call_per_page(fake_trakt):
+    fake_trakt.lists["/sync/ratings/movies"] = [
+        {
+            "rating": index % 10 + 1,
+            "rated_at": "2024-01-01T00:00:00.000Z",
+            "movie": {"title": "Movie %s" % index, "ids": {"trakt": index}},
+        }
+        for index in range(250)
+    ]
+    api = fake_api(fake_trakt)
+
+    movies = api.getMoviesRated({})
+
+    assert len(movies) == 250
+    assert fake_trakt.count("/sync/ratings/movies") == 3
+    assert len(fake_trakt.calls) == 3
+
+
+def cached_api(server, tmp_path, max_size=None):
+    xbmcvfs_mock.translatePath.return_value = str(tmp_path)
+    xbmcvfs_mock.exists.return_value = True
+    api = fake_api(server)
+    api.client.cache = SqliteCache(max_size)
+    return api
+
+
+def test_show_summary_is_revalidated_from_cache(fake_trakt, tmp_path):
+    fake_trakt.etags = True
+    fake_trakt.responses["/shows/1"] = {"title": "Show", "ids": {"trakt": 1}}
+    api = cached_api(fake_trakt, tmp_path)
+
+    first = api.getShowSummary(1)
+    sent = fake_trakt.sent_bytes
+    second = api.getShowSummary(1)
+
+    assert (
+        second.to_dict()
+        == first.to_dict()
+        == {
+            "title": "Show",
+            "ids": {"trakt": 1},
+            "seasons": [],
+        }
+    )
+    assert fake_trakt.count("/shows/1") == 2
+    assert "If-None-Match" not in fake_trakt.calls[0][4]
+    assert "If-None-Match" in fake_trakt.calls[1][4]
+    assert fake_trakt.sent_bytes == sent
+
+
+def test_changed_summary_replaces_cached_body(fake_trakt, tmp_path):
+    fake_trakt.etags = True
+    fake_trakt.responses["/shows/1"] = {"title": "Show"}
+    api = cached_api(fake_trakt, tmp_path)
+    api.getShowSummary(1)
+
+    fake_trakt.responses["/shows/1"] = {"title": "Renamed"}
+
+    assert api.getShowSummary(1).title == "Renamed"
+    assert api.getShowSummary(1).title == "Renamed"
+
+
+def test_authorized_requests_bypass_cache(fake_trakt, tmp_path):
+    fake_trakt.etags = True
+    fake_trakt.responses["/users/settings"] = {"user": {"username": "tester"}}
+    api = cached_api(fake_trakt, tmp_path)
+
+    api._get("/users/settings", authorized=True, cache=True)
+    api._get("/users/settings", authorized=True, cache=True)
+
+    assert "If-None-Match" not in fake_trakt.calls[1][4]
+
+
+def test_cache_evicts_least_recently_used_bodies(tmp_path):
+    xbmcvfs_mock.translatePath.return_value = str(tmp_path)
+    xbmcvfs_mock.exists.return_value = True
+    cache = SqliteCache(max_size=25)
+
+    cache.put("/shows/1", '"1"', None, b"1" * 10)
+    cache.put("/shows/2", '"2"', None, b"2" * 10)
+    time.sleep(0.01)
+    cache.get("/shows/1")
+    cache.put("/shows/3", '"3"', None, b"3" * 10)
+
+    assert cache.get("/shows/1") == ('"1"', None, b"1" * 10)
+    assert cache.get("/shows/2") is None
+    assert cache.get("/shows/3") is not None
+
+    cache.purge()
+    assert cache.get("/shows/1") is None
+
+
+def test_cache_closes_connections_of_finished_threads(tmp_path):
+    xbmcvfs_mock.translatePath.return_value = str(tmp_path)
+    xbmcvfs_mock.exists.return_value = True
+    cache = SqliteCache()
+
+    for path in ("/movies/1", "/movies/2", "/movies/3"):
+        worker = threading.Thread(target=cache.get, args=(path,))
+        worker.start()
+        worker.join()
+
+    # the init connection plus the one of the last worker
+    assert len(cache._connection_cache) == 2
+
+
+def test_cache_purge_failure_is_logged_not_raised(tmp_path):
+    xbmcvfs_mock.translatePath.return_value = str(tmp_path)
+    xbmcvfs_mock.exists.return_value = True
+    cache = SqliteCache()
+    cache._get_conn().execute("DROP TABLE cache")
+
+    cache.purge()
+
+
+def rated_movies_api():
+    api = traktAPI.__new__(traktAPI)
+    api._get_all_pages = mock.Mock(
+        return_value=[
+            {
+                "rating": 8,
+                "rated_at": "2024-01-01T00:00:00.000Z",
+                "movie": {"title": "Movie", "ids": {"trakt": 12, "imdb": "tt12"}},
+            }
+        ]
+    )
+    return api
+
+
+def test_movie_rating_for_user_is_cached_by_id():
+    api = rated_movies_api()
+
+    assert api.getMovieRatingForUser(12, "trakt")["rating"] == 8
+    assert api.getMovieRatingForUser("tt12", "imdb")["rating"] == 8
+    assert api.getMovieRatingForUser(13, "trakt") == {}
+    api._get_all_pages.assert_called_once()
+
+
+def test_movie_rating_cache_expires_after_ttl():
+    api = rated_movies_api()
+    api.getMovieRatingForUser(12, "trakt")
+
+    with mock.patch("time.time", return_value=time.time() + api.ratings_ttl + 1):
+        api.getMovieRatingForUser(12, "trakt")
+
+    assert api._get_all_pages.call_count == 2
+
+
+def test_empty_ratings_are_cached_too():
+    api = traktAPI.__new__(traktAPI)
+    api._get_all_pages = mock.Mock(return_value=[])
+
+    assert api.getMovieRatingForUser(12, "trakt") == {}
+    assert api.getMovieRatingForUser(13, "trakt") == {}
+    api._get_all_pages.assert_called_once()
+
+
+def test_failed_ratings_download_is_not_cached():
+    api = traktAPI.__new__(traktAPI)
+    api.client = TraktClient("id", "secret", "ua")
+    api._get = mock.Mock(return_value=None)
+
+    assert api.getMovieRatingForUser(12, "trakt") == {}
+    api._get = mock.Mock(
+        return_value=([{"rating": 8, "movie": {"ids": {"trakt": 12}}}], {})
+    )
+
+    assert api.getMovieRatingForUser(12, "trakt")["rating"] == 8
+    assert api.getMovieRatingForUser(13, "trakt") == {}
+    api._get.assert_called_once()
+
+
+def test_rating_cache_is_dropped_after_rating_changes():
+    api = rated_movies_api()
+    api._post = mock.Mock(return_value={})
+    api.getMovieRatingForUser(12, "trakt")
+
+    api.addRating({"movies": [{"ids": {"trakt": 12}, "rating": 9}]})
+    api.getMovieRatingForUser(12, "trakt")
+    api.removeRating({"movies": [{"ids": {"trakt": 12}}]})
+    api.getMovieRatingForUser(12, "trakt")
+
+    assert api._get_all_pages.call_count == 3
+
+
+def test_episode_rating_for_user_uses_cached_show_index():
+    api = traktAPI.__new__(traktAPI)
+    api._get_all_pages = mock.Mock(
+        return_value=[
+            {
+                "rating": 7,
+                "show": {"title": "Show", "ids": {"trakt": 5}},
+                "episode": {"season": 1, "number": 2, "ids": {"trakt": 52}},
+            }
+        ]
+    )
+
+    assert api.getEpisodeRatingForUser(5, 1, 2, "trakt")["rating"] == 7
+    assert api.getEpisodeRatingForUser(5, 1, 3, "trakt") == {}
+    api._get_all_pages.assert_called_once()
 
 
 def test_movie_playback_progress_uses_pagination():
@@ -449,7 +974,7 @@ def test_episode_playback_progress_uses_pagination():
 
 def test_get_shows_watched_requests_progress_and_paginates():
     api = traktAPI.__new__(traktAPI)
-    api._get_all_pages = mock.Mock(
+    api._iter_all_pages = mock.Mock(
         return_value=[
             {
                 "plays": 3,
@@ -464,7 +989,7 @@ def test_get_shows_watched_requests_progress_and_paginates():
 
     # extended=progress is what restores the season/episode breakdown (Trakt 2026
     # API change); without it episode watched-state can't be synced.
-    api._get_all_pages.assert_called_once_with(
+    api._iter_all_pages.assert_called_once_with(
         "/sync/watched/shows",
         authorized=True,
         timeout=90,
@@ -476,22 +1001,22 @@ def test_get_shows_watched_requests_progress_and_paginates():
 
 def test_get_shows_collected_paginates():
     api = traktAPI.__new__(traktAPI)
-    api._get_all_pages = mock.Mock(return_value=[])
+    api._iter_all_pages = mock.Mock(return_value=[])
 
     api.getShowsCollected({})
 
-    api._get_all_pages.assert_called_once_with(
+    api._iter_all_pages.assert_called_once_with(
         "/sync/collection/shows", authorized=True, timeout=90
     )
 
 
 def test_get_movies_watched_paginates():
     api = traktAPI.__new__(traktAPI)
-    api._get_all_pages = mock.Mock(return_value=[])
+    api._iter_all_pages = mock.Mock(return_value=[])
 
     api.getMoviesWatched({})
 
-    api._get_all_pages.assert_called_once_with(
+    api._iter_all_pages.assert_called_once_with(
         "/sync/watched/movies", authorized=True, timeout=90
     )
 
@@ -505,27 +1030,102 @@ def test_client_retries_once_after_rate_limit_retry_after():
         {"Retry-After": "1"},
         None,
     )
-    response = mock.Mock()
-    response.__enter__ = mock.Mock(return_value=response)
-    response.__exit__ = mock.Mock(return_value=None)
-    response.read.return_value = b'{"ok": true}'
-    opener = mock.Mock()
-    opener.open = mock.Mock(side_effect=[rate_limit, response])
+    client._pool = mock.Mock()
+    client._pool.stream = mock.Mock(
+        side_effect=[rate_limit, (iter([b'{"ok": true}']), {})]
+    )
 
-    with mock.patch(
-        "resources.lib.traktapi.urllib.request.build_opener", return_value=opener
-    ):
-        with mock.patch("resources.lib.traktapi.time.sleep") as sleep:
-            result = client.request("GET", "/search/movie")
+    with mock.patch("resources.lib.traktapi.time.sleep") as sleep:
+        result = client.request("GET", "/search/movie")
 
     assert result == {"ok": True}
     sleep.assert_called_once_with(1)
-    assert opener.open.call_count == 2
+    assert client._pool.stream.call_count == 2
+
+
+def test_rate_limit_holds_off_every_request_of_the_limiter():
+    limiter = RateLimiter()
+    client = TraktClient("id", "secret", "ua", limiter=limiter)
+    rate_limit = urllib.error.HTTPError(
+        "https://api.trakt.tv/sync/history",
+        429,
+        "Too Many Requests",
+        {"Retry-After": "1"},
+        None,
+    )
+    client._pool = mock.Mock()
+    client._pool.stream = mock.Mock(
+        side_effect=[rate_limit, (iter([b'{"ok": true}']), {})]
+    )
+
+    started = time.monotonic()
+    with mock.patch("resources.lib.traktapi.time.sleep") as sleep:
+        assert client.request("POST", "/sync/history", {}) == {"ok": True}
+
+    # the retry waited for the paused budget instead of sleeping on its own
+    assert not sleep.called
+    assert time.monotonic() - started >= 1
+    assert limiter.remaining("POST") == 0
+
+
+@pytest.mark.parametrize("paced", [False, True])
+def test_limiter_keeps_threads_under_server_limits_benchmark(fake_trakt, paced):
+    # at most 10 reads a second, 2 of them in a burst with the limiter
+    fake_trakt.limits = {"GET": (10, 1.0)}
+    fake_trakt.responses["/users/settings"] = {"user": {}}
+    limiter = RateLimiter({"GET": (8.0, 2), "POST": (1.0, 1)}) if paced else None
+    client = TraktClient("id", "secret", "ua", limiter=limiter)
+    client.api_url = fake_trakt.url
+    results = []
+
+    def read():
+        for _ in range(5):
+            results.append(client.request("GET", "/users/settings"))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if paced:
+        assert fake_trakt.limited == 0
+        assert results == [{"user": {}}] * 20
+    else:
+        assert fake_trakt.limited > 0
+
+
+def test_scrobble_goes_ahead_of_a_concurrent_sync(fake_trakt):
+    fake_trakt.responses["/sync/history"] = {"added": {}}
+    fake_trakt.responses["/scrobble/start"] = {"action": "start"}
+    api = fake_api(fake_trakt)
+    limiter = RateLimiter({"GET": (50.0, 1), "POST": (5.0, 1)})
+    api.client.limiter = limiter
+    movie = {"title": "Movie", "year": 2000, "ids": {"tmdb": 1}}
+
+    def sync():
+        for _ in range(4):
+            api.addToHistory({"movies": [movie]})
+
+    syncs = [threading.Thread(target=sync) for _ in range(3)]
+    for thread in syncs:
+        thread.start()
+    while limiter.bucket("POST").waiting() < 3:
+        time.sleep(0.001)
+
+    assert api.scrobbleMovie(movie, 10.0, "start") == {"action": "start"}
+    for thread in syncs:
+        thread.join()
+
+    # sent ahead of the sync writes already waiting, not after all twelve
+    paths = [call[1] for call in fake_trakt.calls]
+    assert len(paths) == 13
+    assert paths.index("/scrobble/start") <= 2
 
 
 def test_add_to_history_disables_automatic_retry():
     api = traktAPI.__new__(traktAPI)
-    api._request = mock.Mock(return_value={})
+    api._request = mock.Mock(return_value=({}, None))
 
     api.addToHistory({"movies": []})
 
@@ -536,7 +1136,157 @@ def test_add_to_history_disables_automatic_retry():
         authorized=True,
         timeout=30,
         retry=False,
+        include_error_code=True,
+        priority=BACKGROUND,
+    )
+
+
+def history_show(tvdb, seasons=1, episodes=10):
+    return {
+        "title": "Show %s" % tvdb,
+        "ids": {"tvdb": tvdb},
+        "seasons": [
+            {
+                "number": season,
+                "episodes": [
+                    {"number": number, "watched_at": "2024-01-01T00:00:00.000Z"}
+                    for number in range(1, episodes + 1)
+                ],
+            }
+            for season in range(1, seasons + 1)
+        ],
+    }
+
+
+def test_history_writer_packs_shows_into_bounded_requests(fake_trakt):
+    fake_trakt.responses["/sync/history"] = {"added": {"episodes": 0}}
+    api = fake_api(fake_trakt)
+    writer = api.historyWriter(max_episodes=100)
+
+    for tvdb in range(12):
+        writer.add(history_show(tvdb, episodes=30))
+    # larger than a request, sent in parts of at most 100 episodes
+    writer.add(history_show(99, episodes=250))
+    writer.add(history_show(100, episodes=30))
+    writer.flush()
+
+    bodies = [call[3] for call in fake_trakt.calls]
+    assert [utilities.countEpisodes(body) for body in bodies] == [
+        90,
+        90,
+        90,
+        90,
+        100,
+        100,
+        80,
+    ]
+    parts = [
+        show for body in bodies for show in body["shows"] if show["ids"]["tvdb"] == 99
+    ]
+    assert [
+        [season["episodes"][0]["number"] for season in part["seasons"]]
+        for part in parts
+    ] == [[1], [101], [201]]
+    assert [show["ids"]["tvdb"] for show in bodies[-1]["shows"]] == [99, 100]
+    assert writer.requests == 7
+
+
+def test_history_writer_matches_not_found_shows():
+    api = mock.Mock()
+    api.addToHistory.return_value = (
+        {
+            "added": {"movies": 0, "episodes": 20},
+            "not_found": {"shows": [{"ids": {"tvdb": "2"}}], "episodes": []},
+        },
+        None,
+    )
+    writer = HistoryWriter(api)
+
+    for tvdb in (1, 2, 3):
+        writer.add(history_show(tvdb))
+    writer.flush()
+
+    api.addToHistory.assert_called_once()
+    assert writer.added == 20
+    assert [show["ids"]["tvdb"] for show in writer.not_found] == [2]
+    assert writer.failed == [] and writer.queued == []
+
+
+def test_history_writer_retries_a_refused_request_in_halves():
+    def addToHistory(body, include_error_code):
+        tvdbs = [show["ids"]["tvdb"] for show in body["shows"]]
+        if 5 in tvdbs:
+            return None, 422
+        return {"added": {"episodes": 10 * len(tvdbs)}}, None
+
+    api = mock.Mock()
+    api.addToHistory.side_effect = addToHistory
+    writer = HistoryWriter(api)
+
+    for tvdb in range(8):
+        writer.add(history_show(tvdb))
+    writer.flush()
+
+    # every show that was not refused is added exactly once
+    assert writer.added == 70
+    assert [show["ids"]["tvdb"] for show in writer.failed] == [5]
+    assert writer.requests == 7
+
+
+def test_history_writer_retries_only_failed_shows_one_by_one():
+    responses = [
+        (None, 503),
+        (
+            {
+                "added": {"episodes": 10},
+                "not_found": {"shows": [{"ids": {"tvdb": 2}}]},
+            },
+            None,
+        ),
+        (None, NO_ANSWER),
+        ({"added": {"episodes": 10}}, None),
+        ({"added": {"episodes": 10}}, None),
+    ]
+    api = mock.Mock()
+    api.addToHistory.side_effect = responses
+    writer = HistoryWriter(api, max_episodes=20)
+
+    for tvdb in range(6):
+        writer.add(history_show(tvdb))
+    writer.flush()
+    assert len(writer.failed) == 2 and len(writer.not_found) == 1
+    assert len(writer.unknown) == 2
+
+    writer.retry()
+
+    sent = [
+        [show["ids"]["tvdb"] for show in call[0][0]["shows"]]
+        for call in api.addToHistory.call_args_list
+    ]
+    # Trakt.tv would not match the show it did not find the first time, and
+    # the ones left without an answer may have been added already
+    assert sent == [[0, 1], [2, 3], [4, 5], [0], [1]]
+    assert writer.added == 30
+    assert writer.failed == []
+    assert [show["ids"]["tvdb"] for show in writer.not_found] == [2]
+    assert [show["ids"]["tvdb"] for show in writer.unknown] == [4, 5]
+
+
+@pytest.mark.parametrize("error_code", [429, 503, OFFLINE, NO_ANSWER])
+def test_history_writer_does_not_split_requests_that_may_not_be_repeated(error_code):
+    api = mock.Mock()
+    api.addToHistory.return_value = (None, error_code)
+    writer = HistoryWriter(api)
+
+    for tvdb in range(4):
+        writer.add(history_show(tvdb))
+    writer.flush()
+
+    api.addToHistory.assert_called_once()
+    lost = {OFFLINE: writer.queued, NO_ANSWER: writer.unknown}.get(
+        error_code, writer.failed
     )
+    assert len(lost) == 4 and writer.added == 0
 
 
 def test_request_refreshes_token_but_does_not_replay_when_retry_disabled():
@@ -570,13 +1320,10 @@ def test_request_refreshes_token_but_does_not_replay_when_retry_disabled():
 
 def test_client_returns_none_on_transport_error():
     client = TraktClient("id", "secret", "ua")
-    opener = mock.Mock()
-    opener.open = mock.Mock(side_effect=urllib.error.URLError("offline"))
+    client._pool = mock.Mock()
+    client._pool.stream = mock.Mock(side_effect=urllib.error.URLError("offline"))
 
-    with mock.patch(
-        "resources.lib.traktapi.urllib.request.build_opener", return_value=opener
-    ):
-        result = client.request("GET", "/users/settings")
+    result = client.request("GET", "/users/settings")
 
     assert result is None
 
@@ -644,3 +1391,97 @@ def test_device_poll_slows_down_on_rate_limit_status():
     api.on_authenticated.assert_called_once_with(
         {"access_token": "token", "refresh_token": "refresh"}
     )
+
+
+def sync_lists_server(server):
+    show = {"title": "Show", "ids": {"trakt": 1}}
+    episode = {"season": 1, "number": 1, "ids": {"trakt": 11}}
+    server.lists["/sync/collection/shows"] = [
+        {
+            "show": show,
+            "seasons": [
+                {"number": 1, "episodes": [{"number": 1, "collected_at": "now"}]}
+            ],
+        }
+    ]
+    server.lists["/sync/watched/shows"] = [
+        {
+            "show": show,
+            "seasons": [{"number": 1, "episodes": [{"number": 1, "plays": 1}]}],
+        }
+    ]
+    server.lists["/sync/ratings/shows"] = [{"rating": 8, "show": show}]
+    server.lists["/sync/ratings/episodes"] = [
+        {"rating": 9, "show": show, "episode": episode}
+    ]
+    server.lists["/sync/playback/episodes"] = [
+        {"progress": 50.0, "show": show, "episode": episode}
+    ]
+
+
+def read_episode_lists(api):
+    return [
+        api.getShowsCollected({})[1].to_dict(),
+        api.getShowsWatched({})[1].to_dict(),
+        api.getShowsRated({})[1].to_dict(),
+        api.getEpisodesRated({})[1].to_dict(),
+        [item.to_dict() for item in api.getEpisodePlaybackProgress()],
+    ]
+
+
+def test_prefetched_lists_download_concurrently(fake_trakt):
+    sync_lists_server(fake_trakt)
+    fake_trakt.delay = 0.1
+    api = fake_api(fake_trakt)
+
+    expected = read_episode_lists(api)
+    # read one after another, a request is only sent once the last returned
+    assert fake_trakt.max_in_flight == 1
+
+    with api.syncScope():
+        api.prefetchLists("episodes", ["collected", "watched", "rated", "paused"])
+        lists = read_episode_lists(api)
+
+    assert lists == expected
+    assert len(fake_trakt.calls) == 10
+    assert fake_trakt.max_in_flight > 1
+
+
+def test_prefetched_list_is_read_once_and_forgotten(fake_trakt):
+    sync_lists_server(fake_trakt)
+    api = fake_api(fake_trakt)
+
+    with api.syncScope():
+        api.prefetchLists("episodes", ["rated"])
+        api.getShowsRated({})
+        api.getShowsRated({})
+        api.forgetPrefetched()
+        api.getEpisodesRated({})
+
+    assert fake_trakt.count("/sync/ratings/shows") == 2
+    assert fake_trakt.count("/sync/ratings/episodes") == 2
+
+
+def test_prefetched_lists_are_only_served_to_their_sync(fake_trakt):
+    sync_lists_server(fake_trakt)
+    api = fake_api(fake_trakt)
+    phases = PhaseScheduler()
+    phases.add("ratings", lambda: api.getShowsRated({}))
+
+    with api.syncScope():
+        api.prefetchLists("episodes", ["rated"])
+        while fake_trakt.count("/sync/ratings/episodes") < 1:
+            time.sleep(0.001)
+        # a rating lookup of the scrobbler while the sync runs
+        scrobbler = threading.Thread(target=api.getEpisodesRated, args=({},))
+        scrobbler.start()
+        scrobbler.join()
+        # downloaded its own copy, the prefetched one is left to the sync
+        assert fake_trakt.count("/sync/ratings/episodes") == 2
+        # the sync's own phases run on worker threads
+        phases.run()
+        api.getEpisodesRated({})
+    api.getShowsRated({})
+
+    assert fake_trakt.count("/sync/ratings/episodes") == 2
+    assert fake_trakt.count("/sync/ratings/shows") == 2
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 #
 
+import copy
 import json
+
+import mock
 from resources.lib import utilities
 
 
@@ -655,3 +658,208 @@ def test_findEpisodeMatchInList():
     # and fail with AttributeError: type object 'list' has no attribute 'items'
     result = utilities.findEpisodeMatchInList("121361", 1, 1, list_data, "tvdb")
     assert result == episode_data
+
+
+def test_MediaIndex_keeps_first_match_and_compares_as_strings():
+    first = {"title": "Chaos", "year": 2005, "ids": {"tmdb": 1}}
+    second = {"title": "Chaos", "year": "2005", "ids": {"tmdb": "1"}}
+    index = utilities.MediaIndex([None, first, second])
+
+    assert index.findById("tmdb", "1") is first
+    assert index.findByTitleAndYear("Chaos", "2005") is first
+    assert index.findByTitle("Chaos") is first
+    assert index.findById("imdb", "tt0405977") is None
+
+
+def test_MediaIndex_prefers_root_key_over_ids():
+    item = {"title": "Chaos", "tvdb": 2, "ids": {"tvdb": 3}}
+    index = utilities.MediaIndex([item])
+
+    assert index.findById("tvdb", 2) is item
+    assert index.findById("tvdb", 3) is None
+
+
+def test_findMediaObject_accepts_prebuilt_MediaIndex():
+    data1 = load_params_from_json("tests/fixtures/movies_local_chaos.json")
+    data2 = load_params_from_json("tests/fixtures/movies_remote_chaos_match.json")
+    index = utilities.MediaIndex(data2)
+
+    assert utilities.findMediaObject(data1, index, True) == data2[0]
+    assert utilities.findMediaObject(data1, index, False) is None
+
+
+def test_compareMovies_builds_one_index_and_looks_each_movie_up_once():
+    def linear_find(list_data, **kwargs):
+        # the pre-index lookup, kept as the reference the index must match
+        for item in list_data:
+            i = 0
+            for key in kwargs:
+                if key in item:
+                    key_val = item[key]
+                elif "ids" in item and key in item["ids"]:
+                    key_val = item["ids"][key]
+                else:
+                    continue
+                if str(key_val) == str(kwargs[key]):
+                    i = i + 1
+            if i == len(kwargs):
+                return item
+        return None
+
+    count = 2000
+    kodi = [
+        {
+            "title": "Movie %d" % i,
+            "year": 2000 + i % 20,
+            "ids": {"tmdb": i + 1},
+            "collected": 1,
+        }
+        for i in range(count)
+    ]
+    trakt = [
+        {
+            "title": "Movie %d" % i,
+            "year": 2000 + i % 20,
+            "ids": {"trakt": i, "tmdb": str(i + 1)},
+            "collected": 0 if i % 2 else 1,
+        }
+        for i in reversed(range(count))
+    ]
+    indexes = []
+    lookups = []
+
+    class SpyIndex(utilities.MediaIndex):
+        def __init__(self, list_data):
+            indexes.append(list_data)
+            super(SpyIndex, self).__init__(list_data)
+
+        def findById(self, id_type, value):
+            lookups.append(id_type)
+            return super(SpyIndex, self).findById(id_type, value)
+
+    with mock.patch.object(utilities, "MediaIndex", SpyIndex):
+        result = utilities.compareMovies(kodi, trakt, True)
+
+    assert len(result) == count // 2
+    # a linear compare scans trakt for every movie, O(n*m); with the index
+    # it is built once and every movie costs one hash lookup, O(n+m)
+    assert indexes == [trakt]
+    assert lookups == ["tmdb"] * count
+
+    index = utilities.MediaIndex(trakt)
+    for movie in kodi[:: count // 50]:
+        expected = linear_find(trakt, tmdb=movie["ids"]["tmdb"])
+        assert utilities.findMediaObject(movie, index, True) is expected
+
+
+def library_shows(count, watched):
+    return {
+        "shows": [
+            {
+                "title": "Show %d" % i,
+                "year": 2000 + i % 20,
+                "ids": {"tvdb": i},
+                "tvshowid": i,
+                "seasons": [
+                    {
+                        "number": season,
+                        "episodes": [
+                            {
+                                "season": season,
+                                "number": number,
+                                "title": "Episode %d" % number,
+                                "ids": {"episodeid": i * 1000 + season * 100 + number},
+                                "watched": watched,
+                                "plays": watched,
+                                "collected": 1,
+                                "runtime": 2700,
+                                "rating": 0,
+                            }
+                            for number in range(1, 11)
+                        ],
+                    }
+                    for season in range(1, 4)
+                ],
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def test_compareEpisodes_leaves_inputs_untouched():
+    kodi = library_shows(20, 1)
+    trakt = library_shows(10, 0)
+    kodi_before = json.dumps(kodi, sort_keys=True)
+    trakt_before = json.dumps(trakt, sort_keys=True)
+
+    added = utilities.compareEpisodes(kodi, trakt, True)
+    utilities.sanitizeShows(added)
+    playback = utilities.compareEpisodes(
+        trakt, kodi, True, restrict=True, playback=True
+    )
+    playback["shows"][0]["seasons"][0]["episodes"][0]["runtime"] = 0
+    watched = utilities.compareEpisodes(
+        kodi, trakt, True, watched=True, restrict=True, collected=kodi
+    )
+    utilities.sanitizeShows(watched)
+
+    assert utilities.countEpisodes(added) == 300
+    assert json.dumps(kodi, sort_keys=True) == kodi_before
+    assert json.dumps(trakt, sort_keys=True) == trakt_before
+
+
+def test_compareMovies_leaves_inputs_untouched():
+    kodi = [
+        {
+            "title": "Movie",
+            "year": 2000,
+            "ids": {"tmdb": 1},
+            "movieid": 7,
+            "runtime": 5400,
+            "watched": 0,
+            "collected": 1,
+            "plays": 0,
+        }
+    ]
+    trakt = [
+        {
+            "title": "Movie",
+            "year": 2000,
+            "ids": {"tmdb": 1},
+            "watched": 1,
+            "collected": 0,
+            "plays": 2,
+            "progress": 40,
+        }
+    ]
+    trakt_before = json.dumps(trakt, sort_keys=True)
+
+    watched = utilities.compareMovies(trakt, kodi, True, watched=True)
+    utilities.sanitizeMovies(watched)
+    playback = utilities.compareMovies(trakt, kodi, True, playback=True)
+
+    assert watched == [
+        {"title": "Movie", "year": 2000, "ids": {"tmdb": 1}, "progress": 40}
+    ]
+    assert playback[0]["movieid"] == 7 and playback[0]["runtime"] == 5400
+    assert json.dumps(trakt, sort_keys=True) == trakt_before
+
+
+def test_episode_compare_phases_do_not_deepcopy():
+    kodi = library_shows(20, 1)
+    trakt = library_shows(10, 0)
+
+    with mock.patch.object(copy, "deepcopy") as deepcopy:
+        # the collection, watched and removal phases of an episode sync
+        added = utilities.compareEpisodes(kodi, trakt, True)
+        utilities.sanitizeShows(added)
+        removed = utilities.compareEpisodes(trakt, kodi, True)
+        utilities.sanitizeShows(removed)
+        watched = utilities.compareEpisodes(kodi, trakt, True, watched=True)
+        utilities.sanitizeShows(watched)
+
+    assert not deepcopy.called
+    assert utilities.countEpisodes(added) == 300
+    # sanitizing changed the copies compared out, not the loaded shows
+    assert added["shows"][0] is not kodi["shows"][10]
+    assert "tvshowid" in kodi["shows"][10]